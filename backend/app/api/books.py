@@ -4,10 +4,11 @@
 
 from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..database.connection import get_db
+from ..cache import ResponseCache, get_response_cache, json_response
+from ..database.connection import get_async_db
 from ..database.service.book_service import BookService
 from ..database.service.ranking_service import RankingService
 from ..models.base import DataResponse, PaginationData
@@ -29,7 +30,7 @@ ranking_service = RankingService()
 async def get_books_list(
         page: int = Query(1, ge=1, description="页码"),
         size: int = Query(20, ge=1, le=100, description="每页数量"),
-        db: Session = Depends(get_db),
+        db: AsyncSession = Depends(get_async_db),
 ) -> DataResponse[PaginationData[BookBasic]]:
     """
     获取书籍列表（分页）
@@ -38,7 +39,7 @@ async def get_books_list(
     :param db:
     :return:
     """
-    book_result, total = book_service.get_books_with_pagination(db, page, size)
+    book_result, total = await db.run_sync(book_service.get_books_with_pagination, page, size)
 
     return DataResponse(
         data=PaginationData(
@@ -52,28 +53,40 @@ async def get_books_list(
 
 
 @router.get("/{novel_id}", response_model=DataResponse[BookDetail])
-async def get_book_detail(novel_id: int, db: Session = Depends(get_db)) -> DataResponse[BookDetail]:
+async def get_book_detail(
+        request: Request,
+        novel_id: int,
+        db: AsyncSession = Depends(get_async_db),
+        response_cache: ResponseCache = Depends(get_response_cache),
+) -> DataResponse[BookDetail]:
     """
     获取书籍详细信息 - 使用novel_id
+    :param request: 当前请求
     :param novel_id:
     :param db:
+    :param response_cache: 响应缓存
     :return:
     """
-    book = book_service.get_book_by_novel_id(db, novel_id)
+    cache_key = await response_cache.key_for(request)
+    if (cached := await response_cache.get(cache_key)) is not None:
+        return json_response(cached)
+
+    book = await db.run_sync(book_service.get_book_by_novel_id, novel_id)
 
     # 通过novel_id获取详细信息
-    book_detail = book_service.get_book_detail_by_novel_id(db, book.novel_id)
+    book_detail = await db.run_sync(book_service.get_book_detail_by_novel_id, book.novel_id)
     if not book_detail:
         raise HTTPException(status_code=404, detail=f"书籍详情不存在: {novel_id}")
 
-    return DataResponse(
+    return await response_cache.respond(cache_key, DataResponse(
         data=book_detail,
         message="获取书籍详情成功"
-    )
+    ))
 
 
 @router.get("/{novel_id}/snapshots", response_model=DataResponse[List[BookSnapshot]])
 async def get_book_snapshots(
+        request: Request,
         novel_id: int,
         interval: str = Query(
             "day",
@@ -81,7 +94,8 @@ async def get_book_snapshots(
             description="时间间隔: hour/day/week/month"
         ),
         count: int = Query(7, ge=1, le=365, description="时间段数量"),
-        db: Session = Depends(get_db),
+        db: AsyncSession = Depends(get_async_db),
+        response_cache: ResponseCache = Depends(get_response_cache),
 ) -> DataResponse:
     """
     获取书籍历史快照
@@ -92,51 +106,67 @@ async def get_book_snapshots(
         - interval=week, count=4: 获取4周内每周的第一个快照
         - interval=month, count=3: 获取3个月内每月的第一个快照
 
+    :param request: 当前请求
     :param novel_id: 书籍novel_id
     :param interval: 时间间隔 (hour/day/week/month)
     :param count: 时间段数量
     :param db:
+    :param response_cache: 响应缓存
     :return: 历史快照列表
     """
+    cache_key = await response_cache.key_for(request)
+    if (cached := await response_cache.get(cache_key)) is not None:
+        return json_response(cached)
+
     # 参数范围限制
     limits = {"hour": 168, "day": 90, "week": 52, "month": 24}
     count = min(count, limits[interval])
 
     # 获取书籍并验证存在性
-    book = book_service.get_book_by_novel_id(db, novel_id)
+    book = await db.run_sync(book_service.get_book_by_novel_id, novel_id)
 
     # 调用统一的历史快照获取方法
-    snapshots = book_service.get_historical_snapshots_by_novel_id(db, book.novel_id, interval, count)
+    snapshots = await db.run_sync(
+        book_service.get_historical_snapshots_by_novel_id, book.novel_id, interval, count
+    )
 
-    return DataResponse(
+    return await response_cache.respond(cache_key, DataResponse(
         data=snapshots,
         message=f"获取{len(snapshots)}个{interval}间隔的历史快照成功"
-    )
+    ))
 
 
 @router.get("/{novel_id}/rankings", response_model=DataResponse[List[BookRankingInfo]])
 async def get_book_ranking_history(
+        request: Request,
         novel_id: int,
         days: int = Query(30, ge=1, le=365, description="统计天数"),
-        db: Session = Depends(get_db),
+        db: AsyncSession = Depends(get_async_db),
+        response_cache: ResponseCache = Depends(get_response_cache),
 ) -> DataResponse:
     """
     获取书籍排名历史 - 使用novel_id
 
+    :param request: 当前请求
     :param novel_id: 书籍novel_id，晋江文学城的小说ID
     :param days: 统计天数，查询最近多少天的排名历史
     :param db: 数据库会话对象
+    :param response_cache: 响应缓存
     :return: 书籍排名历史列表
     """
+    cache_key = await response_cache.key_for(request)
+    if (cached := await response_cache.get(cache_key)) is not None:
+        return json_response(cached)
+
     # 检查书籍是否存在
-    book = book_service.get_book_by_novel_id(db, novel_id)
+    book = await db.run_sync(book_service.get_book_by_novel_id, novel_id)
 
     # 使用ranking_service获取排名历史数据
-    ranking_infos = ranking_service.get_book_ranking_history(
-        db, book.novel_id, days
+    ranking_infos = await db.run_sync(
+        ranking_service.get_book_ranking_history, book.novel_id, days
     )
 
-    return DataResponse(
+    return await response_cache.respond(cache_key, DataResponse(
         data=ranking_infos,
         message=f"获取{len(ranking_infos)}条排名历史成功"
-    )
+    ))
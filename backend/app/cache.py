@@ -0,0 +1,220 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+接口响应缓存 - 按路由和查询参数缓存序列化后的JSON响应
+
+榜单详情、榜单历史和书籍详情等接口的结果只在爬取批次提交后才会变化。
+缓存键包含一个数据版本号，爬取批次提交后递增版本号，旧版本的缓存即全部失效。
+缓存值是已经序列化好的JSON字节串，命中时直接返回，不再查询数据库和构建Pydantic模型。
+
+默认使用进程内LRU缓存；配置response_cache_redis_url后使用Redis兼容服务，
+多个API进程共享缓存和版本号（需要安装redis：pip install jjcrawler[cache]）。
+接口中的读写使用redis.asyncio客户端，不阻塞事件循环；递增版本号在爬取线程和调度任务中执行，使用同步客户端。
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from fastapi import Request, Response
+from pydantic import BaseModel
+
+from app.config import get_settings
+from app.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Redis中缓存键和版本号的前缀
+REDIS_KEY_PREFIX = "jjcrawler:response:"
+REDIS_VERSION_KEY = f"{REDIS_KEY_PREFIX}version"
+
+
+class ResponseCache:
+    """
+    带数据版本号的响应缓存
+
+    特性：
+    - 缓存键为 v<版本号>:<路径>?<排序后的查询参数>
+    - 版本号递增后旧缓存不再命中，进程内缓存同时清空
+    - 条目最多保留ttl秒，用于兜底默认日期等随时间变化的参数
+    - Redis不可用时按未命中处理，不影响接口本身
+    """
+
+    def __init__(self, enabled: bool = True, ttl: int = 300, max_size: int = 2000, redis_url: str | None = None):
+        """
+        :param enabled: 是否启用缓存，禁用时所有读取都未命中且不写入
+        :param ttl: 缓存条目最长保留时间（秒）
+        :param max_size: 进程内缓存最大条目数
+        :param redis_url: Redis兼容服务地址，为空时使用进程内缓存
+        """
+        self.enabled = enabled
+        self.ttl = ttl
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._version = 0
+        self._entries: OrderedDict[str, Tuple[float, bytes]] = OrderedDict()
+        self._redis = _connect_redis(redis_url) if enabled and redis_url else None
+        self._async_redis = _connect_redis(redis_url, async_client=True) if self._redis is not None else None
+
+        # 统计信息
+        self._stats = {"hits": 0, "misses": 0}
+
+    async def get_version(self) -> int:
+        """当前数据版本号"""
+        if self._async_redis is not None:
+            try:
+                return int(await self._async_redis.get(REDIS_VERSION_KEY) or 0)
+            except Exception as e:
+                logger.warning(f"读取Redis缓存版本号失败: {e}")
+        return self._version
+
+    def bump_version(self) -> int:
+        """
+        递增数据版本号，使已有缓存全部失效
+
+        :return: 新的版本号
+        """
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+        if self._redis is not None:
+            try:
+                return int(self._redis.incr(REDIS_VERSION_KEY))
+            except Exception as e:
+                logger.warning(f"递增Redis缓存版本号失败: {e}")
+        return self._version
+
+    async def key_for(self, request: Request) -> Optional[str]:
+        """
+        生成请求的缓存键
+
+        必须在查询数据库之前生成：查询期间有批次提交时，结果写入旧版本号下，不会被新请求读到。
+        :param request: 当前请求
+        :return: 缓存键，缓存禁用时返回None
+        """
+        if not self.enabled:
+            return None
+        query = "&".join(f"{name}={value}" for name, value in sorted(request.query_params.multi_items()))
+        return f"v{await self.get_version()}:{request.url.path}?{query}"
+
+    async def get(self, key: Optional[str]) -> Optional[bytes]:
+        """
+        读取缓存的响应
+
+        :param key: 缓存键，为None时直接返回None
+        :return: JSON字节串，未命中时返回None
+        """
+        if key is None:
+            return None
+        body = await self._get_redis(key) if self._async_redis is not None else self._get_local(key)
+        with self._lock:
+            self._stats["hits" if body is not None else "misses"] += 1
+        return body
+
+    async def set(self, key: Optional[str], body: bytes) -> None:
+        """
+        写入响应
+
+        :param key: 缓存键，为None时不写入
+        :param body: JSON字节串
+        """
+        if key is None:
+            return
+        if self._async_redis is not None:
+            try:
+                await self._async_redis.set(f"{REDIS_KEY_PREFIX}{key}", body, ex=self.ttl)
+            except Exception as e:
+                logger.warning(f"写入Redis响应缓存失败: {e}")
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    async def respond(self, key: Optional[str], response: BaseModel) -> Response:
+        """
+        序列化响应模型，写入缓存后返回JSON响应
+
+        :param key: 缓存键
+        :param response: 响应模型
+        :return: JSON响应
+        """
+        body = response.model_dump_json().encode("utf-8")
+        await self.set(key, body)
+        return json_response(body)
+
+    def clear(self) -> None:
+        """清空进程内缓存和统计信息"""
+        with self._lock:
+            self._entries.clear()
+            self._stats = {"hits": 0, "misses": 0}
+
+    def get_stats(self) -> dict:
+        """获取缓存统计信息"""
+        with self._lock:
+            return {**self._stats, "size": len(self._entries), "version": self._version}
+
+    def _get_local(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, body = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return body
+
+    async def _get_redis(self, key: str) -> Optional[bytes]:
+        try:
+            return await self._async_redis.get(f"{REDIS_KEY_PREFIX}{key}")
+        except Exception as e:
+            logger.warning(f"读取Redis响应缓存失败: {e}")
+            return None
+
+
+def json_response(body: bytes) -> Response:
+    """把已序列化的JSON字节串包装为响应"""
+    return Response(content=body, media_type="application/json")
+
+
+def _connect_redis(redis_url: str, async_client: bool = False):
+    """
+    连接Redis兼容服务，未安装redis时回退到进程内缓存
+
+    :param redis_url: Redis兼容服务地址
+    :param async_client: 是否返回redis.asyncio客户端
+    :return: Redis客户端，未安装redis时返回None
+    """
+    try:
+        import redis
+        import redis.asyncio
+    except ImportError:
+        logger.warning("未安装redis，响应缓存回退到进程内缓存")
+        return None
+    client_class = redis.asyncio.Redis if async_client else redis.Redis
+    return client_class.from_url(redis_url)
+
+
+# 全局响应缓存实例
+_response_cache: Optional[ResponseCache] = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """获取全局响应缓存实例（单例模式），也用作FastAPI依赖"""
+    global _response_cache
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                settings = get_settings().api
+                _response_cache = ResponseCache(
+                    enabled=settings.response_cache_enabled,
+                    ttl=settings.response_cache_ttl,
+                    max_size=settings.response_cache_max_size,
+                    redis_url=settings.response_cache_redis_url,
+                )
+    return _response_cache
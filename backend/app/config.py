@@ -3,9 +3,9 @@
 """
 
 from pathlib import Path
-from typing import Any
+from typing import Any, Literal
 
-from pydantic import Field, ValidationError, field_validator
+from pydantic import BaseModel, Field, ValidationError, field_validator, model_validator
 from pydantic_settings import BaseSettings
 
 
@@ -14,6 +14,7 @@ class DatabaseSettings(BaseSettings):
 
     # 数据库连接配置
     url: str = Field(default="sqlite:///./data/jjcrawler.db", description="数据库连接URL")
+    async_url: str | None = Field(default=None, description="异步数据库连接URL，为空时根据url推导（sqlite使用aiosqlite，postgresql使用asyncpg）")
     echo: bool = Field(default=False, description="是否打印SQL语句")
 
     # 连接池配置
@@ -22,6 +23,48 @@ class DatabaseSettings(BaseSettings):
     pool_timeout: int = Field(default=30, ge=1, le=300, description="连接池获取连接超时时间（秒）")
     pool_recycle: int = Field(default=3600, ge=300, le=86400, description="连接回收时间（秒）")
 
+    # SQLite连接参数，每个新连接建立时通过PRAGMA设置
+    sqlite_journal_mode: Literal["WAL", "DELETE", "TRUNCATE"] = Field(
+        default="WAL", description="日志模式，WAL下读连接不会被爬虫写事务阻塞"
+    )
+    sqlite_synchronous: Literal["OFF", "NORMAL", "FULL"] = Field(
+        default="NORMAL", description="同步级别，WAL模式下NORMAL只在检查点时fsync"
+    )
+    sqlite_mmap_size: int = Field(default=268435456, ge=0, description="内存映射读取的最大字节数，0表示关闭")
+    sqlite_cache_size: int = Field(default=-65536, description="页缓存大小，负数表示KiB，正数表示页数")
+    sqlite_temp_store: Literal["DEFAULT", "FILE", "MEMORY"] = Field(default="MEMORY", description="临时表和排序的存放位置")
+    sqlite_busy_timeout: int = Field(default=5000, ge=0, le=600000, description="遇到锁时的等待时间（毫秒）")
+
+    # SQLite维护任务配置
+    sqlite_maintenance_enabled: bool = Field(default=True, description="是否定时执行WAL检查点和PRAGMA optimize")
+    sqlite_checkpoint_interval_minutes: int = Field(default=15, ge=1, le=1440, description="WAL检查点执行间隔（分钟）")
+    sqlite_optimize_interval_hours: int = Field(default=24, ge=1, le=168, description="PRAGMA optimize执行间隔（小时）")
+
+    # PostgreSQL配置
+    postgres_partition_months_ahead: int = Field(
+        default=3, ge=1, le=24, description="快照分区表提前创建的月分区数量"
+    )
+    postgres_copy_ingest: bool = Field(default=True, description="PostgreSQL下是否使用COPY批量写入快照")
+
+    # 快照存储配置
+    snapshot_change_only: bool = Field(
+        default=False, description="是否只保存统计数据发生变化的书籍快照，历史查询按阶梯函数补齐未变化的时间段"
+    )
+    book_history_rollups: bool = Field(
+        default=True, description="是否在写入书籍快照时维护时间段汇总表，历史快照接口直接读取汇总表"
+    )
+    ranking_storage: Literal["rows", "delta"] = Field(
+        default="rows", description="榜单快照存储格式：rows每本书一行，delta按批次保存关键帧和位置差量"
+    )
+    ranking_keyframe_interval: int = Field(
+        default=24, ge=1, le=1000, description="差量存储格式下每隔多少个批次写入一次完整关键帧"
+    )
+
+    # 快照归档配置
+    archive_dir: str = Field(default="./data/archive", description="快照Parquet归档目录")
+    archive_after_days: int = Field(default=90, ge=1, le=3650, description="快照保留在数据库中的天数，更早的快照归档到Parquet文件")
+    archive_chunk_size: int = Field(default=50000, ge=1000, le=1000000, description="每个归档文件最多包含的行数")
+
     class Config:
         env_prefix = "DATABASE_"
         env_file_encoding = "utf-8"
@@ -47,11 +90,55 @@ class APISettings(BaseSettings):
     default_page_size: int = Field(default=20, ge=1, le=100, description="默认分页大小")
     max_page_size: int = Field(default=100, ge=1, le=1000, description="最大分页大小")
 
+    # 响应缓存配置
+    response_cache_enabled: bool = Field(default=True, description="是否缓存榜单和书籍查询接口的响应，爬取批次提交后自动失效")
+    response_cache_ttl: int = Field(default=300, ge=1, le=86400, description="响应缓存最长保留时间（秒），兜底默认日期等随时间变化的参数")
+    response_cache_max_size: int = Field(default=2000, ge=1, le=100000, description="进程内响应缓存最大条目数")
+    response_cache_redis_url: str | None = Field(
+        default=None, description="Redis兼容缓存服务地址，如redis://localhost:6379/0，为空时使用进程内缓存"
+    )
+
     class Config:
         env_prefix = "API_"
         env_file_encoding = "utf-8"
 
 
+class RateLimitSettings(BaseModel):
+    """单个接口族的令牌桶限速配置"""
+
+    rate: float = Field(gt=0, le=1000, description="每秒补充的令牌数，即持续请求速率")
+    burst: int = Field(ge=1, le=1000, description="令牌桶容量，即允许的最大突发请求数")
+
+
+# 爬虫连接配置档位：并发、连接池和请求间隔的组合，显式设置的字段优先
+CRAWLER_PROFILES: dict[str, dict[str, Any]] = {
+    "conservative": {
+        "max_concurrent_requests": 2,
+        "request_delay": 3.0,
+        "max_connections": 4,
+        "max_keepalive_connections": 2,
+        "keepalive_expiry": 15.0,
+        "http2": False,
+    },
+    "balanced": {
+        "max_concurrent_requests": 3,
+        "request_delay": 2.0,
+        "max_connections": 15,
+        "max_keepalive_connections": 10,
+        "keepalive_expiry": 30.0,
+        "http2": False,
+    },
+    "aggressive": {
+        "max_concurrent_requests": 16,
+        "request_delay": 0.5,
+        "max_connections": 32,
+        "max_keepalive_connections": 32,
+        "keepalive_expiry": 120.0,
+        "http2": True,
+    },
+}
+
+
 class CrawlerSettings(BaseSettings):
     """爬虫配置"""
 
@@ -77,8 +164,35 @@ class CrawlerSettings(BaseSettings):
 
     # 统一并发控制配置 - 针对503错误优化
     request_delay: float = Field(default=2.0, ge=0.1, le=60.0, description="请求间隔延迟（秒）")
-    max_concurrent_requests: int = Field(default=3, ge=1, le=5, description="全局最大并发请求数")
+    max_concurrent_requests: int = Field(default=3, ge=1, le=64, description="全局最大并发请求数")
+
+    # 连接池配置
+    profile: Literal["conservative", "balanced", "aggressive"] | None = Field(
+        default=None, description="连接配置档位，统一设置并发数、连接池和请求间隔，显式设置的字段优先"
+    )
+    http2: bool = Field(default=False, description="是否启用HTTP/2多路复用（需要安装h2，未安装时回退HTTP/1.1）")
+    max_connections: int = Field(default=15, ge=1, le=200, description="连接池最大连接数")
+    max_keepalive_connections: int = Field(default=10, ge=0, le=200, description="连接池最大keep-alive连接数")
+    keepalive_expiry: float = Field(default=30.0, ge=1.0, le=600.0, description="keep-alive连接空闲过期时间（秒）")
     
+    # 令牌桶限速配置，键为data/urls.json中的URL模板名称，未配置的模板不限速
+    rate_limit_enabled: bool = Field(default=True, description="是否按接口族启用令牌桶限速")
+    rate_limits: dict[str, RateLimitSettings] = Field(
+        default={
+            "novel_detail": RateLimitSettings(rate=4.0, burst=8),
+            "jiazi_ranking": RateLimitSettings(rate=0.5, burst=2),
+            "page_ranking": RateLimitSettings(rate=1.0, burst=4),
+        },
+        description="各接口族的令牌桶限速配置",
+    )
+
+    # 自适应并发配置（AIMD），max_concurrent_requests作为初始窗口
+    adaptive_concurrency: bool = Field(default=True, description="是否根据延迟和503反馈自适应调整并发窗口")
+    adaptive_min_concurrency: int = Field(default=1, ge=1, le=64, description="自适应并发窗口下限")
+    adaptive_max_concurrency: int = Field(default=16, ge=1, le=64, description="自适应并发窗口上限")
+    adaptive_latency_threshold: float = Field(default=5.0, ge=0.1, le=60.0, description="请求延迟超过该值（秒）时收缩并发窗口")
+    circuit_failure_threshold: int = Field(default=3, ge=1, le=50, description="并发窗口降到下限后仍连续失败多少次开启熔断")
+
     # 重试配置
     retry_times: int = Field(default=2, ge=0, le=5, description="页面级重试次数")
     retry_delay: float = Field(default=2.0, ge=0.5, le=10.0, description="页面重试延迟（秒）")
@@ -89,10 +203,54 @@ class CrawlerSettings(BaseSettings):
     retry_min_wait: float = Field(default=1.0, ge=0.1, le=5.0, description="最小等待时间（秒）")
     retry_max_wait: float = Field(default=30.0, ge=5.0, le=120.0, description="最大等待时间（秒）")
 
+    # 爬虫运行时配置
+    persistent_runtime: bool = Field(default=True, description="是否在常驻事件循环线程中执行爬取任务，复用HTTP连接池")
+    runtime_job_timeout: float = Field(default=3600.0, ge=60.0, le=86400.0, description="常驻运行时中单次爬取任务的最长等待时间（秒）")
+
+    # 请求合并配置
+    request_coalescing: bool = Field(default=True, description="是否合并进程内并发的相同URL请求")
+    response_cache_ttl: float = Field(default=60.0, ge=0.0, le=3600.0, description="成功响应的短期缓存时间（秒），0表示不缓存")
+    response_cache_max_size: int = Field(default=2000, ge=1, le=100000, description="响应缓存最大条目数")
+
+    # 条件请求配置
+    conditional_requests: bool = Field(default=True, description="是否使用ETag/Last-Modified条件请求，响应未变化时使用本地响应")
+    response_store_dir: str = Field(default="./data/response_store", description="本地响应存储目录")
+
+    # 响应解码配置
+    fast_decode: bool = Field(default=False, description="是否使用msgspec按接口结构解码响应（需要安装msgspec，未安装时回退json）")
+
+    # 书籍获取优先级配置
+    book_priority_enabled: bool = Field(default=True, description="是否按排名、数据波动和陈旧度排序书籍获取顺序")
+    book_fetch_budget: int = Field(default=0, ge=0, le=100000, description="单次爬取最多获取的书籍数，按优先级截取，0表示不限制")
+
+    # 数据写入配置
+    bulk_ingest: bool = Field(default=True, description="是否使用批量upsert模式保存爬取数据")
+
+    # 流式流水线配置
+    stream_ingest: bool = Field(default=False, description="是否启用流式流水线，页面获取、书籍获取和数据写入重叠执行")
+    stream_batch_size: int = Field(default=50, ge=1, le=1000, description="流式模式下每次写入的书籍微批大小")
+
+    # 书籍详情新鲜度配置
+    freshness_ttl: int = Field(default=1800, ge=0, le=86400, description="书籍详情新鲜度窗口（秒），窗口内获取过的书籍不再重复请求，0表示禁用")
+    freshness_mode: Literal["skip", "defer"] = Field(default="skip", description="新鲜书籍的处理方式：skip跳过，defer排到最后获取")
+    freshness_max_size: int = Field(default=50000, ge=100, le=1000000, description="新鲜度索引进程内缓存的最大书籍数")
+
     class Config:
         env_prefix = "CRAWLER_"
         env_file_encoding = "utf-8"
 
+    @model_validator(mode="after")
+    def apply_profile(self):
+        """应用连接配置档位，只覆盖未显式设置的字段"""
+        if self.profile is not None:
+            for name, value in CRAWLER_PROFILES[self.profile].items():
+                if name not in self.model_fields_set:
+                    setattr(self, name, value)
+        # keep-alive连接数不能超过连接池大小
+        if self.max_keepalive_connections > self.max_connections:
+            self.max_keepalive_connections = self.max_connections
+        return self
+
 
 class SchedulerSettings(BaseSettings):
     """任务调度器配置
@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+自适应并发限制器 - 基于延迟和503反馈的AIMD并发控制
+
+替代固定大小的信号量：请求延迟健康时加性增大并发窗口，
+遇到503、429或超时时乘性减小。只有窗口已经降到下限仍然过载时，
+才把错误报告给全局熔断器，熔断器因此只在持续失败时开启。
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict
+
+from httpx import HTTPStatusError, TimeoutException
+
+from app.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 视为上游过载的HTTP状态码
+OVERLOAD_STATUS_CODES = {429, 503}
+
+
+@dataclass
+class AdaptiveLimiterConfig:
+    """自适应并发限制器配置"""
+    initial_limit: int = 3  # 初始并发窗口
+    min_limit: int = 1  # 并发窗口下限
+    max_limit: int = 16  # 并发窗口上限
+    increase_step: float = 1.0  # 每个完整窗口的加性增长量
+    decrease_factor: float = 0.5  # 过载时的乘性减小系数
+    latency_threshold: float = 5.0  # 单次请求延迟超过该值（秒）视为拥塞
+    decrease_cooldown: float = 1.0  # 两次减小之间的最小间隔（秒），避免同一波过载连续减半
+
+
+class AdaptiveLimiter:
+    """
+    AIMD自适应并发限制器
+
+    特性：
+    - 每次成功请求使窗口增长 increase_step / 当前窗口，一个完整窗口约增长 increase_step
+    - 503/429/超时或高延迟时窗口乘以 decrease_factor，冷却时间内只减小一次
+    - min_limit == max_limit 时等价于固定大小的信号量
+    """
+
+    def __init__(self, config: AdaptiveLimiterConfig | None = None):
+        self.config = config or AdaptiveLimiterConfig()
+        self._limit = float(min(max(self.config.initial_limit, self.config.min_limit), self.config.max_limit))
+        self._inflight = 0
+        self._last_decrease = 0.0
+        self._condition = asyncio.Condition()
+
+    @classmethod
+    def fixed(cls, limit: int) -> "AdaptiveLimiter":
+        """创建固定窗口的限制器（不自适应）"""
+        return cls(AdaptiveLimiterConfig(initial_limit=limit, min_limit=limit, max_limit=limit))
+
+    @property
+    def limit(self) -> int:
+        """当前并发窗口"""
+        return max(self.config.min_limit, int(self._limit))
+
+    @property
+    def inflight(self) -> int:
+        """当前进行中的请求数"""
+        return self._inflight
+
+    @property
+    def at_floor(self) -> bool:
+        """并发窗口是否已降到下限"""
+        return self.limit <= self.config.min_limit
+
+    async def acquire(self) -> None:
+        """获取一个并发名额，窗口已满时等待"""
+        async with self._condition:
+            await self._condition.wait_for(lambda: self._inflight < self.limit)
+            self._inflight += 1
+
+    async def release(self) -> None:
+        """释放并发名额，唤醒等待方重新检查窗口"""
+        async with self._condition:
+            self._inflight -= 1
+            self._condition.notify_all()
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """占用一个并发名额的上下文管理器"""
+        await self.acquire()
+        try:
+            yield
+        finally:
+            await self.release()
+
+    def record_success(self, latency: float) -> None:
+        """
+        记录成功请求，延迟健康时加性增大窗口
+
+        :param latency: 请求耗时（秒）
+        """
+        if latency > self.config.latency_threshold:
+            self._decrease(f"请求延迟 {latency:.2f}s 超过阈值")
+            return
+        self._limit = min(float(self.config.max_limit), self._limit + self.config.increase_step / self._limit)
+
+    def record_overload(self, reason: str) -> bool:
+        """
+        记录上游过载，乘性减小窗口
+
+        :param reason: 过载原因，用于日志
+        :return: 过载发生时窗口是否已处于下限（即持续过载，应报告给熔断器）
+        """
+        was_at_floor = self.at_floor
+        self._decrease(reason)
+        return was_at_floor
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取统计信息"""
+        return {
+            "limit": self.limit,
+            "inflight": self._inflight,
+            "min_limit": self.config.min_limit,
+            "max_limit": self.config.max_limit,
+        }
+
+    def _decrease(self, reason: str) -> None:
+        """乘性减小窗口，冷却时间内的重复过载只减小一次"""
+        now = time.monotonic()
+        if now - self._last_decrease < self.config.decrease_cooldown:
+            return
+        self._last_decrease = now
+        old_limit = self.limit
+        self._limit = max(float(self.config.min_limit), self._limit * self.config.decrease_factor)
+        if self.limit != old_limit:
+            logger.warning(f"{reason}，并发窗口 {old_limit} -> {self.limit}")
+
+
+def is_overload_error(exception: BaseException) -> bool:
+    """判断异常是否表示上游过载（503/429或超时）"""
+    if isinstance(exception, HTTPStatusError):
+        return exception.response.status_code in OVERLOAD_STATUS_CODES
+    return isinstance(exception, (TimeoutException, TimeoutError))
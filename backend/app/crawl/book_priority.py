@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+书籍获取优先级 - 优先获取高排名、数据变化快和长时间未更新的书籍
+
+熔断或超时导致爬取中断时，最有价值的书籍已经先被获取。
+优先级分数由三部分加权组成：
+- 排名：本次爬取中该书在所有榜单里的最好名次
+- 波动：最近两次快照之间收藏数、点击数的相对变化
+- 陈旧度：距离最近一次快照的时间
+"""
+
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.crawl.parser import RankingParser
+from app.database.connection import SessionLocal
+from app.database.service.book_service import BookService
+from app.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 各部分权重
+RANK_WEIGHT = 0.5
+VOLATILITY_WEIGHT = 0.3
+STALENESS_WEIGHT = 0.2
+
+# 陈旧度达到满分所需的小时数
+STALENESS_FULL_HOURS = 24.0
+
+
+def collect_best_positions(rankings: Iterable[RankingParser]) -> Dict[int, int]:
+    """
+    统计每本书在所有榜单中的最好名次
+
+    :param rankings: 榜单解析结果
+    :return: novel_id到最好名次（从0开始，与RankingSnapshot.position一致）的映射
+    """
+    best_positions: Dict[int, int] = {}
+    for ranking in rankings:
+        for book in ranking.book_snapshots:
+            try:
+                novel_id, position = int(book.get("novel_id")), int(book.get("position"))
+            except (ValueError, TypeError):
+                continue
+            if novel_id not in best_positions or position < best_positions[novel_id]:
+                best_positions[novel_id] = position
+    return best_positions
+
+
+def load_recent_snapshots(novel_ids: List[Any]) -> Dict[int, List[Dict[str, Any]]]:
+    """
+    从数据库加载书籍最近两次快照，失败时返回空结果（只按排名排序）
+
+    :param novel_ids: 书籍ID列表
+    :return: novel_id到快照列表（时间倒序）的映射
+    """
+    ids = []
+    for novel_id in novel_ids:
+        try:
+            ids.append(int(novel_id))
+        except (ValueError, TypeError):
+            continue
+    if not ids:
+        return {}
+    try:
+        with SessionLocal() as db:
+            return BookService.get_recent_snapshots(db, ids, 2)
+    except Exception as e:
+        logger.warning(f"加载书籍快照失败，仅按排名排序: {e}")
+        return {}
+
+
+def priority_score(
+        best_position: Optional[int],
+        snapshots: List[Dict[str, Any]],
+        now: Optional[datetime] = None,
+) -> float:
+    """
+    计算书籍获取优先级分数，分数越高越先获取
+
+    :param best_position: 最好名次，不在任何榜单中时为None
+    :param snapshots: 最近的快照列表（时间倒序）
+    :param now: 当前时间
+    :return: 0到1之间的分数
+    """
+    rank_score = 1.0 / (best_position + 1) if best_position is not None and best_position >= 0 else 0.0
+
+    volatility_score = 0.0
+    if len(snapshots) >= 2:
+        latest, previous = snapshots[0], snapshots[1]
+        changes = []
+        for field in ("favorites", "clicks"):
+            current, before = latest.get(field) or 0, previous.get(field) or 0
+            changes.append(abs(current - before) / max(before, 1))
+        volatility_score = min(1.0, sum(changes) / len(changes))
+
+    # 从未获取过的书籍视为完全陈旧
+    staleness_score = 1.0
+    if snapshots and snapshots[0].get("snapshot_time"):
+        hours = ((now or datetime.now()) - snapshots[0]["snapshot_time"]).total_seconds() / 3600
+        staleness_score = min(1.0, max(0.0, hours / STALENESS_FULL_HOURS))
+
+    return RANK_WEIGHT * rank_score + VOLATILITY_WEIGHT * volatility_score + STALENESS_WEIGHT * staleness_score
+
+
+def prioritize_novel_ids(
+        novel_ids: List[Any],
+        best_positions: Dict[int, int],
+        recent_snapshots: Dict[int, List[Dict[str, Any]]],
+        now: Optional[datetime] = None,
+) -> List[Any]:
+    """
+    按优先级分数从高到低排序书籍ID，分数相同时保持原有顺序
+
+    :param novel_ids: 书籍ID列表
+    :param best_positions: novel_id到最好名次的映射
+    :param recent_snapshots: novel_id到最近快照列表的映射
+    :param now: 当前时间
+    :return: 排序后的书籍ID列表
+    """
+    now = now or datetime.now()
+    scores = {}
+    for novel_id in novel_ids:
+        try:
+            key = int(novel_id)
+        except (ValueError, TypeError):
+            scores[novel_id] = 0.0
+            continue
+        scores[novel_id] = priority_score(best_positions.get(key), recent_snapshots.get(key, []), now)
+    return sorted(novel_ids, key=lambda nid: scores[nid], reverse=True)
@@ -16,6 +16,7 @@ from enum import Enum
 from typing import Optional
 from dataclasses import dataclass
 
+from app.config import get_settings
 from app.logger import get_logger
 
 logger = get_logger(__name__)
@@ -305,7 +306,9 @@ async def get_global_circuit_breaker() -> CircuitBreaker:
     if _global_circuit_breaker is None:
         async with _circuit_breaker_lock:
             if _global_circuit_breaker is None:
-                _global_circuit_breaker = CircuitBreaker()
+                _global_circuit_breaker = CircuitBreaker(CircuitBreakerConfig(
+                    failure_threshold=get_settings().crawler.circuit_failure_threshold
+                ))
 
     return _global_circuit_breaker
 
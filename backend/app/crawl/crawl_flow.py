@@ -4,14 +4,20 @@
 
 import asyncio
 import time
-from dataclasses import dataclass
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
 from typing import Any, Dict, List
 from typing import Tuple
 
 from sqlalchemy.orm import Session
 
+from app.cache import get_response_cache
 from app.config import get_settings
+from app.crawl.adaptive_limiter import AdaptiveLimiter, AdaptiveLimiterConfig
+from app.crawl.book_priority import collect_best_positions, load_recent_snapshots, prioritize_novel_ids
 from app.crawl.crawl_task import PageTask, get_crawl_task
+from app.crawl.freshness import get_freshness_index
 from app.crawl.http_client import HttpClient
 from app.crawl.parser import NovelPageParser, PageParser, RankingParser
 from app.database.connection import SessionLocal
@@ -23,6 +29,9 @@ from app.utils import generate_batch_id
 
 logger = get_logger(__name__)
 
+# 按响应校验器复用的书籍解析结果缓存大小
+PARSED_BOOK_CACHE_SIZE = 20000
+
 
 # 重试和熔断机制已移动到HTTP客户端层，业务层专注于业务逻辑
 
@@ -48,10 +57,8 @@ class PagesResult(BaseResult[PageParser]):
         # 收集所有成功页面的书籍ID
         all_novel_ids = set()
         for page_result in self.success_items:
-            novel_ids = page_result.get_novel_ids()
             # 过滤掉空值和无效ID
-            valid_ids = [nid for nid in novel_ids if nid and str(nid).strip() and str(nid) != '0']
-            all_novel_ids.update(valid_ids)
+            all_novel_ids.update(_valid_novel_ids(page_result.get_novel_ids()))
         return list(all_novel_ids)
 
 
@@ -68,6 +75,25 @@ class NovelsResult(BaseResult[NovelPageParser]):
         }
 
 
+@dataclass
+class StreamNovelsResult:
+    """
+    流式爬取的书籍结果 - 书籍解析结果写入后即释放，只保留计数
+    """
+    success_num: int = 0
+    failed_items: Dict[str, Exception] = field(default_factory=dict)
+
+    @property
+    def total_num(self) -> int:
+        return self.success_num + len(self.failed_items)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "total_novels_num": self.total_num,
+            "failed_novels": list(self.failed_items.keys())
+        }
+
+
 crawler_config = get_settings().crawler
 book_service = BookService()
 ranking_service = RankingService()
@@ -87,8 +113,11 @@ class CrawlFlow:
         """
         初始化爬取流程管理器 - 包含503暂停机制
         """
-        self.client = HttpClient()
-        self.request_semaphore = asyncio.Semaphore(crawler_config.max_concurrent_requests)
+        self.limiter = create_request_limiter()
+        self.client = HttpClient(limiter=self.limiter)
+        self.freshness = get_freshness_index()
+        # 书籍URL -> (响应校验器, 解析结果)，响应未变化时跳过解析
+        self._parsed_books: OrderedDict[str, Tuple[str, Dict[str, Any]]] = OrderedDict()
 
     async def execute_crawl_task(self, page_ids: List[str]) -> Dict[str, Any]:
         """
@@ -104,14 +133,18 @@ class CrawlFlow:
         start_time = time.time()
         logger.info(f"开始统一并发爬取 {len(page_ids)} 个页面: {page_ids}")
         try:
-            # 阶段 1: 获取所有页面内容
-            page_data = await self._fetch_pages(page_tasks)
+            if crawler_config.stream_ingest:
+                # 流式模式: 页面获取、书籍获取和数据写入重叠执行
+                page_data, book_data, save_results = await self._execute_streaming(page_tasks)
+            else:
+                # 阶段 1: 获取所有页面内容
+                page_data = await self._fetch_pages(page_tasks)
 
-            # 阶段 2: 获取所有书籍内容
-            book_data = await self._fetch_books(page_data)
+                # 阶段 2: 获取所有书籍内容
+                book_data = await self._fetch_books(page_data)
 
-            # 阶段 3: 保存数据
-            save_results = await self._save_data(page_data, book_data)
+                # 阶段 3: 保存数据
+                save_results = await self._save_data(page_data, book_data)
 
             execution_time = time.time() - start_time
             logger.info(f"统一并发爬取总耗时 {execution_time:.2f}s")
@@ -158,14 +191,14 @@ class CrawlFlow:
         return pages_result
 
     async def _fetch_and_parse_page(self, page_task: PageTask) -> PageParser:
-        async with self.request_semaphore:
-            page_content = await self.client.run(page_task.url)
-            if not page_content or page_content.get("status") == "error":
-                raise ValueError(f"页面内容获取失败: {page_content.get('error', '未知错误')}")
-            # 解析榜单信息
-            page_parser = PageParser(page_content, page_id=page_task.id)
-            logger.info(f"页面{page_task.id}获取完成: 解析榜单 {len(page_parser.rankings)}个")
-            return page_parser
+        # 并发由HTTP客户端中的自适应限制器按请求控制
+        page_content = await self.client.run(page_task.url)
+        if not page_content or page_content.get("status") == "error":
+            raise ValueError(f"页面内容获取失败: {page_content.get('error', '未知错误')}")
+        # 解析榜单信息
+        page_parser = PageParser(page_content, page_id=page_task.id)
+        logger.info(f"页面{page_task.id}获取完成: 解析榜单 {len(page_parser.rankings)}个")
+        return page_parser
 
     async def _fetch_books(self, pages_result: PagesResult) -> NovelsResult:
         """
@@ -177,8 +210,10 @@ class CrawlFlow:
         Returns:
             类型安全的书籍结果
         """
-        # 收集所有成功页面的书籍ID
-        all_novel_ids = pages_result.get_novel_ids()
+        # 收集所有成功页面的书籍ID，按新鲜度跳过或后置近期已获取的书籍，并按优先级排序
+        all_novel_ids = await self._select_novel_ids(
+            pages_result.get_novel_ids(), collect_best_positions(pages_result.rankings)
+        )
         if not all_novel_ids:
             logger.info("阶段 2: 无有效书籍ID需要获取")
             return NovelsResult()
@@ -208,18 +243,74 @@ class CrawlFlow:
         :return: 书籍响应数据
         """
         logger.info(f"开始获取书籍 {novel_id}")
-        async with self.request_semaphore:
-            # 参数验证
-            if not novel_id:
-                raise ValueError(f"Invalid novel_id parameter: '{novel_id}'")
-            book_url = crawl_task.build_novel_url(str(novel_id))
-            result = await self.client.run(book_url)
-            # 检查是否是有效的书籍数据
-            if not result.get("novelId"):
-                raise KeyError(f"Invalid book data: missing novelId in response")
-            novel_parser = NovelPageParser(result)
+        # 参数验证
+        if not novel_id:
+            raise ValueError(f"Invalid novel_id parameter: '{novel_id}'")
+        book_url = crawl_task.build_novel_url(str(novel_id))
+        result = await self.client.run(book_url)
+        # 检查是否是有效的书籍数据
+        if not result.get("novelId"):
+            raise KeyError(f"Invalid book data: missing novelId in response")
+        return self._parse_book(book_url, result)
+
+    def _parse_book(self, book_url: str, result: Dict[str, Any]) -> NovelPageParser:
+        """
+        解析书籍详情，响应校验器与上次相同（响应未变化）时复用上次的解析结果
+
+        :param book_url: 书籍详情URL
+        :param result: 响应数据
+        :return: 书籍解析结果
+        """
+        store = self.client.response_store
+        validator = store.current_validator(book_url) if store else None
+        cached = self._parsed_books.get(book_url)
+        if validator and cached and cached[0] == validator:
+            self._parsed_books.move_to_end(book_url)
+            novel_parser = NovelPageParser()
+            novel_parser.book_detail = cached[1].replace(snapshot_time=datetime.now())
             return novel_parser
 
+        novel_parser = NovelPageParser(result)
+        if validator:
+            self._parsed_books[book_url] = (validator, novel_parser.book_detail.replace())
+            self._parsed_books.move_to_end(book_url)
+            while len(self._parsed_books) > PARSED_BOOK_CACHE_SIZE:
+                self._parsed_books.popitem(last=False)
+        return novel_parser
+
+    async def _select_novel_ids(
+            self, novel_ids: List[Any], best_positions: Dict[int, int] | None = None, budget: int | None = None
+    ) -> List[Any]:
+        """
+        根据新鲜度索引和优先级确定需要获取的书籍ID及顺序
+
+        skip模式直接跳过新鲜度窗口内已获取的书籍，defer模式将其排到最后获取；
+        其余书籍按优先级从高到低排序，配置了预算时只保留优先级最高的部分
+        :param novel_ids: 书籍ID列表
+        :param best_positions: novel_id到本次爬取最好名次的映射
+        :param budget: 最多获取的书籍数，默认使用book_fetch_budget配置，0表示不限制
+        :return: 需要获取的书籍ID列表
+        """
+        # 回源数据库是同步操作，放到线程中执行
+        stale, fresh = await asyncio.to_thread(self.freshness.partition, novel_ids)
+        if fresh and crawler_config.freshness_mode != "defer":
+            logger.info(f"跳过 {len(fresh)} 个在新鲜度窗口内已获取的书籍")
+            fresh = []
+        elif fresh:
+            logger.info(f"{len(fresh)} 个书籍在新鲜度窗口内已获取，排到最后获取")
+
+        if crawler_config.book_priority_enabled and len(stale) + len(fresh) > 1:
+            recent_snapshots = await asyncio.to_thread(load_recent_snapshots, stale + fresh)
+            stale = prioritize_novel_ids(stale, best_positions or {}, recent_snapshots)
+            fresh = prioritize_novel_ids(fresh, best_positions or {}, recent_snapshots)
+
+        selected = stale + fresh
+        budget = crawler_config.book_fetch_budget if budget is None else budget
+        if budget and len(selected) > budget:
+            logger.info(f"书籍获取预算 {budget}，按优先级舍弃 {len(selected) - budget} 个书籍")
+            selected = selected[:budget]
+        return selected
+
     async def _save_data(self, pages_result: PagesResult, novels_result: NovelsResult) -> Dict[str, int] | Exception:
         """
         阶段 3: 保存所有数据 - 容错保存机制
@@ -233,49 +324,207 @@ class CrawlFlow:
         """
         logger.info("阶段 3: 开始保存所有数据")
 
-        # 收集所有榜单数据
-        all_rankings = pages_result.rankings
-        books = novels_result.success_items
-
-        ranking_snapshots_num = 0
-        books_snapshots_num = 0
-
-        # 创建独立的数据库会话并保存数据
-        db = SessionLocal()
         try:
-            # 使用现有的Service方法保存数据
-            if all_rankings:
-                _, ranking_snapshots_num = self.save_ranking_parsers(all_rankings, db)
-                logger.info(f"保存了 {len(all_rankings)} 个榜单，{ranking_snapshots_num} 个榜单快照")
-            else:
-                logger.info("没有榜单数据需要保存")
-            if books:
-                books_snapshots_num = self.save_novel_parsers(books, db)
-                logger.info(f"保存了 {len(books)} 个书籍，{books_snapshots_num} 个书籍快照")
-            else:
-                logger.info("没有书籍数据需要保存")
-            db.commit()
+            # 整个爬取批次在一个事务中写入，只提交一次；写入放到线程中执行，避免阻塞共享的事件循环
+            save_results, saved_novel_ids = await asyncio.to_thread(
+                self.write_crawl_batch, pages_result.rankings, novels_result.success_items
+            )
+            self._mark_books_fetched(saved_novel_ids)
 
             # 更准确的完成日志
-            total_saved = len(all_rankings) + len(books) + ranking_snapshots_num + books_snapshots_num
+            total_saved = sum(save_results.values())
             if total_saved > 0:
                 logger.info(f"阶段 3 完成: 成功保存 {total_saved} 条数据记录")
             else:
                 logger.warning("阶段 3 完成: 没有数据被保存到数据库")
 
-            return {
-                "rankings": len(all_rankings),
-                "ranking_snapshots": ranking_snapshots_num,
-                "books": len(books),
-                "books_snapshots": books_snapshots_num,
-            }
+            return save_results
         except Exception as db_error:
-            db.rollback()
             logger.error(f"数据库操作失败: {db_error}")
             return db_error
+
+    async def _execute_streaming(
+            self, page_tasks: List[PageTask]
+    ) -> Tuple[PagesResult, StreamNovelsResult, Dict[str, int]]:
+        """
+        流式流水线: 页面完成后立即派发书籍获取，书籍解析结果交给写入任务按微批保存
+
+        书籍获取由固定数量的worker从队列中消费，写入队列有界，写入慢时反压书籍获取
+        :param page_tasks: 页面任务列表
+        :return: 页面结果，书籍结果，保存结果统计
+        """
+        logger.info(f"流式流水线: 开始处理 {len(page_tasks)} 个页面")
+        pages_result = PagesResult()
+        novels_result = StreamNovelsResult()
+        save_results = {"rankings": 0, "ranking_snapshots": 0, "books": 0, "books_snapshots": 0}
+
+        novel_queue: asyncio.Queue[int | None] = asyncio.Queue()
+        write_queue: asyncio.Queue[List[RankingParser] | NovelPageParser | None] = asyncio.Queue(
+            maxsize=crawler_config.stream_batch_size * 2
+        )
+        seen_novel_ids = set()
+        # 流式模式下书籍获取预算按整次爬取累计
+        budget = crawler_config.book_fetch_budget
+        dispatched = 0
+
+        async def page_worker(page_task: PageTask) -> None:
+            nonlocal dispatched
+            try:
+                page_parser = await self._fetch_and_parse_page(page_task)
+            except Exception as e:
+                pages_result.failed_items[page_task.id] = e
+                logger.error(f"页面 {page_task.id} 获取失败: {e}")
+                return
+            pages_result.success_items.append(page_parser)
+            await write_queue.put(page_parser.rankings)
+            # 跨页面去重、按新鲜度筛选后立即派发书籍获取
+            novel_ids = [nid for nid in _valid_novel_ids(page_parser.get_novel_ids()) if nid not in seen_novel_ids]
+            seen_novel_ids.update(novel_ids)
+            best_positions = collect_best_positions(page_parser.rankings)
+            selected = await self._select_novel_ids(novel_ids, best_positions, budget=0)
+            if budget:
+                # 多个页面并发筛选，在筛选完成后再按剩余预算截取
+                selected = selected[:max(0, budget - dispatched)]
+            dispatched += len(selected)
+            for novel_id in selected:
+                novel_queue.put_nowait(novel_id)
+
+        async def book_worker() -> None:
+            while (novel_id := await novel_queue.get()) is not None:
+                try:
+                    novel_parser = await self._fetch_and_parse_book(novel_id)
+                except Exception as e:
+                    novels_result.failed_items[str(novel_id)] = e
+                    logger.error(f"书籍 {novel_id} 获取失败: {e}")
+                    continue
+                novels_result.success_num += 1
+                await write_queue.put(novel_parser)
+
+        writer = asyncio.create_task(self._stream_writer(write_queue, save_results))
+        # worker数量取并发窗口上限，实际并发由限制器控制
+        book_workers = [asyncio.create_task(book_worker()) for _ in range(self.limiter.config.max_limit)]
+        try:
+            await asyncio.gather(*(page_worker(t) for t in page_tasks))
+            # 所有页面完成后通知书籍worker退出
+            for _ in book_workers:
+                novel_queue.put_nowait(None)
+            await asyncio.gather(*book_workers)
+            await write_queue.put(None)
+            await writer
+        finally:
+            for task in (*book_workers, writer):
+                task.cancel()
+
+        logger.info(
+            f"流式流水线完成: 页面 {len(pages_result.success_items)}/{pages_result.total_num}，"
+            f"书籍 {novels_result.success_num}/{novels_result.total_num}，保存 {sum(save_results.values())} 条数据记录"
+        )
+        return pages_result, novels_result, save_results
+
+    async def _stream_writer(
+            self, write_queue: asyncio.Queue, save_results: Dict[str, int]
+    ) -> None:
+        """
+        流式写入任务: 榜单到达即写入，书籍累积到微批大小后写入，收到None时写入剩余数据并退出
+
+        :param write_queue: 写入队列
+        :param save_results: 保存结果统计，原地累加
+        """
+        rankings: List[RankingParser] = []
+        books: List[NovelPageParser] = []
+        while True:
+            item = await write_queue.get()
+            finished = item is None
+            if isinstance(item, NovelPageParser):
+                books.append(item)
+            elif item:
+                rankings.extend(item)
+
+            if (finished or rankings or len(books) >= crawler_config.stream_batch_size) and (rankings or books):
+                try:
+                    # 写入放到线程中执行，避免阻塞事件循环中的网络请求
+                    batch_results, saved_novel_ids = await asyncio.to_thread(self.write_crawl_batch, rankings, books)
+                    self._mark_books_fetched(saved_novel_ids)
+                    for key, value in batch_results.items():
+                        save_results[key] += value
+                except Exception as e:
+                    logger.error(f"流式写入失败，丢弃该微批: 榜单 {len(rankings)} 个，书籍 {len(books)} 个，错误: {e}")
+                rankings, books = [], []
+            if finished:
+                return
+
+    def _mark_books_fetched(self, novel_ids: List[int]) -> None:
+        """
+        书籍快照提交后再记入新鲜度索引，写入失败的书籍在下次爬取时仍会重新获取
+
+        :param novel_ids: 已提交快照的书籍ID
+        """
+        for novel_id in novel_ids:
+            self.freshness.mark_fetched(novel_id)
+
+    @classmethod
+    def write_crawl_batch(
+            cls, rankings: List[RankingParser], books: List[NovelPageParser]
+    ) -> Tuple[Dict[str, int], List[int]]:
+        """
+        使用独立的数据库会话写入一个批次并提交，出错时回滚后抛出异常
+        提交后递增接口响应缓存的数据版本号，使已缓存的榜单和书籍响应失效
+
+        :param rankings: 榜单解析结果
+        :param books: 书籍详情解析结果
+        :return: 保存结果统计，已写入快照的书籍ID
+        """
+        db = SessionLocal()
+        try:
+            save_results, saved_novel_ids = cls.save_crawl_batch(rankings, books, db)
+            db.commit()
+            get_response_cache().bump_version()
+            return save_results, saved_novel_ids
+        except Exception:
+            db.rollback()
+            raise
         finally:
             db.close()
 
+    @classmethod
+    def save_crawl_batch(
+            cls, rankings: List[RankingParser], books: List[NovelPageParser], db: Session
+    ) -> Tuple[Dict[str, int], List[int]]:
+        """
+        工作单元写入：在当前事务中保存一个爬取批次的榜单和书籍数据，不提交事务
+
+        调用方负责在全部写入完成后统一commit，出错时统一rollback
+        :param rankings: 榜单解析结果
+        :param books: 书籍详情解析结果
+        :param db: 数据库会话
+        :return: 保存结果统计，已写入快照的书籍ID
+        """
+        # 批量模式使用多行upsert，否则逐条写入
+        if crawler_config.bulk_ingest:
+            save_rankings, save_novels = cls.bulk_save_ranking_parsers, cls.bulk_save_novel_parsers
+        else:
+            save_rankings, save_novels = cls.save_ranking_parsers, cls.save_novel_parsers
+
+        ranking_snapshots_num = 0
+        saved_novel_ids: List[int] = []
+        if rankings:
+            _, ranking_snapshots_num = save_rankings(rankings, db)
+            logger.info(f"保存了 {len(rankings)} 个榜单，{ranking_snapshots_num} 个榜单快照")
+        else:
+            logger.info("没有榜单数据需要保存")
+        if books:
+            saved_novel_ids = save_novels(books, db)
+            logger.info(f"保存了 {len(books)} 个书籍，{len(saved_novel_ids)} 个书籍快照")
+        else:
+            logger.info("没有书籍数据需要保存")
+
+        return {
+            "rankings": len(rankings),
+            "ranking_snapshots": ranking_snapshots_num,
+            "books": len(books),
+            "books_snapshots": len(saved_novel_ids),
+        }, saved_novel_ids
+
     @staticmethod
     def save_ranking_parsers(rankings: List[RankingParser], db: Session) -> Tuple[int, int]:
         """
@@ -288,15 +537,16 @@ class CrawlFlow:
         for ranking in rankings:
             # 保存或更新榜单信息
             rank_record = ranking_service.create_or_update_ranking(
-                db, ranking.ranking_info
+                db, ranking.ranking_info, commit=False
             )
             ranking_snapshots = []
             batch_id = generate_batch_id()
             stored_ranking_snapshots += len(ranking.book_snapshots)
             for book in ranking.book_snapshots:
                 try:
-                    # 保存书籍
-                    book_record = book_service.create_or_update_book(db, book)
+                    # 每本书在独立的保存点中写入，失败只回滚该书籍
+                    with db.begin_nested():
+                        book_record = book_service.create_or_update_book(db, book, commit=False)
                     # 创建榜单快照记录
                     snapshot_data = {
                         "ranking_id": rank_record.id,
@@ -306,36 +556,33 @@ class CrawlFlow:
                     }
                     ranking_snapshots.append(snapshot_data)
                 except Exception as e:
-                    # 回滚当前事务，重新开始
-                    try:
-                        db.rollback()
-                    except Exception:
-                        pass  # 忽略回滚失败
                     logger.error(f"书籍保存异常，跳过该记录: {book.get('novel_id', 'unknown')}, 错误: {e}")
                     continue
 
             # 批量保存榜单快照
             if ranking_snapshots:
                 ranking_service.batch_create_ranking_snapshots(
-                    db, ranking_snapshots, batch_id
+                    db, ranking_snapshots, batch_id, commit=False
                 )
         return len(rankings), stored_ranking_snapshots
 
     @staticmethod
-    def save_novel_parsers(books: List[NovelPageParser], db: Session) -> int:
+    def save_novel_parsers(books: List[NovelPageParser], db: Session) -> List[int]:
         """
         保存书籍快照
         :param books:
         :param db:
-        :return:
+        :return: 写入快照的书籍ID，保存点回滚的书籍不包含在内
         """
         # 保存书籍快照
         book_snapshots = []
+        saved_books = []
         for book_data in books:
+            book_info = book_data.book_detail
             try:
-                # 保存或更新书籍基本信息
-                book_info = book_data.book_detail
-                book_record = book_service.create_or_update_book(db, book_info)
+                # 每本书在独立的保存点中写入，失败只回滚该书籍
+                with db.begin_nested():
+                    book_record = book_service.create_or_update_book(db, book_info, commit=False)
 
                 if book_record is None:
                     logger.warning(f"书籍保存失败，跳过该记录: {book_info.get('novel_id', 'unknown')}")
@@ -347,24 +594,123 @@ class CrawlFlow:
                     **book_info
                 }
                 book_snapshots.append(snapshot_data)
+                saved_books.append(book_record)
             except Exception as e:
-                # 回滚当前事务，重新开始
-                try:
-                    db.rollback()
-                except Exception:
-                    pass  # 忽略回滚失败
                 logger.error(f"书籍保存异常，跳过该记录: {book_info.get('novel_id', 'unknown')}, 错误: {e}")
                 continue
         # 批量保存书籍快照
         if book_snapshots:
-            book_service.batch_create_book_snapshots(db, book_snapshots)
-        return len(book_snapshots)
+            book_service.batch_create_book_snapshots(db, book_snapshots, commit=False)
+        return [book_record.novel_id for book_record in saved_books]
+
+    @staticmethod
+    def bulk_save_ranking_parsers(rankings: List[RankingParser], db: Session) -> Tuple[int, int]:
+        """
+        批量保存榜单记录、榜单中的书籍记录、榜单快照记录
+
+        所有榜单中的书籍先跨榜单去重，再通过多行upsert一次写入；
+        榜单同样批量upsert，并通过一次查询解析所有榜单ID
+        :param rankings:
+        :param db:
+        :return: 保存的榜单数量，保存的榜单快照数量
+        """
+        start_time = time.perf_counter()
+        hash_ids = ranking_service.bulk_upsert_rankings(db, [ranking.ranking_info for ranking in rankings])
+        saved_novel_ids = set(book_service.bulk_upsert_books(
+            db, [book for ranking in rankings for book in ranking.book_snapshots]
+        ))
+
+        ranking_snapshots = []
+        for ranking in rankings:
+            ranking_id = hash_ids.get(ranking.ranking_info.get("hash_id"))
+            if ranking_id is None:
+                logger.error(f"榜单保存失败，跳过该榜单: {ranking.ranking_info.get('rank_id', 'unknown')}")
+                continue
+            batch_id = generate_batch_id()
+            for book in ranking.book_snapshots:
+                novel_id = _parse_novel_id(book.get("novel_id"))
+                if novel_id not in saved_novel_ids:
+                    logger.error(f"书籍数据无效，跳过该记录: {book.get('novel_id', 'unknown')}")
+                    continue
+                ranking_snapshots.append({
+                    **book,
+                    "novel_id": novel_id,
+                    "ranking_id": ranking_id,
+                    "batch_id": batch_id,
+                })
+
+        # 批量保存榜单快照，同一榜单中重复出现的书籍只写入一次
+        stored_snapshots = 0
+        if ranking_snapshots:
+            stored_snapshots = ranking_service.batch_create_ranking_snapshots(db, ranking_snapshots, commit=False)
+
+        _log_ingest_rate("榜单", len(rankings) + len(saved_novel_ids) + stored_snapshots, start_time)
+        return len(rankings), stored_snapshots
+
+    @staticmethod
+    def bulk_save_novel_parsers(books: List[NovelPageParser], db: Session) -> List[int]:
+        """
+        批量保存书籍信息和书籍快照
+        :param books:
+        :param db:
+        :return: 写入快照的书籍ID
+        """
+        start_time = time.perf_counter()
+        book_infos = [book_data.book_detail for book_data in books]
+        saved_novel_ids = set(book_service.bulk_upsert_books(db, book_infos))
+
+        book_snapshots = []
+        for book_info in book_infos:
+            novel_id = _parse_novel_id(book_info.get("novel_id"))
+            if novel_id not in saved_novel_ids:
+                logger.warning(f"书籍保存失败，跳过该记录: {book_info.get('novel_id', 'unknown')}")
+                continue
+            book_snapshots.append({**book_info, "novel_id": novel_id})
+
+        # 批量保存书籍快照
+        if book_snapshots:
+            book_service.batch_create_book_snapshots(db, book_snapshots, commit=False)
+
+        _log_ingest_rate("书籍", len(saved_novel_ids) + len(book_snapshots), start_time)
+        return [snapshot["novel_id"] for snapshot in book_snapshots]
 
     async def close(self) -> None:
         """关闭资源"""
         await self.client.close()
 
 
+def create_request_limiter() -> AdaptiveLimiter:
+    """根据爬虫配置创建请求并发限制器，关闭自适应时为固定窗口"""
+    if not crawler_config.adaptive_concurrency:
+        return AdaptiveLimiter.fixed(crawler_config.max_concurrent_requests)
+    return AdaptiveLimiter(AdaptiveLimiterConfig(
+        initial_limit=crawler_config.max_concurrent_requests,
+        min_limit=crawler_config.adaptive_min_concurrency,
+        max_limit=max(crawler_config.adaptive_max_concurrency, crawler_config.max_concurrent_requests),
+        latency_threshold=crawler_config.adaptive_latency_threshold,
+    ))
+
+
+def _valid_novel_ids(novel_ids: List[Any]) -> List[Any]:
+    """过滤掉空值和无效的书籍ID"""
+    return [nid for nid in novel_ids if nid and str(nid).strip() and str(nid) != '0']
+
+
+def _parse_novel_id(novel_id: Any) -> int | None:
+    """将novel_id转换为整数，无效时返回None"""
+    try:
+        return int(novel_id)
+    except (ValueError, TypeError):
+        return None
+
+
+def _log_ingest_rate(label: str, rows: int, start_time: float) -> None:
+    """记录批量写入的行数和速率"""
+    elapsed = time.perf_counter() - start_time
+    rate = rows / elapsed if elapsed > 0 else float(rows)
+    logger.info(f"{label}批量写入 {rows} 行, 耗时 {elapsed:.3f}s, 速率 {rate:.0f} 行/秒")
+
+
 # 全局爬虫实例管理
 _craw_flow: CrawlFlow | None = None
 
@@ -380,12 +726,13 @@ def get_crawl_flow() -> CrawlFlow:
 def crawl_task_wrapper(page_ids: List[str]) -> Dict[str, Any]:
     """
     APScheduler任务包装函数 - 在同步上下文中运行异步任务
-    
-    修复Event loop问题：每次任务执行时创建新的CrawlFlow实例
-    
+
+    默认提交到常驻的爬虫运行时事件循环执行，复用CrawlFlow和HTTP连接池；
+    关闭persistent_runtime时，每次任务通过asyncio.run创建新的CrawlFlow实例
+
     Args:
         page_ids: 页面ID列表
-        
+
     Returns:
         爬取结果字典
     """
@@ -401,8 +748,12 @@ def crawl_task_wrapper(page_ids: List[str]) -> Dict[str, Any]:
             await crawl_flow.close()
 
     try:
-        # 在同步上下文中运行异步任务
-        result = asyncio.run(async_crawl_task())
+        if crawler_config.persistent_runtime:
+            from app.crawl.runtime import get_crawler_runtime
+            result = get_crawler_runtime().run_crawl(page_ids, crawler_config.runtime_job_timeout)
+        else:
+            # 在同步上下文中运行异步任务
+            result = asyncio.run(async_crawl_task())
 
         logger.info(f"爬取任务包装函数执行完成：成功={result.get('success', False)}")
         return result
@@ -130,6 +130,18 @@ class CrawlTask:
         template = self.templates.get("novel_detail")
         return template.format(novel_id=novel_id)
 
+    def match_template(self, url: str) -> str | None:
+        """
+        根据URL匹配所属的模板名称（按模板中查询参数之前的部分匹配）
+
+        :param url: 请求URL
+        :return: 模板名称，如novel_detail，无匹配时返回None
+        """
+        for template_name, template in self.templates.items():
+            if url.startswith(template.split("?", 1)[0].split("{", 1)[0]):
+                return template_name
+        return None
+
 
 _crawl_task: CrawlTask | None = None
 
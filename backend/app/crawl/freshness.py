@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+书籍详情新鲜度索引 - 跨爬取任务跳过近期已获取的书籍
+
+以novel_id为键记录最近一次获取书籍详情的时间，进程内使用LRU缓存，
+缓存未命中时回源到数据库中该书最新的BookSnapshot.snapshot_time。
+夹子榜和分类页任务共享同一个进程级索引，避免短时间内重复请求同一本书。
+"""
+
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import get_settings
+from app.database.connection import SessionLocal
+from app.database.service.book_service import BookService
+from app.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class FreshnessIndex:
+    """
+    书籍详情新鲜度索引
+
+    特性：
+    - TTL判定：获取时间在窗口内的书籍视为新鲜
+    - 进程内LRU缓存，超过容量时淘汰最久未使用的记录
+    - 缓存未命中时批量回源数据库最新快照时间
+    - 线程安全，调度器多个工作线程共享同一实例
+    """
+
+    def __init__(self, ttl_seconds: int, max_size: int = 50000):
+        """
+        :param ttl_seconds: 新鲜度窗口（秒），0表示禁用
+        :param max_size: LRU缓存最大条目数
+        """
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.max_size = max_size
+        self._fetched_at: OrderedDict[int, datetime] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl.total_seconds() > 0
+
+    def mark_fetched(self, novel_id: Any, fetched_at: Optional[datetime] = None) -> None:
+        """
+        记录书籍详情的获取时间
+
+        :param novel_id: 书籍ID
+        :param fetched_at: 获取时间，默认当前时间
+        """
+        key = _to_key(novel_id)
+        if key is None:
+            return
+        with self._lock:
+            self._put(key, fetched_at or datetime.now())
+
+    def is_fresh(self, novel_id: Any, now: Optional[datetime] = None) -> bool:
+        """
+        判断书籍是否在新鲜度窗口内被获取过（只查询进程内缓存）
+
+        :param novel_id: 书籍ID
+        :param now: 当前时间，默认datetime.now()
+        :return: 是否新鲜
+        """
+        key = _to_key(novel_id)
+        if key is None or not self.enabled:
+            return False
+        with self._lock:
+            fetched_at = self._fetched_at.get(key)
+            if fetched_at is None:
+                return False
+            self._fetched_at.move_to_end(key)
+        return (now or datetime.now()) - fetched_at < self.ttl
+
+    def warm(self, novel_ids: List[Any]) -> None:
+        """
+        为缓存中不存在的书籍回源数据库最新快照时间
+
+        :param novel_ids: 书籍ID列表
+        """
+        with self._lock:
+            missing = [key for key in map(_to_key, novel_ids) if key is not None and key not in self._fetched_at]
+        if not missing:
+            return
+        try:
+            with SessionLocal() as db:
+                latest_times = BookService.get_latest_snapshot_times(db, missing)
+        except Exception as e:
+            logger.warning(f"新鲜度索引回源数据库失败，按未获取处理: {e}")
+            return
+        with self._lock:
+            for key, snapshot_time in latest_times.items():
+                # 不覆盖回源期间新记录的更近时间
+                current = self._fetched_at.get(key)
+                if current is None or current < snapshot_time:
+                    self._put(key, snapshot_time)
+
+    def partition(self, novel_ids: List[Any]) -> Tuple[List[Any], List[Any]]:
+        """
+        将书籍ID划分为需要获取的和新鲜的两部分，保持原有顺序
+
+        :param novel_ids: 书籍ID列表
+        :return: (需要获取的书籍ID, 新鲜的书籍ID)
+        """
+        if not self.enabled or not novel_ids:
+            return list(novel_ids), []
+        self.warm(novel_ids)
+        now = datetime.now()
+        stale, fresh = [], []
+        for novel_id in novel_ids:
+            (fresh if self.is_fresh(novel_id, now) else stale).append(novel_id)
+        return stale, fresh
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._fetched_at.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取统计信息"""
+        with self._lock:
+            return {
+                "size": len(self._fetched_at),
+                "max_size": self.max_size,
+                "ttl_seconds": int(self.ttl.total_seconds()),
+            }
+
+    def _put(self, key: int, fetched_at: datetime) -> None:
+        """写入缓存并按LRU淘汰，调用方需持有锁"""
+        self._fetched_at[key] = fetched_at
+        self._fetched_at.move_to_end(key)
+        while len(self._fetched_at) > self.max_size:
+            self._fetched_at.popitem(last=False)
+
+
+def _to_key(novel_id: Any) -> Optional[int]:
+    """将novel_id统一转换为整数键，无效时返回None"""
+    try:
+        return int(novel_id)
+    except (ValueError, TypeError):
+        return None
+
+
+# 全局新鲜度索引实例
+_freshness_index: Optional[FreshnessIndex] = None
+_freshness_index_lock = threading.Lock()
+
+
+def get_freshness_index() -> FreshnessIndex:
+    """获取全局新鲜度索引实例（单例模式）"""
+    global _freshness_index
+    if _freshness_index is None:
+        with _freshness_index_lock:
+            if _freshness_index is None:
+                crawler_config = get_settings().crawler
+                _freshness_index = FreshnessIndex(
+                    crawler_config.freshness_ttl, crawler_config.freshness_max_size
+                )
+    return _freshness_index
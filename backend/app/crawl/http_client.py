@@ -13,14 +13,21 @@ Updated: 2025/8/20 - 集成熔断器和重试机制
 
 import asyncio
 import json
-from typing import Any, Dict, List, Union
+import time
+from contextlib import nullcontext
+from typing import Any, Dict, List, Optional, Union
 
 from httpx import AsyncClient, HTTPError, HTTPStatusError, Limits, Timeout
 from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential
 
 from app.config import settings
+from app.crawl.adaptive_limiter import AdaptiveLimiter, is_overload_error
 from app.crawl.circuit_breaker import CircuitBreakerOpenException, prepare_for_request, report_request_success, \
     report_service_error
+from app.crawl.payload_decoder import PayloadDecoder, PayloadSchemaError, get_payload_decoder
+from app.crawl.rate_limiter import get_rate_limiter
+from app.crawl.request_coalescer import get_request_coalescer
+from app.crawl.response_store import ResponseStore, get_response_store
 from app.logger import get_logger
 
 logger = get_logger(__name__)
@@ -36,21 +43,19 @@ def should_retry_request(exception) -> bool:
     - 熔断器开启：不重试（由熔断器管理）
     - 其他错误：不重试
     """
-    # 检查是否为服务不可用错误（503）
+    # 检查是否为服务不可用错误（503），熔断器报告在请求执行时由并发限制器决定
     if isinstance(exception, HTTPStatusError) and exception.response.status_code == 503:
-        # 在异步环境中报告服务错误给熔断器
         logger.error(f"HTTP客户端检测到服务错误: {exception}")
-        loop = asyncio.get_event_loop()
-        if loop.is_running():
-            loop.create_task(report_service_error())
-        else:
-            asyncio.run(report_service_error())
         logger.info("服务不可用错误，将在熔断器恢复后重试")
         return True
 
     if isinstance(exception, CircuitBreakerOpenException):
         return False  # 熔断器开启时不重试
 
+    if isinstance(exception, PayloadSchemaError):
+        logger.error(f"响应结构不一致，不重试: {exception}")
+        return False
+
     # 检查是否为可重试的网络错误
     if isinstance(exception, (ValueError, KeyError, HTTPError, TimeoutError, json.JSONDecodeError)):
         logger.info(f"网络错误，将进行重试: {type(exception).__name__}")
@@ -69,15 +74,25 @@ class HttpClient:
     - 内置熔断器保护，自动处理503错误
     - 网络错误自动重试机制
     - 统一的错误处理和结果格式
-    - 自动JSON解析
+    - 自动JSON解析，可选按接口的类型化结构快速解码
+    - 进程级请求合并，并发的相同URL请求共享一次获取
+    - 每次请求尝试占用自适应并发限制器的名额，并反馈延迟和过载
+    - 条件请求，响应未变化（304）时使用本地保存的响应体
     """
 
-    def __init__(self):
+    def __init__(self, limiter: Optional[AdaptiveLimiter] = None):
         """
         初始化HTTP客户端
+
+        :param limiter: 并发限制器，为None时不限制并发（由上层控制）
         """
         self._config = settings.crawler
         self._client = None  # 延迟创建，避免事件循环绑定问题
+        self._limiter = limiter
+        self.response_store: Optional[ResponseStore] = (
+            get_response_store() if self._config.conditional_requests else None
+        )
+        self._decoder: PayloadDecoder = get_payload_decoder(self._config.fast_decode)
 
     async def run(self, urls: Union[str, List[str]]) -> Union[Dict[str, Any], List[Dict[str, Any]]]:
         """
@@ -89,7 +104,7 @@ class HttpClient:
         """
 
         if isinstance(urls, str):
-            return await self._execute_single_request(urls)
+            return await self._fetch(urls)
         if not urls:
             return []
         # 统一使用顺序处理，并发由上层控制
@@ -106,11 +121,11 @@ class HttpClient:
 
     def _create_http_client(self) -> AsyncClient | None:
         """创建优化的HTTP客户端"""
-        # 连接池配置
+        # 连接池配置，由CrawlerSettings（或其配置档位）决定
         limits = Limits(
-            max_keepalive_connections=10,  # 降低连接池大小
-            max_connections=15,
-            keepalive_expiry=30
+            max_keepalive_connections=self._config.max_keepalive_connections,
+            max_connections=self._config.max_connections,
+            keepalive_expiry=self._config.keepalive_expiry
         )
 
         # 超时配置
@@ -137,7 +152,13 @@ class HttpClient:
             "Connection": "keep-alive"
         }
 
+        # HTTP/2禁止Connection等逐跳头部
+        http2 = self._http2_available()
+        if http2:
+            browser_headers.pop("Connection")
+
         client = AsyncClient(
+            http2=http2,
             limits=limits,
             timeout=timeout,
             follow_redirects=True,
@@ -147,9 +168,26 @@ class HttpClient:
 
         return client
 
-    def _parse_json_response(self, response) -> Dict[str, Any]:
+    async def _fetch(self, url: str) -> Dict[str, Any]:
+        """获取单个URL，启用请求合并时与其他任务共享进行中的请求和短期缓存"""
+        if not self._config.request_coalescing:
+            return await self._execute_single_request(url)
+        return await get_request_coalescer().fetch(url, lambda: self._execute_single_request(url))
+
+    def _http2_available(self) -> bool:
+        """是否启用HTTP/2，配置开启但未安装h2时回退HTTP/1.1"""
+        if not self._config.http2:
+            return False
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            logger.warning("已配置HTTP/2但未安装h2，回退使用HTTP/1.1，可通过 pip install 'httpx[http2]' 安装")
+            return False
+        return True
+
+    def _parse_json_response(self, url: str, response) -> Dict[str, Any]:
         """解析JSON响应内容"""
-        return json.loads(response.content)
+        return self._decoder.decode(url, response.content)
 
     async def _ensure_client_ready(self):
         """确保 HTTP 客户端已初始化并准备就绪"""
@@ -168,8 +206,9 @@ class HttpClient:
         
         请求流程：
         1. 检查熔断器状态，等待恢复如有需要
-        2. 执行HTTP请求
-        3. 解析响应并记录成功
+        2. 按接口族获取限速令牌
+        3. 占用并发名额执行HTTP请求（有本地响应时为条件请求），向并发限制器反馈延迟或过载
+        4. 解析响应（304时使用本地响应体）并记录成功
         """
         # 检查熔断器状态，等待恢复如有需要
         await prepare_for_request()
@@ -177,18 +216,63 @@ class HttpClient:
         # 确保客户端已创建
         await self._ensure_client_ready()
 
-        # 执行HTTP请求
-        response = await self._client.get(url)
-        response.raise_for_status()
+        # 按接口族限速，每次尝试（包括重试）都消耗令牌，等待令牌时不占用并发名额
+        if self._config.rate_limit_enabled:
+            await get_rate_limiter().acquire(url)
+
+        # 携带本地响应的校验器发起条件请求
+        headers = self.response_store.conditional_headers(url) if self.response_store else {}
+
+        # 执行HTTP请求，每次尝试单独占用并发名额，重试等待期间不占用
+        async with self._limiter.slot() if self._limiter else nullcontext():
+            start_time = time.monotonic()
+            try:
+                response = await self._client.get(url, headers=headers) if headers else await self._client.get(url)
+                if response.status_code != 304:
+                    response.raise_for_status()
+            except Exception as e:
+                await self._record_failure(e)
+                raise
+            if self._limiter:
+                self._limiter.record_success(time.monotonic() - start_time)
 
         # 解析响应内容
-        result = self._parse_json_response(response)
+        if response.status_code == 304:
+            result = self._load_not_modified(url, headers)
+        else:
+            result = self._parse_json_response(url, response)
+            if self.response_store:
+                self.response_store.save(
+                    url, response.headers.get("ETag"), response.headers.get("Last-Modified"), response.content
+                )
 
         # 报告请求成功
         await report_request_success()
 
         return result
 
+    def _load_not_modified(self, url: str, headers: Dict[str, str]) -> Dict[str, Any]:
+        """
+        响应未变化时读取本地响应体，本地响应损坏时删除并抛出异常以重试完整请求
+        """
+        content = self.response_store.load_body(url)
+        if content is None:
+            self.response_store.discard(url)
+            raise ValueError(f"响应未变化但本地响应体不可用: {url}")
+        self.response_store.remember_validator(url, headers.get("If-None-Match") or headers.get("If-Modified-Since"))
+        logger.debug(f"响应未变化，使用本地响应: {url}")
+        return self._decoder.decode(url, content)
+
+    async def _record_failure(self, exception: Exception) -> None:
+        """
+        记录请求失败：过载错误先收缩并发窗口，窗口已在下限时才报告给熔断器
+        """
+        if not is_overload_error(exception):
+            return
+        reason = f"上游过载({type(exception).__name__})"
+        if self._limiter is None or self._limiter.record_overload(reason):
+            await report_service_error()
+
     async def _request_sequential(self, urls: List[str]) -> List[Dict[str, Any]]:
         """
         顺序执行多个HTTP请求 - 每个请求都经过熔断器和重试机制
@@ -201,6 +285,6 @@ class HttpClient:
                 await asyncio.sleep(self._config.request_delay)
 
             # 每个请求都经过熔断器和重试保护
-            result = await self._execute_single_request(url)
+            result = await self._fetch(url)
             results.append(result)
         return results
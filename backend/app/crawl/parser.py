@@ -2,11 +2,94 @@
 统一数据解析器 - 简化版本
 """
 import itertools
+from collections.abc import Mapping
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional
 
 from ..utils import extract_number, update_dict
 
+# 榜单书籍字段的两种键名风格（驼峰和全小写，不同榜单甚至同一条数据中会混用），每个榜单只检测一次
+# 顺序为 novel_id, title, author_id, author_name
+CAMEL_BOOK_KEYS = ("novelId", "novelName", "authorId", "authorName")
+LOWER_BOOK_KEYS = ("novelid", "novelname", "authorid", "authorname")
+
+
+class SlotRecord(Mapping):
+    """
+    使用__slots__保存字段的解析记录
+
+    相比字典每条记录不再携带独立的哈希表，内存更小、构造更快；
+    同时实现Mapping接口，下游仍可以使用record["key"]、record.get()、**record和dict(record)
+    """
+
+    __slots__ = ()
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key not in self.__slots__:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.__slots__)
+
+    def __len__(self) -> int:
+        return len(self.__slots__)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({dict(self)!r})"
+
+    def replace(self, **changes) -> "SlotRecord":
+        """
+        复制记录并替换部分字段
+        :param changes: 需要替换的字段
+        :return: 新记录
+        """
+        return type(self)(**{**self, **changes})
+
+
+class BookRecord(SlotRecord):
+    """榜单中的书籍基础信息"""
+
+    __slots__ = ("position", "novel_id", "title", "author_id", "author_name", "snapshot_time")
+
+    def __init__(self, position: int, novel_id: Any, title: Optional[str], author_id: Any,
+                 author_name: Optional[str], snapshot_time: datetime):
+        self.position = position
+        self.novel_id = novel_id
+        self.title = title
+        self.author_id = author_id
+        self.author_name = author_name
+        self.snapshot_time = snapshot_time
+
+
+class NovelRecord(SlotRecord):
+    """书籍详情"""
+
+    __slots__ = ("novel_id", "title", "author_id", "author_name", "status", "word_counts", "chapter_counts",
+                 "vip_chapter_id", "favorites", "clicks", "comments", "nutrition", "snapshot_time")
+
+    def __init__(self, novel_id: Any, title: Optional[str], author_id: Any, author_name: Optional[str],
+                 status: Optional[str], word_counts: int, chapter_counts: int, vip_chapter_id: int,
+                 favorites: int, clicks: int, comments: int, nutrition: int, snapshot_time: datetime):
+        self.novel_id = novel_id
+        self.title = title
+        self.author_id = author_id
+        self.author_name = author_name
+        self.status = status
+        self.word_counts = word_counts
+        self.chapter_counts = chapter_counts
+        self.vip_chapter_id = vip_chapter_id
+        self.favorites = favorites
+        self.clicks = clicks
+        self.comments = comments
+        self.nutrition = nutrition
+        self.snapshot_time = snapshot_time
+
 
 class RankingParser:
     """
@@ -15,7 +98,7 @@ class RankingParser:
 
     def __init__(self, page_id: str):
         self.ranking_info = {}
-        self.book_snapshots: List[Dict] = []
+        self.book_snapshots: List[BookRecord] = []
         self.sub_rankings: List = []
         self.has_sub_ranking = False
         self.page_id = page_id
@@ -47,9 +130,22 @@ class RankingParser:
             self.sub_rankings = data_list
             return
 
-        # 解析榜单书籍信息
-        for index, book_data in enumerate(data_list):
-            self.book_snapshots.append(self._parse_book_basic_info(index, book_data))
+        # 解析榜单书籍信息，同一榜单的书籍共用一次检测出的键名和同一个快照时间
+        if not data_list:
+            return
+        novel_id_key, title_key, author_id_key, author_name_key = self._detect_book_keys(data_list[0])
+        snapshot_time = datetime.now()
+        self.book_snapshots.extend([
+            BookRecord(
+                index,
+                book_data.get(novel_id_key),
+                book_data.get(title_key),
+                book_data.get(author_id_key) or 0,
+                book_data.get(author_name_key) or None,
+                snapshot_time,
+            )
+            for index, book_data in enumerate(data_list)
+        ])
 
     def _get_ranking_data(self, raw_data: Dict) -> List[Dict]:
         """
@@ -100,21 +196,16 @@ class RankingParser:
         return res
 
     @staticmethod
-    def _parse_book_basic_info(index: int, raw_basic_data: Dict) -> Dict:
+    def _detect_book_keys(raw_basic_data: Dict) -> tuple:
         """
-        解析书籍基础信息
-        :param index:
+        根据榜单第一本书逐字段检测键名风格，两种都不存在时使用驼峰键名
         :param raw_basic_data:
-        :return:
+        :return: 书籍字段键名元组
         """
-        return {
-            "position": index,
-            "novel_id": raw_basic_data.get("novelId") or raw_basic_data.get("novelid"),
-            "title": raw_basic_data.get("novelName") or raw_basic_data.get("novelname"),
-            "author_id": raw_basic_data.get("authorId") or raw_basic_data.get("authorid") or 0,
-            "author_name": raw_basic_data.get("authorName") or raw_basic_data.get("authorname") or None,
-            "snapshot_time": datetime.now()
-        }
+        return tuple(
+            lower if camel not in raw_basic_data and lower in raw_basic_data else camel
+            for camel, lower in zip(CAMEL_BOOK_KEYS, LOWER_BOOK_KEYS)
+        )
 
     @staticmethod
     def _jiazi_info() -> Dict:
@@ -177,30 +268,31 @@ class NovelPageParser:
     解析书籍详情网页爬取信息
     """
 
-    def __init__(self, raw_detail_data: Dict = None):
-        self.book_detail = {}
+    def __init__(self, raw_detail_data: Dict = None, snapshot_time: Optional[datetime] = None):
+        self.book_detail: NovelRecord | Dict = {}
         if raw_detail_data:
-            self.parse_novel_info(raw_detail_data)
+            self.parse_novel_info(raw_detail_data, snapshot_time)
 
-    def parse_novel_info(self, raw_detail_data: Dict):
+    def parse_novel_info(self, raw_detail_data: Dict, snapshot_time: Optional[datetime] = None):
         """
         解析信息
         :param raw_detail_data:
+        :param snapshot_time: 批次快照时间，为空时取当前时间
         :return:
         """
-
-        self.book_detail = {
-            "novel_id": raw_detail_data.get("novelId", None),
-            "title": raw_detail_data.get("novelName", None),
-            "author_id": raw_detail_data.get("authorId", 0),
-            "author_name": raw_detail_data.get("authorName", None),
-            "status": raw_detail_data.get("series", None),
-            "word_counts": extract_number(raw_detail_data.get("novelSize")),
-            "chapter_counts": extract_number(raw_detail_data.get("novelChapterCount")),
-            "vip_chapter_id": extract_number(raw_detail_data.get("vipChapterid")),
-            "favorites": extract_number(raw_detail_data.get("novelbefavoritedcount")),
-            "clicks": extract_number(raw_detail_data.get("novip_clicks")),
-            "comments": extract_number(raw_detail_data.get("comment_count")),
-            "nutrition": extract_number(raw_detail_data.get("nutrition_novel")),
-            "snapshot_time": datetime.now()
-        }
+        get = raw_detail_data.get
+        self.book_detail = NovelRecord(
+            get("novelId"),
+            get("novelName"),
+            get("authorId", 0),
+            get("authorName"),
+            get("series"),
+            extract_number(get("novelSize")),
+            extract_number(get("novelChapterCount")),
+            extract_number(get("vipChapterid")),
+            extract_number(get("novelbefavoritedcount")),
+            extract_number(get("novip_clicks")),
+            extract_number(get("comment_count")),
+            extract_number(get("nutrition_novel")),
+            snapshot_time or datetime.now(),
+        )
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+响应解码模块 - 按上游接口的类型化结构快速解码JSON
+
+已安装msgspec时，榜单页面和书籍详情响应按payload_schema中的结构解码，只构造解析器需要的字段，
+结构不一致（上游字段类型变化）时抛出PayloadSchemaError；其他接口使用msgspec的通用JSON解码。
+未安装msgspec或未开启fast_decode时回退json.loads，返回完整的响应字典。
+"""
+
+import importlib.util
+import json
+import threading
+from typing import Any, Dict, Optional
+
+from app.crawl.crawl_task import get_crawl_task
+from app.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class PayloadSchemaError(ValueError):
+    """上游响应与类型化结构不一致，重试无法恢复，需要更新payload_schema"""
+
+
+def msgspec_available() -> bool:
+    """检查是否安装了msgspec"""
+    return importlib.util.find_spec("msgspec") is not None
+
+
+class PayloadDecoder:
+    """
+    按URL所属的接口族选择解码器
+
+    解码器在初始化时按结构编译一次，之后所有请求复用
+    """
+
+    def __init__(self, fast_decode: bool = True):
+        """
+        :param fast_decode: 是否使用msgspec解码，未安装msgspec时忽略
+        """
+        self._msgspec = None
+        self._decoders: Dict[str, Any] = {}
+        self._generic_decoder = None
+        if not fast_decode:
+            return
+        if not msgspec_available():
+            logger.warning("已配置快速解码但未安装msgspec，回退使用json，可通过 pip install 'jjcrawler[fastjson]' 安装")
+            return
+
+        import msgspec
+
+        from app.crawl.payload_schema import PAYLOAD_SCHEMAS
+
+        self._msgspec = msgspec
+        self._decoders = {name: msgspec.json.Decoder(schema) for name, schema in PAYLOAD_SCHEMAS.items()}
+        self._generic_decoder = msgspec.json.Decoder()
+
+    @property
+    def enabled(self) -> bool:
+        """是否使用msgspec解码"""
+        return self._msgspec is not None
+
+    def decode(self, url: str, content: bytes | str) -> Dict[str, Any]:
+        """
+        解码响应内容
+
+        :param url: 请求URL，用于匹配接口族
+        :param content: 响应体
+        :return: 响应字典，类型化解码时只包含结构中声明且存在的字段
+        :raises PayloadSchemaError: 响应与类型化结构不一致
+        :raises ValueError: 响应不是合法的JSON
+        """
+        if self._msgspec is None:
+            return json.loads(content)
+
+        decoder = self._decoders.get(get_crawl_task().match_template(url))
+        if decoder is None:
+            try:
+                return self._generic_decoder.decode(content)
+            except self._msgspec.DecodeError as e:
+                raise ValueError(f"响应JSON解析失败: {url}, {e}") from e
+
+        try:
+            payload = decoder.decode(content)
+        except self._msgspec.ValidationError as e:
+            raise PayloadSchemaError(f"响应结构与{decoder.type.__name__}不一致: {url}, {e}") from e
+        except self._msgspec.DecodeError as e:
+            raise ValueError(f"响应JSON解析失败: {url}, {e}") from e
+        return self._msgspec.to_builtins(payload)
+
+
+# 全局解码器实例
+_payload_decoder: Optional[PayloadDecoder] = None
+_payload_decoder_lock = threading.Lock()
+
+
+def get_payload_decoder(fast_decode: bool = True) -> PayloadDecoder:
+    """
+    获取解码器实例（单例模式），未开启快速解码时返回回退json的解码器
+
+    :param fast_decode: 是否使用msgspec解码
+    """
+    global _payload_decoder
+    if not fast_decode:
+        return PayloadDecoder(fast_decode=False)
+    if _payload_decoder is None:
+        with _payload_decoder_lock:
+            if _payload_decoder is None:
+                _payload_decoder = PayloadDecoder()
+    return _payload_decoder
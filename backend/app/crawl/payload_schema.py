@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+上游接口响应的类型化结构
+
+getFullPageV1（page_ranking）、favObservationByDate（jiazi_ranking）、novelbasicinfo（novel_detail）
+三个接口的响应按这里的msgspec结构解码：只声明解析器用到的字段，其余字段和子树（封面、简介、
+data_random等）在解码时直接跳过；已声明字段的类型与上游不一致时抛出msgspec.ValidationError。
+
+结构使用上游原始键名，omit_defaults=True使转换为字典时不包含缺失的字段，
+解析器按键名风格检测的逻辑因此保持不变。
+
+本模块依赖可选依赖msgspec（pip install jjcrawler[fastjson]），只应由payload_decoder在已安装时导入。
+"""
+
+from __future__ import annotations
+
+import msgspec
+
+# 上游的ID类字段有时是字符串、有时是整数
+Identifier = str | int | None
+# 合并展示的子榜单使用多个榜单ID组成的列表
+RankIdentifier = str | int | list[str | int] | None
+
+
+class RankingEntry(msgspec.Struct, omit_defaults=True):
+    """
+    榜单数据中的一个条目
+
+    上游在同一层级混用榜单、子榜单和书籍三种条目（有channelName的为子榜单），因此合并为一个递归结构
+    """
+
+    # 榜单、子榜单字段
+    rankid: RankIdentifier = None
+    rank_group_type: Identifier = None
+    channelMoreId: Identifier = None
+    channelName: str | None = None
+    data: list[RankingEntry] | RankingEntry | None = None
+    entries: list[RankingEntry] | None = msgspec.field(default=None, name="list")
+
+    # 书籍字段，键名有驼峰和全小写两种风格
+    novelId: Identifier = None
+    novelid: Identifier = None
+    novelName: str | None = None
+    novelname: str | None = None
+    authorId: Identifier = None
+    authorid: Identifier = None
+    authorName: str | None = None
+    authorname: str | None = None
+
+
+class RankingPage(msgspec.Struct, omit_defaults=True):
+    """榜单页面响应，夹子榜的data为单个对象，其他页面为榜单列表"""
+
+    code: Identifier = None
+    message: str | None = None
+    data: list[RankingEntry] | RankingEntry | None = None
+
+
+class NovelDetail(msgspec.Struct, omit_defaults=True):
+    """书籍详情响应，数值字段可能是带千分位或单位的字符串，由解析器提取数字"""
+
+    novelId: Identifier = None
+    novelName: str | None = None
+    authorId: Identifier = None
+    authorName: str | None = None
+    series: str | None = None
+    novelSize: Identifier = None
+    novelChapterCount: Identifier = None
+    vipChapterid: Identifier = None
+    novelbefavoritedcount: Identifier = None
+    novip_clicks: Identifier = None
+    comment_count: Identifier = None
+    nutrition_novel: Identifier = None
+
+
+# URL模板名称到响应结构的映射
+PAYLOAD_SCHEMAS = {
+    "page_ranking": RankingPage,
+    "jiazi_ranking": RankingPage,
+    "novel_detail": NovelDetail,
+}
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+令牌桶限速模块 - 按上游接口族分别限制请求速率
+
+每个URL模板（novel_detail、jiazi_ranking、page_ranking）对应一个独立的令牌桶，
+速率和突发容量来自CrawlerSettings.rate_limits。令牌桶是进程级的并且线程安全，
+调度器中并发执行的多个任务共享同一个请求速率上限。
+"""
+
+import asyncio
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from app.config import get_settings
+from app.crawl.crawl_task import get_crawl_task
+from app.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class TokenBucket:
+    """
+    线程安全的令牌桶
+
+    采用预约方式：取令牌时立即扣减（允许为负），并返回需要等待的时间，
+    等待方按预约顺序依次放行，不会出现惊群。
+    """
+
+    def __init__(self, rate: float, burst: int):
+        """
+        :param rate: 每秒补充的令牌数
+        :param burst: 桶容量，即允许的最大突发请求数
+        """
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        预约一个令牌
+
+        :return: 需要等待的时间（秒），0表示可以立即请求
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(float(self.burst), self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    async def acquire(self) -> None:
+        """获取一个令牌，不足时异步等待"""
+        wait_time = self.reserve()
+        if wait_time > 0:
+            await asyncio.sleep(wait_time)
+
+
+class EndpointRateLimiter:
+    """按URL模板分组的令牌桶集合，未配置的接口不限速"""
+
+    def __init__(self, rate_limits: Dict[str, Any]):
+        """
+        :param rate_limits: 模板名称到限速配置（rate、burst）的映射
+        """
+        self._buckets: Dict[str, TokenBucket] = {
+            name: TokenBucket(limit.rate, limit.burst) for name, limit in rate_limits.items()
+        }
+
+    async def acquire(self, url: str) -> None:
+        """
+        按URL所属的接口族获取令牌
+
+        :param url: 请求URL
+        """
+        bucket = self._buckets.get(get_crawl_task().match_template(url))
+        if bucket is not None:
+            await bucket.acquire()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取各令牌桶配置"""
+        return {name: {"rate": b.rate, "burst": b.burst} for name, b in self._buckets.items()}
+
+
+# 全局限速器实例
+_rate_limiter: Optional[EndpointRateLimiter] = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> EndpointRateLimiter:
+    """获取全局限速器实例（单例模式）"""
+    global _rate_limiter
+    if _rate_limiter is None:
+        with _rate_limiter_lock:
+            if _rate_limiter is None:
+                _rate_limiter = EndpointRateLimiter(get_settings().crawler.rate_limits)
+    return _rate_limiter
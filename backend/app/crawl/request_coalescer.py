@@ -0,0 +1,191 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+请求合并模块 - 进程级single-flight和短期响应缓存
+
+调度器的多个爬取任务在不同线程中各自通过asyncio.run创建事件循环，
+同一时刻可能请求相同的书籍URL。这里用线程锁保护的in-flight表让并发的
+相同请求共享一次获取，结果通过concurrent.futures.Future跨事件循环传递，
+并在短时间内缓存成功的响应。
+"""
+
+import asyncio
+import concurrent.futures
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from app.config import get_settings
+from app.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class RequestCoalescer:
+    """
+    进程级请求合并器
+
+    特性：
+    - 相同key的并发请求只执行一次，其余请求等待共享结果
+    - 跨线程、跨事件循环共享，单个等待方被取消不影响其他等待方
+    - 成功的响应缓存cache_ttl秒，失败不缓存
+    - 结果只在被缓存或与其他请求共享时复制，单独的请求直接返回原对象
+    """
+
+    def __init__(self, cache_ttl: float = 0.0, max_size: int = 2000):
+        """
+        :param cache_ttl: 响应缓存时间（秒），0表示只合并并发请求不缓存
+        :param max_size: 响应缓存最大条目数
+        """
+        self.cache_ttl = cache_ttl
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, concurrent.futures.Future] = {}
+        # 进行中的请求被合并的次数，发起方据此判断结果是否与其他请求共享
+        self._followers: Dict[str, int] = {}
+        self._cache: OrderedDict[str, Tuple[float, Any]] = OrderedDict()
+
+        # 统计信息
+        self._stats = {"fetches": 0, "coalesced": 0, "cache_hits": 0}
+
+    async def fetch(self, key: str, fetcher: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        获取key对应的结果，相同key的并发调用共享一次fetcher执行
+
+        :param key: 请求标识，通常为URL
+        :param fetcher: 实际执行请求的协程函数
+        :return: 请求结果（调用方之间互不共享同一对象）
+        """
+        with self._lock:
+            cached = self._get_cached(key)
+            if cached is not None:
+                self._stats["cache_hits"] += 1
+                return copy.deepcopy(cached)
+            shared = self._inflight.get(key)
+            is_leader = shared is None
+            if is_leader:
+                shared = concurrent.futures.Future()
+                self._inflight[key] = shared
+                self._stats["fetches"] += 1
+            else:
+                self._followers[key] = self._followers.get(key, 0) + 1
+                self._stats["coalesced"] += 1
+
+        if not is_leader:
+            logger.debug(f"合并进行中的请求: {key}")
+            try:
+                return copy.deepcopy(await _wait_shared(shared))
+            except asyncio.CancelledError:
+                # 发起方被取消而当前任务未被取消时，自行重新获取
+                if shared.cancelled() and not asyncio.current_task().cancelling():
+                    return await self.fetch(key, fetcher)
+                raise
+
+        try:
+            result = await fetcher()
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+                self._followers.pop(key, None)
+            if isinstance(e, asyncio.CancelledError):
+                shared.cancel()
+            else:
+                shared.set_exception(e)
+            raise
+
+        with self._lock:
+            self._inflight.pop(key, None)
+            shared_with_followers = self._followers.pop(key, 0) > 0
+            if self.cache_ttl > 0:
+                self._put_cached(key, result)
+        shared.set_result(result)
+        # 缓存中的对象和其他等待方拿到的对象不能被调用方修改
+        if shared_with_followers or self.cache_ttl > 0:
+            return copy.deepcopy(result)
+        return result
+
+    def clear(self) -> None:
+        """清空响应缓存和统计信息"""
+        with self._lock:
+            self._cache.clear()
+            self._stats = {key: 0 for key in self._stats}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取统计信息"""
+        with self._lock:
+            return {
+                **self._stats,
+                "inflight": len(self._inflight),
+                "cached": len(self._cache),
+                "cache_ttl": self.cache_ttl,
+            }
+
+    def _get_cached(self, key: str) -> Optional[Any]:
+        """读取未过期的缓存，调用方需持有锁"""
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return value
+
+    def _put_cached(self, key: str, value: Any) -> None:
+        """写入缓存并按LRU淘汰，调用方需持有锁"""
+        self._cache[key] = (time.monotonic() + self.cache_ttl, value)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+
+
+async def _wait_shared(shared: concurrent.futures.Future) -> Any:
+    """
+    在当前事件循环中等待共享Future
+
+    不使用asyncio.wrap_future，因为等待方被取消时它会连带取消共享Future，
+    影响其他事件循环中的等待方
+    """
+    loop = asyncio.get_running_loop()
+    waiter = loop.create_future()
+
+    def _copy_state(done: concurrent.futures.Future) -> None:
+        if waiter.done():
+            return
+        if done.cancelled():
+            waiter.cancel()
+        elif done.exception() is not None:
+            waiter.set_exception(done.exception())
+        else:
+            waiter.set_result(done.result())
+
+    def _on_done(done: concurrent.futures.Future) -> None:
+        try:
+            loop.call_soon_threadsafe(_copy_state, done)
+        except RuntimeError:
+            # 等待方的事件循环已关闭
+            pass
+
+    shared.add_done_callback(_on_done)
+    return await waiter
+
+
+# 全局请求合并器实例
+_request_coalescer: Optional[RequestCoalescer] = None
+_request_coalescer_lock = threading.Lock()
+
+
+def get_request_coalescer() -> RequestCoalescer:
+    """获取全局请求合并器实例（单例模式）"""
+    global _request_coalescer
+    if _request_coalescer is None:
+        with _request_coalescer_lock:
+            if _request_coalescer is None:
+                crawler_config = get_settings().crawler
+                _request_coalescer = RequestCoalescer(
+                    crawler_config.response_cache_ttl, crawler_config.response_cache_max_size
+                )
+    return _request_coalescer
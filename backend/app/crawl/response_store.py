@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+本地响应存储 - 支持条件请求（ETag/Last-Modified）
+
+按URL在磁盘上保存响应的校验器和gzip压缩的响应体。下次请求同一URL时
+携带If-None-Match/If-Modified-Since，上游返回304时直接使用本地响应体，
+节省带宽和上游负载。
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from app.config import get_settings
+from app.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class ResponseStore:
+    """
+    按URL保存响应校验器和压缩响应体
+
+    每个URL对应两个文件：<hash>.json保存校验器，<hash>.gz保存gzip压缩的响应体。
+    写入时先写临时文件再原子替换，多个线程同时写同一URL也不会读到半个文件。
+    """
+
+    def __init__(self, root: str | Path):
+        """
+        :param root: 存储目录
+        """
+        self.root = Path(root)
+        # 响应体未变化时复用解析结果所需的校验器，避免每次都读磁盘
+        self._validators: Dict[str, Optional[str]] = {}
+        self._lock = threading.Lock()
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """
+        构造条件请求头，本地没有完整的响应时返回空字典
+
+        :param url: 请求URL
+        :return: If-None-Match/If-Modified-Since请求头
+        """
+        meta = self._load_meta(url)
+        if not meta or not self._body_path(url).exists():
+            return {}
+        headers = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    def load_body(self, url: str) -> Optional[bytes]:
+        """
+        读取本地保存的响应体
+
+        :param url: 请求URL
+        :return: 解压后的响应体，不存在或损坏时返回None
+        """
+        try:
+            return gzip.decompress(self._body_path(url).read_bytes())
+        except (OSError, EOFError) as e:
+            logger.warning(f"本地响应体读取失败: {url}, 错误: {e}")
+            return None
+
+    def save(self, url: str, etag: Any, last_modified: Any, content: bytes) -> None:
+        """
+        保存响应的校验器和响应体，没有校验器的响应不保存
+
+        :param url: 请求URL
+        :param etag: 响应头ETag
+        :param last_modified: 响应头Last-Modified
+        :param content: 响应体
+        """
+        etag = etag if isinstance(etag, str) else None
+        last_modified = last_modified if isinstance(last_modified, str) else None
+        if not etag and not last_modified:
+            self.remember_validator(url, None)
+            return
+        meta = {"url": url, "etag": etag, "last_modified": last_modified, "stored_at": time.time()}
+        try:
+            self._atomic_write(self._body_path(url), gzip.compress(content))
+            self._atomic_write(self._meta_path(url), json.dumps(meta).encode("utf-8"))
+        except OSError as e:
+            logger.warning(f"本地响应保存失败: {url}, 错误: {e}")
+            return
+        self.remember_validator(url, etag or last_modified)
+
+    def discard(self, url: str) -> None:
+        """删除URL的本地响应（如响应体损坏时）"""
+        for path in (self._meta_path(url), self._body_path(url)):
+            path.unlink(missing_ok=True)
+        self.remember_validator(url, None)
+
+    def remember_validator(self, url: str, validator: Optional[str]) -> None:
+        """记录URL当前响应对应的校验器"""
+        with self._lock:
+            self._validators[url] = validator
+
+    def current_validator(self, url: str) -> Optional[str]:
+        """
+        获取URL最近一次响应的校验器，相同校验器表示响应体未变化
+
+        :param url: 请求URL
+        :return: ETag或Last-Modified，未知时返回None
+        """
+        with self._lock:
+            return self._validators.get(url)
+
+    def _load_meta(self, url: str) -> Optional[Dict[str, Any]]:
+        """读取校验器元数据"""
+        try:
+            meta = json.loads(self._meta_path(url).read_bytes())
+        except (OSError, ValueError):
+            return None
+        return meta if meta.get("url") == url else None
+
+    def _key(self, url: str) -> str:
+        return hashlib.sha1(url.encode("utf-8")).hexdigest()
+
+    def _meta_path(self, url: str) -> Path:
+        key = self._key(url)
+        return self.root / key[:2] / f"{key}.json"
+
+    def _body_path(self, url: str) -> Path:
+        key = self._key(url)
+        return self.root / key[:2] / f"{key}.gz"
+
+    @staticmethod
+    def _atomic_write(path: Path, data: bytes) -> None:
+        """先写临时文件再原子替换"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+
+
+# 全局响应存储实例
+_response_store: Optional[ResponseStore] = None
+_response_store_lock = threading.Lock()
+
+
+def get_response_store() -> ResponseStore:
+    """获取全局响应存储实例（单例模式）"""
+    global _response_store
+    if _response_store is None:
+        with _response_store_lock:
+            if _response_store is None:
+                _response_store = ResponseStore(get_settings().crawler.response_store_dir)
+    return _response_store
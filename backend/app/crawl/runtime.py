@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+爬虫运行时 - 后台线程中常驻的事件循环
+
+调度器的工作线程不再为每次任务调用asyncio.run，而是通过
+run_coroutine_threadsafe把任务提交到同一个常驻事件循环中执行。
+CrawlFlow、HTTP连接池和全局熔断器都绑定在这个循环上，
+跨任务复用keep-alive连接，避免每次任务重新握手。
+"""
+
+import asyncio
+import threading
+from typing import Any, Dict, List, Optional
+
+from app.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class CrawlerRuntime:
+    """
+    爬虫运行时
+
+    特性：
+    - 首次提交任务时启动后台事件循环线程
+    - 持有常驻的CrawlFlow实例，所有任务共享连接池和并发控制
+    - 线程安全，可以从调度器的多个工作线程同时提交任务
+    """
+
+    def __init__(self) -> None:
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._crawl_flow = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """启动后台事件循环线程，已启动时直接返回"""
+        with self._lock:
+            if self.is_running:
+                return
+            loop = asyncio.new_event_loop()
+            started = threading.Event()
+
+            def run_loop() -> None:
+                asyncio.set_event_loop(loop)
+                loop.call_soon(started.set)
+                loop.run_forever()
+
+            self._loop = loop
+            self._thread = threading.Thread(target=run_loop, name="crawler-runtime", daemon=True)
+            self._thread.start()
+            started.wait()
+            logger.info("爬虫运行时事件循环已启动")
+
+    def run_crawl(self, page_ids: List[str], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        在常驻事件循环中执行爬取任务，阻塞等待结果
+
+        :param page_ids: 页面ID列表
+        :param timeout: 等待超时时间（秒），None表示一直等待
+        :return: 爬取结果字典
+        """
+        self.start()
+        future = asyncio.run_coroutine_threadsafe(self._execute(page_ids), self._loop)
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            future.cancel()
+            raise
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """
+        关闭常驻的CrawlFlow并停止事件循环
+
+        :param timeout: 等待资源释放的超时时间（秒）
+        """
+        with self._lock:
+            if not self.is_running:
+                return
+            loop, thread = self._loop, self._thread
+            try:
+                asyncio.run_coroutine_threadsafe(self._close_flow(), loop).result(timeout)
+            except Exception as e:
+                logger.error(f"关闭爬虫运行时资源失败: {e}")
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(timeout)
+            if not thread.is_alive():
+                loop.close()
+            self._loop = None
+            self._thread = None
+            logger.info("爬虫运行时事件循环已停止")
+
+    async def _execute(self, page_ids: List[str]) -> Dict[str, Any]:
+        """在运行时事件循环中执行爬取，首次调用时创建CrawlFlow"""
+        if self._crawl_flow is None:
+            from app.crawl.crawl_flow import CrawlFlow
+            self._crawl_flow = CrawlFlow()
+        return await self._crawl_flow.execute_crawl_task(page_ids)
+
+    async def _close_flow(self) -> None:
+        """关闭常驻的CrawlFlow及其连接池"""
+        if self._crawl_flow is not None:
+            await self._crawl_flow.close()
+            self._crawl_flow = None
+
+
+# 全局爬虫运行时实例
+_crawler_runtime: Optional[CrawlerRuntime] = None
+_crawler_runtime_lock = threading.Lock()
+
+
+def get_crawler_runtime() -> CrawlerRuntime:
+    """获取全局爬虫运行时实例（单例模式）"""
+    global _crawler_runtime
+    if _crawler_runtime is None:
+        with _crawler_runtime_lock:
+            if _crawler_runtime is None:
+                _crawler_runtime = CrawlerRuntime()
+    return _crawler_runtime
+
+
+def shutdown_crawler_runtime() -> None:
+    """停止全局爬虫运行时（未启动时为空操作）"""
+    if _crawler_runtime is not None:
+        _crawler_runtime.stop()
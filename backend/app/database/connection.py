@@ -2,9 +2,10 @@
 数据库连接管理
 """
 
-from collections.abc import Generator
+from collections.abc import AsyncGenerator, Generator
 
-from sqlalchemy import create_engine, text
+from sqlalchemy import Engine, create_engine, event, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import Session, sessionmaker
 
 from ..config import get_settings
@@ -23,8 +24,88 @@ engine = create_engine(
     pool_recycle=settings.database.pool_recycle,
 )
 
+
+def configure_sqlite_engine(sqlite_engine: Engine) -> None:
+    """
+    为SQLite引擎注册连接事件
+
+    pysqlite驱动默认会自行管理事务，导致SAVEPOINT（begin_nested）行为不正确。
+    这里关闭驱动的事务处理，改由SQLAlchemy显式发出BEGIN。
+    同时在每个新连接上应用DatabaseSettings中的SQLite PRAGMA配置。
+
+    :param sqlite_engine: SQLite数据库引擎
+    """
+    if sqlite_engine.dialect.name != "sqlite":
+        return
+
+    pragmas = get_sqlite_pragmas()
+
+    @event.listens_for(sqlite_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+    @event.listens_for(sqlite_engine, "begin")
+    def _on_begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
+
+def get_sqlite_pragmas() -> dict[str, str | int]:
+    """
+    获取新连接上要执行的SQLite PRAGMA
+
+    journal_mode写在第一位：切换日志模式需要在连接没有打开事务时执行
+    :return: PRAGMA名称到取值的有序字典
+    """
+    db_settings = settings.database
+    return {
+        "journal_mode": db_settings.sqlite_journal_mode,
+        "synchronous": db_settings.sqlite_synchronous,
+        "mmap_size": db_settings.sqlite_mmap_size,
+        "cache_size": db_settings.sqlite_cache_size,
+        "temp_store": db_settings.sqlite_temp_store,
+        "busy_timeout": db_settings.sqlite_busy_timeout,
+    }
+
+
+def get_async_url(url: str) -> str:
+    """
+    把同步驱动的数据库URL转换为对应的异步驱动URL
+
+    sqlite使用aiosqlite，postgresql使用asyncpg，已指定其他驱动时保持不变
+    :param url: 同步数据库连接URL
+    :return: 异步数据库连接URL
+    """
+    scheme, separator, rest = url.partition("://")
+    async_schemes = {
+        "sqlite": "sqlite+aiosqlite",
+        "postgresql": "postgresql+asyncpg",
+        "postgresql+psycopg2": "postgresql+asyncpg",
+    }
+    return f"{async_schemes.get(scheme, scheme)}{separator}{rest}"
+
+
+configure_sqlite_engine(engine)
+
+# 创建异步数据库引擎，供FastAPI路由使用，查询等待期间不阻塞事件循环
+async_engine = create_async_engine(
+    settings.database.async_url or get_async_url(settings.database.url),
+    echo=settings.database.echo,
+    pool_size=settings.database.pool_size,
+    max_overflow=settings.database.max_overflow,
+    pool_timeout=settings.database.pool_timeout,
+    pool_recycle=settings.database.pool_recycle,
+)
+configure_sqlite_engine(async_engine.sync_engine)
+
 # 创建会话工厂
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 
 
 def get_db() -> Generator[Session, None, None]:
@@ -36,9 +117,24 @@ def get_db() -> Generator[Session, None, None]:
         db.close()
 
 
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    获取异步数据库会话
+
+    服务层的读取方法都是同步的，路由中通过db.run_sync(方法, 参数...)在异步驱动上执行，
+    SQL执行期间事件循环可以处理其他请求和调度任务。
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
 def create_tables():
-    """创建数据库表"""
+    """创建数据库表，PostgreSQL下快照表按月分区"""
     from .db.base import Base
+    if engine.dialect.name == "postgresql":
+        from .postgres import create_partitioned_tables
+        create_partitioned_tables(engine, Base.metadata)
+        return
     Base.metadata.create_all(bind=engine)
 
 
@@ -80,3 +176,40 @@ def ensure_db():
     except Exception as e:
         logger.error(f"数据库初始化失败: {e}")
         raise RuntimeError(f"数据库初始化失败: {e}")
+
+
+# SQLite维护任务：任务ID到维护语句
+SQLITE_MAINTENANCE_STATEMENTS = {
+    # 把WAL内容写回主库并截断WAL文件，避免长时间运行后WAL无限增长拖慢读取
+    "sqlite_wal_checkpoint": "PRAGMA wal_checkpoint(TRUNCATE)",
+    # 让SQLite按需重新收集统计信息，保证查询计划选择正确的索引
+    "sqlite_optimize": "PRAGMA optimize",
+}
+
+
+def sqlite_maintenance_task_wrapper(job_id: str) -> dict:
+    """
+    APScheduler SQLite维护任务函数
+
+    使用原始DBAPI连接执行，不经过SQLAlchemy的BEGIN，维护语句不会处在事务中
+    :param job_id: 维护任务ID，对应SQLITE_MAINTENANCE_STATEMENTS中的键
+    :return: 执行结果字典
+    """
+    logger = get_logger(__name__)
+    statement = SQLITE_MAINTENANCE_STATEMENTS[job_id]
+    try:
+        conn = engine.raw_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(statement)
+            row = cursor.fetchone()
+            cursor.close()
+        finally:
+            conn.close()
+        result = list(row) if row else None
+        logger.info(f"SQLite维护任务完成: {statement} -> {result}")
+        return {"success": True, "result": result}
+    except Exception as e:
+        error_msg = f"SQLite维护任务执行失败 {statement}: {str(e)}"
+        logger.error(error_msg)
+        return {"success": False, "error": error_msg}
@@ -3,7 +3,22 @@
 """
 
 from .base import Base
-from .book import Book, BookSnapshot
-from .ranking import Ranking, RankingSnapshot
+from .book import Book, BookSnapshot, BookSnapshotRollup
+from .ranking import Ranking, RankingBatchIndex, RankingBookPosition, RankingSnapshot, RankingSnapshotBatch
+from ...utils import get_model_fields
 
-__all__ = ["Base", "Book", "BookSnapshot", "Ranking", "RankingSnapshot"]
\ No newline at end of file
+# 导入时预先计算所有模型的字段集合，写入路径上只做缓存查找
+for _mapper in Base.registry.mappers:
+    get_model_fields(_mapper.class_)
+
+__all__ = [
+    "Base",
+    "Book",
+    "BookSnapshot",
+    "BookSnapshotRollup",
+    "Ranking",
+    "RankingBatchIndex",
+    "RankingBookPosition",
+    "RankingSnapshot",
+    "RankingSnapshotBatch",
+]
\ No newline at end of file
@@ -5,7 +5,7 @@
 
 from datetime import datetime
 
-from sqlalchemy import DateTime, ForeignKey, Index, Integer, String
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, String, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column
 
 from .base import Base
@@ -113,3 +113,48 @@ class BookSnapshot(Base):
         Index("idx_book_snapshot_time", "novel_id", "snapshot_time"),
         Index("idx_book_snapshot_novel", "novel_id", "snapshot_time"),
     )
+
+
+class BookSnapshotRollup(Base):
+    """书籍快照时间段汇总表
+
+    按小时、天、周、月分组，每个时间段保存该段内第一个快照的统计数据，
+    写入快照时增量维护。历史快照接口直接对该表做一次索引范围扫描，
+    不再对book_snapshots逐行计算strftime分组。
+    """
+
+    __tablename__ = "book_snapshot_rollups"
+
+    novel_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("books.novel_id"), comment="关联的书籍novel_id"
+    )
+    interval: Mapped[str] = mapped_column(
+        String(10), comment="时间间隔类型：hour、day、week、month"
+    )
+    bucket: Mapped[str] = mapped_column(
+        String(20), comment="时间段键，格式与strftime分组一致，如2025-01-01 08、2025-W01"
+    )
+
+    # 时间段内第一个快照的统计数据
+    favorites: Mapped[int] = mapped_column(Integer, default=0, comment="收藏数量")
+    clicks: Mapped[int] = mapped_column(Integer, default=0, comment="非V章点击量")
+    comments: Mapped[int] = mapped_column(Integer, default=0, comment="评论数量")
+    nutrition: Mapped[int] = mapped_column(Integer, default=0, comment="营养液数量")
+    word_counts: Mapped[int | None] = mapped_column(Integer, nullable=True, comment="字数统计")
+    chapter_counts: Mapped[int | None] = mapped_column(Integer, nullable=True, comment="章节统计")
+    vip_chapter_id: Mapped[int | None] = mapped_column(Integer, nullable=True, comment="入v的章节")
+    status: Mapped[str | None] = mapped_column(String(50), nullable=True, comment="书籍状态")
+    snapshot_time: Mapped[datetime] = mapped_column(
+        DateTime, comment="时间段内第一个快照的时间"
+    )
+
+    # 覆盖Base类的时间戳字段（实际数据库表中没有这些字段）
+    created_at = None
+    updated_at = None
+
+    __table_args__ = (
+        # 唯一约束 - 每本书每个时间段只有一行
+        UniqueConstraint("novel_id", "interval", "bucket", name="uq_book_rollup_bucket"),
+        # 范围索引 - 历史快照接口按时间范围扫描
+        Index("idx_book_rollup_range", "novel_id", "interval", "snapshot_time"),
+    )
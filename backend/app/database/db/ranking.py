@@ -6,11 +6,13 @@
 from datetime import datetime
 
 from sqlalchemy import (
+    Boolean,
     DateTime,
     Float,
     ForeignKey,
     Index,
     Integer,
+    LargeBinary,
     String,
     UniqueConstraint,
 )
@@ -144,3 +146,120 @@ class RankingSnapshot(Base):
             "ranking_id", "novel_id", "batch_id", name="uq_ranking_book_batch"
         ),
     )
+
+
+class RankingSnapshotBatch(Base):
+    """榜单快照批次表（差量存储格式）
+
+    每个(榜单, 批次)一行，排名列表编码为压缩数据块：
+    - 关键帧保存完整的排名列表，每隔若干批次写入一次
+    - 其余批次只保存相对上一批次的位置差量
+
+    读取时从最近的关键帧开始依次应用差量还原完整列表，
+    相比RankingSnapshot每本书一行，存储和历史查询的I/O都小得多
+    """
+
+    __tablename__ = "ranking_snapshot_batches"
+
+    ranking_id: Mapped[int] = mapped_column(
+        Integer,
+        ForeignKey("rankings.id"),
+        comment="关联的榜单ID，对应Ranking表的主键id",
+    )
+    batch_id: Mapped[str] = mapped_column(
+        String(36), comment="批次ID，与RankingSnapshot.batch_id含义相同"
+    )
+    is_keyframe: Mapped[bool] = mapped_column(
+        Boolean, default=False, comment="是否为关键帧，关键帧保存完整排名列表"
+    )
+    sequence: Mapped[int] = mapped_column(
+        Integer, default=0, comment="距离上一个关键帧的批次数，关键帧为0"
+    )
+    book_count: Mapped[int] = mapped_column(
+        Integer, default=0, comment="该批次榜单中的书籍数量"
+    )
+    payload: Mapped[bytes] = mapped_column(
+        LargeBinary, comment="zlib压缩的JSON数据块，关键帧或位置差量"
+    )
+
+    # 快照时间
+    snapshot_time: Mapped[datetime] = mapped_column(
+        DateTime,
+        default=datetime.now,
+        comment="快照记录时间，与该批次RankingSnapshot的snapshot_time一致",
+    )
+
+    # 覆盖Base类的时间戳字段（实际数据库表中没有这些字段）
+    created_at = None
+    updated_at = None
+
+    __table_args__ = (
+        # 榜单时间索引 - 用于按时间范围还原批次
+        Index("idx_ranking_batch_time", "ranking_id", "snapshot_time"),
+        # 唯一约束 - 同一榜单每个批次只有一行
+        UniqueConstraint("ranking_id", "batch_id", name="uq_ranking_snapshot_batch"),
+    )
+
+
+class RankingBookPosition(Base):
+    """差量存储的书籍排名索引表
+
+    差量存储格式下每本书在每个批次中的位置，写入批次时同步写入。
+    按书籍查询排名历史时直接按(novel_id, snapshot_time)范围扫描，
+    不需要还原所有榜单的全部批次。
+    """
+
+    __tablename__ = "ranking_book_positions"
+
+    novel_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("books.novel_id"), comment="晋江app上的书籍id"
+    )
+    ranking_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("rankings.id"), comment="关联的榜单ID，对应Ranking表的主键id"
+    )
+    batch_row_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("ranking_snapshot_batches.id"), comment="所属批次，对应RankingSnapshotBatch表的主键id"
+    )
+    position: Mapped[int] = mapped_column(Integer, comment="书籍在该批次榜单中的位置")
+    snapshot_time: Mapped[datetime] = mapped_column(DateTime, comment="批次的快照时间")
+
+    # 覆盖Base类的时间戳字段（实际数据库表中没有这些字段）
+    created_at = None
+    updated_at = None
+
+    __table_args__ = (
+        # 书籍时间索引 - 用于查询书籍的排名历史
+        Index("idx_ranking_book_position", "novel_id", "snapshot_time"),
+        # 唯一约束 - 同一批次中每本书只有一个位置
+        UniqueConstraint("batch_row_id", "novel_id", name="uq_ranking_book_position"),
+    )
+
+
+class RankingBatchIndex(Base):
+    """榜单批次索引表
+
+    记录每个榜单在每个小时、每天的最后一个批次，写入榜单快照时同步维护。
+    历史和详情接口按(榜单, 时间间隔, 时间段)唯一键直接查出批次ID，
+    不再对ranking_snapshots做分组聚合。
+    """
+
+    __tablename__ = "ranking_batch_index"
+
+    ranking_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("rankings.id"), comment="关联的榜单ID，对应Ranking表的主键id"
+    )
+    interval: Mapped[str] = mapped_column(String(10), comment="时间间隔类型：hour、day")
+    bucket: Mapped[str] = mapped_column(
+        String(20), comment="时间段键，hour为%Y-%m-%d %H，day为%Y-%m-%d"
+    )
+    batch_id: Mapped[str] = mapped_column(String(36), comment="该时间段内最后一个批次的ID")
+    snapshot_time: Mapped[datetime] = mapped_column(DateTime, comment="该批次的快照时间")
+
+    # 覆盖Base类的时间戳字段（实际数据库表中没有这些字段）
+    created_at = None
+    updated_at = None
+
+    __table_args__ = (
+        # 唯一约束 - 每个榜单每个时间段只有一行，同时用于按时间段范围查找
+        UniqueConstraint("ranking_id", "interval", "bucket", name="uq_ranking_batch_bucket"),
+    )
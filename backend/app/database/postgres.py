@@ -0,0 +1,203 @@
+"""
+PostgreSQL后端支持
+
+- book_snapshots、ranking_snapshots两张快照表按snapshot_time建立按月范围分区，
+  历史查询只扫描涉及的月分区，旧数据可以按分区整体归档或删除
+- 快照批量写入使用COPY，绕过逐行INSERT的解析和往返开销
+"""
+
+import csv
+import io
+from datetime import date, datetime
+from typing import Any
+
+from sqlalchemy import Engine, MetaData, PrimaryKeyConstraint, Table, UniqueConstraint
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from ..config import get_settings
+from ..logger import get_logger
+
+# 按月分区的快照表及分区列
+PARTITIONED_TABLES = ("book_snapshots", "ranking_snapshots")
+PARTITION_COLUMN = "snapshot_time"
+
+logger = get_logger(__name__)
+
+
+def is_postgres(db: Session) -> bool:
+    """当前会话是否连接PostgreSQL"""
+    return db.get_bind().dialect.name == "postgresql"
+
+
+def partitioned_table(table: Table) -> Table:
+    """
+    生成快照表的PostgreSQL分区表定义
+
+    分区表的主键和唯一约束必须包含分区列，因此在副本上把主键改为(id, snapshot_time)，
+    并为不含snapshot_time的唯一约束补上该列（同一批次的快照时间相同，约束语义不变）。
+    ORM映射仍使用原表定义，其他数据库方言不受影响。
+
+    :param table: 模型的原始Table对象
+    :return: 仅用于生成DDL的分区表Table副本
+    """
+    scratch = MetaData()
+    # 外键引用的表一起复制，保证外键在副本元数据中可以解析
+    for foreign_key in table.foreign_keys:
+        if foreign_key.column.table.name not in scratch.tables:
+            foreign_key.column.table.to_metadata(scratch)
+    partitioned = table.to_metadata(scratch)
+
+    partitioned.kwargs["postgresql_partition_by"] = f"RANGE ({PARTITION_COLUMN})"
+    partitioned.c.id.autoincrement = True
+    partitioned.append_constraint(PrimaryKeyConstraint("id", PARTITION_COLUMN))
+    for constraint in list(partitioned.constraints):
+        if isinstance(constraint, UniqueConstraint) and PARTITION_COLUMN not in constraint.columns:
+            partitioned.constraints.discard(constraint)
+            partitioned.append_constraint(
+                UniqueConstraint(*constraint.columns.keys(), PARTITION_COLUMN, name=constraint.name)
+            )
+    return partitioned
+
+
+def month_partitions(table_name: str, start: date, months: int) -> list[tuple[str, date, date]]:
+    """
+    列出从start所在月份开始的连续月分区
+
+    :param table_name: 分区父表名
+    :param start: 起始日期
+    :param months: 分区数量
+    :return: (分区表名, 下界包含, 上界不包含)列表
+    """
+    partitions = []
+    year, month = start.year, start.month
+    for _ in range(months):
+        next_year, next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+        partitions.append((f"{table_name}_{year:04d}_{month:02d}", date(year, month, 1), date(next_year, next_month, 1)))
+        year, month = next_year, next_month
+    return partitions
+
+
+def ensure_month_partitions(bind: Engine, start: date | None = None, months: int | None = None) -> int:
+    """
+    为快照分区表创建当前及之后若干个月的分区，已存在的分区跳过
+
+    每张表还有一个DEFAULT分区兜底，写入时间落在已建分区之外的快照不会失败。
+    DEFAULT分区中已有新分区范围内的行时，PostgreSQL拒绝直接创建该分区，
+    此时先分离DEFAULT分区，创建新分区并把范围内的行移入，再重新挂载DEFAULT分区。
+
+    :param bind: PostgreSQL数据库引擎
+    :param start: 起始日期，默认为今天
+    :param months: 分区数量，默认为postgres_partition_months_ahead + 1（含当前月）
+    :return: 检查的分区数量
+    """
+    start = start or date.today()
+    months = months or get_settings().database.postgres_partition_months_ahead + 1
+    checked = 0
+    with bind.begin() as conn:
+        for table_name in PARTITIONED_TABLES:
+            default_name = f"{table_name}_default"
+            conn.exec_driver_sql(f"CREATE TABLE IF NOT EXISTS {default_name} PARTITION OF {table_name} DEFAULT")
+            for partition_name, lower, upper in month_partitions(table_name, start, months):
+                checked += 1
+                if conn.exec_driver_sql(f"SELECT to_regclass('{partition_name}')").scalar() is not None:
+                    continue
+                bounds = f"FROM ('{lower.isoformat()}') TO ('{upper.isoformat()}')"
+                in_range = f"{PARTITION_COLUMN} >= '{lower.isoformat()}' AND {PARTITION_COLUMN} < '{upper.isoformat()}'"
+                misplaced = conn.exec_driver_sql(
+                    f"SELECT EXISTS (SELECT 1 FROM {default_name} WHERE {in_range})"
+                ).scalar()
+                if not misplaced:
+                    conn.exec_driver_sql(f"CREATE TABLE {partition_name} PARTITION OF {table_name} FOR VALUES {bounds}")
+                    continue
+
+                conn.exec_driver_sql(f"ALTER TABLE {table_name} DETACH PARTITION {default_name}")
+                conn.exec_driver_sql(f"CREATE TABLE {partition_name} PARTITION OF {table_name} FOR VALUES {bounds}")
+                moved = conn.exec_driver_sql(
+                    f"WITH moved AS (DELETE FROM {default_name} WHERE {in_range} RETURNING *) "
+                    f"INSERT INTO {partition_name} SELECT * FROM moved"
+                ).rowcount
+                conn.exec_driver_sql(f"ALTER TABLE {table_name} ATTACH PARTITION {default_name} DEFAULT")
+                logger.info(f"{default_name} 中 {moved} 行移入新分区 {partition_name}")
+    return checked
+
+
+def create_partitioned_tables(bind: Engine, metadata: MetaData) -> None:
+    """
+    在PostgreSQL上创建所有表，快照表使用按月范围分区
+
+    :param bind: PostgreSQL数据库引擎
+    :param metadata: 模型元数据
+    """
+    regular_tables = [table for table in metadata.sorted_tables if table.name not in PARTITIONED_TABLES]
+    metadata.create_all(bind=bind, tables=regular_tables)
+
+    with bind.begin() as conn:
+        for table_name in PARTITIONED_TABLES:
+            partitioned = partitioned_table(metadata.tables[table_name])
+            conn.execute(CreateTable(partitioned, if_not_exists=True))
+            for index in partitioned.indexes:
+                conn.execute(CreateIndex(index, if_not_exists=True))
+    ensure_month_partitions(bind)
+
+
+def copy_rows(db: Session, table: Table, rows: list[dict[str, Any]]) -> None:
+    """
+    使用COPY FROM STDIN批量写入行数据，在会话当前事务中执行
+
+    COPY不会执行SQLAlchemy的Python端默认值，rows应已由complete_rows补齐；id列由数据库序列生成。
+
+    :param db: PostgreSQL数据库会话
+    :param table: 目标表
+    :param rows: 键集合一致的行字典列表
+    """
+    if not rows:
+        return
+    columns = list(rows[0])
+
+    # QUOTE_STRINGS下None输出为未加引号的空值，COPY CSV将其识别为NULL，空字符串则保留为""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, quoting=csv.QUOTE_STRINGS)
+    for values in rows:
+        writer.writerow([_copy_value(values[column]) for column in columns])
+
+    sql = f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+    cursor = db.connection().connection.driver_connection.cursor()
+    try:
+        if hasattr(cursor, "copy_expert"):
+            # psycopg2
+            buffer.seek(0)
+            cursor.copy_expert(sql, buffer)
+        else:
+            # psycopg 3
+            with cursor.copy(sql) as copy:
+                copy.write(buffer.getvalue())
+    finally:
+        cursor.close()
+
+
+def _copy_value(value: Any) -> Any:
+    """把Python值转换为COPY CSV中的表示"""
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    return value
+
+
+def partition_task_wrapper() -> dict:
+    """
+    APScheduler分区维护任务函数 - 提前创建后续月份的快照分区
+
+    :return: 执行结果字典
+    """
+    from .connection import engine
+
+    try:
+        checked = ensure_month_partitions(engine)
+        logger.info(f"快照分区检查完成，共检查 {checked} 个月分区")
+        return {"success": True, "checked": checked}
+    except Exception as e:
+        error_msg = f"快照分区维护任务执行失败: {str(e)}"
+        logger.error(error_msg)
+        return {"success": False, "error": error_msg}
@@ -6,3 +6,145 @@
 # @Date    : 2025/7/26 23:31
 # @Author  : Lien Gu
 '''
+# 服务层公共工具：方言相关的批量写入和时间分组辅助函数
+
+from functools import lru_cache
+from typing import Any, Iterator
+
+from sqlalchemy import Column, Integer, String, Table, cast, extract, func, insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.config import get_settings
+from app.database.postgres import copy_rows, is_postgres
+from app.utils import TIME_BUCKET_FORMATS
+
+# 多行INSERT每批的行数，避免超过SQLite的绑定参数上限
+UPSERT_CHUNK_SIZE = 500
+
+
+def dialect_insert(db: Session, model) -> Any:
+    """
+    根据当前会话的数据库方言构造支持 ON CONFLICT 的 INSERT 语句
+
+    :param db: 数据库会话对象
+    :param model: SQLAlchemy模型类或表对象
+    :return: sqlite/postgresql方言的Insert对象
+    """
+    dialect_name = db.get_bind().dialect.name
+    if dialect_name == "postgresql":
+        return postgresql.insert(model)
+    if dialect_name == "sqlite":
+        return sqlite.insert(model)
+    raise NotImplementedError(f"不支持批量upsert的数据库方言: {dialect_name}")
+
+
+@lru_cache(maxsize=None)
+def insert_columns(table: Table) -> tuple[Column, ...]:
+    """
+    批量写入时使用的列（自增主键id除外），每张表只计算一次
+
+    :param table: 目标表
+    :return: 列对象元组，按表定义顺序
+    """
+    return tuple(column for column in table.columns if column.name != "id")
+
+
+def complete_rows(
+        table: Table, rows: list[dict[str, Any]], defaults: dict[str, Any] | None = None
+) -> list[dict[str, Any]]:
+    """
+    把原始数据字典整理为只包含表中列、键集合一致的行
+
+    Core批量写入不会执行列的Python端默认值，这里按列定义补齐；
+    defaults中的值优先用于缺失或为None的列，如整批共用的快照时间。
+
+    :param table: 目标表
+    :param rows: 原始数据字典列表，可以包含表中不存在的键
+    :param defaults: 整批共用的默认值
+    :return: 补齐后的行字典列表
+    """
+    fill = {}
+    for column in insert_columns(table):
+        if defaults and column.name in defaults:
+            fill[column.name] = (defaults[column.name], True)
+        elif column.default is not None:
+            # 可调用默认值（如datetime.now）被SQLAlchemy包装为接收执行上下文的函数
+            fill[column.name] = (column.default.arg, False)
+        else:
+            fill[column.name] = (None, False)
+
+    completed = []
+    for row in rows:
+        values = {}
+        for name, (default, replace_none) in fill.items():
+            if name in row and not (replace_none and row[name] is None):
+                values[name] = row[name]
+            else:
+                values[name] = default(None) if callable(default) else default
+        completed.append(values)
+    return completed
+
+
+def bulk_insert(db: Session, table: Table, rows: list[dict[str, Any]]) -> None:
+    """
+    在会话当前事务中批量写入complete_rows整理后的行，不创建ORM对象
+
+    PostgreSQL下使用COPY，其他数据库使用Core INSERT executemany。
+
+    :param db: 数据库会话对象
+    :param table: 目标表
+    :param rows: 键集合一致的行字典列表
+    """
+    if not rows:
+        return
+    # Core语句不会触发自动flush，先写入会话中待提交的书籍等记录，保证外键可见
+    db.flush()
+    if is_postgres(db) and get_settings().database.postgres_copy_ingest:
+        copy_rows(db, table, rows)
+    else:
+        db.execute(insert(table), rows)
+
+
+def time_bucket(db: Session, column, interval: str) -> ColumnElement[str]:
+    """
+    构造时间分组键表达式，结果与Python中column.strftime(TIME_BUCKET_FORMATS[interval])一致
+
+    SQLite使用strftime，PostgreSQL使用to_char；周分组按%W规则（周一为一周开始，
+    第一个周一之前为第00周）计算，PostgreSQL没有对应的格式符，需要根据年内天数和星期几换算。
+
+    :param db: 数据库会话对象
+    :param column: 时间列
+    :param interval: 时间间隔类型，支持"hour"、"day"、"week"、"month"
+    :return: 字符串类型的分组键表达式
+    """
+    if interval not in TIME_BUCKET_FORMATS:
+        raise ValueError(f"不支持的时间间隔: {interval}")
+    dialect_name = db.get_bind().dialect.name
+    if dialect_name == "sqlite":
+        return func.strftime(TIME_BUCKET_FORMATS[interval], column, type_=String)
+    if dialect_name != "postgresql":
+        raise NotImplementedError(f"不支持时间分组的数据库方言: {dialect_name}")
+
+    if interval == "week":
+        week = cast(func.floor((extract("doy", column) + 7 - extract("isodow", column)) / 7), Integer)
+        return func.concat(func.to_char(column, "YYYY"), "-W", func.lpad(cast(week, String), 2, "0"), type_=String)
+    postgres_formats = {
+        "hour": "YYYY-MM-DD HH24",
+        "day": "YYYY-MM-DD",
+        "month": "YYYY-MM",
+    }
+    return func.to_char(column, postgres_formats[interval], type_=String)
+
+
+def chunked(rows: list, size: int = UPSERT_CHUNK_SIZE) -> Iterator[list]:
+    """
+    将列表按固定大小切分
+
+    :param rows: 原始列表
+    :param size: 每批大小
+    :return: 分批迭代器
+    """
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
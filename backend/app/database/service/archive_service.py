@@ -0,0 +1,371 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+快照归档服务 - 把旧快照移出热数据库，按表和月份保存为Parquet列式文件
+
+目录结构：<archive_dir>/<表名>/month=<YYYY-MM>/part-<首行id>-<末行id>.parquet
+
+归档任务由调度器的CLEAN任务定期执行：先写入Parquet文件，再从数据库删除对应的行，
+并删除指向已归档快照的派生行（书籍快照汇总、榜单批次索引），最后递增接口响应缓存的数据版本号。
+差量存储的榜单批次还原为与ranking_snapshots相同结构的行后归档，查询时和归档的ranking_snapshots一起读取。
+查询时间范围覆盖已归档的月份时，BookService/RankingService从归档中补充数据。
+Parquet读写依赖可选依赖pyarrow（pip install jjcrawler[archive]），未安装时归档和回查均为空操作。
+"""
+
+import importlib.util
+import os
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import Boolean, DateTime, Integer, LargeBinary, delete, func, select
+from sqlalchemy.orm import Session
+
+from app.cache import get_response_cache
+from app.config import get_settings
+from app.database.db.book import BookSnapshot, BookSnapshotRollup
+from app.database.db.ranking import RankingBatchIndex, RankingBookPosition, RankingSnapshot, RankingSnapshotBatch
+from app.database.service.Base import chunked
+from app.database.service.ranking_delta import Entries, apply_payload
+from app.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 可归档的快照表
+ARCHIVE_TABLES = {
+    BookSnapshot.__tablename__: BookSnapshot,
+    RankingSnapshot.__tablename__: RankingSnapshot,
+}
+
+# 由快照表派生的表，记录的snapshot_time早于归档截止时间时，指向的快照已被归档
+DERIVED_TABLES = {
+    BookSnapshot.__tablename__: BookSnapshotRollup,
+    RankingSnapshot.__tablename__: RankingBatchIndex,
+}
+
+# 榜单快照的归档表：ranking_snapshots和差量批次还原后的行
+RANKING_ARCHIVE_TABLES = (RankingSnapshot.__tablename__, RankingSnapshotBatch.__tablename__)
+
+
+def pyarrow_available() -> bool:
+    """检查是否安装了pyarrow"""
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def _month_start(value: datetime) -> datetime:
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _next_month(value: datetime) -> datetime:
+    return (_month_start(value) + timedelta(days=32)).replace(day=1)
+
+
+class SnapshotArchive:
+    """
+    快照Parquet归档
+
+    特性：
+    - 按表和月份分区，使用zstd压缩
+    - 按id分段写入，每段先写临时文件再原子替换
+    - 删除数据库行失败时可重复归档，读取时按id去重
+    """
+
+    def __init__(self, root: str | Path, chunk_size: int = 50000):
+        """
+        :param root: 归档目录
+        :param chunk_size: 每个Parquet文件最多包含的行数
+        """
+        self.root = Path(root)
+        self.chunk_size = chunk_size
+
+    def archive_before(self, db: Session, cutoff: datetime) -> Dict[str, int]:
+        """
+        归档并删除snapshot_time早于cutoff的快照
+
+        :param db: 数据库会话对象，每写完一个文件提交一次
+        :param cutoff: 归档截止时间
+        :return: 表名到归档行数的映射
+        """
+        if not pyarrow_available():
+            logger.warning("未安装pyarrow，跳过快照归档")
+            return {}
+
+        archived = {}
+        for table_name, model in ARCHIVE_TABLES.items():
+            oldest = db.scalar(select(func.min(model.snapshot_time)).where(model.snapshot_time < cutoff))
+            count = 0
+            month = _month_start(oldest) if oldest else None
+            while month is not None and month < cutoff:
+                month_end = min(_next_month(month), cutoff)
+                count += self._archive_range(db, model, month, month_end)
+                month = _next_month(month)
+            self._prune_derived(db, table_name, cutoff)
+            archived[table_name] = count
+            if count:
+                logger.info(f"{table_name} 归档 {count} 行（早于 {cutoff:%Y-%m-%d %H:%M}）")
+        count = self._archive_delta_batches(db, cutoff)
+        archived[RankingSnapshotBatch.__tablename__] = count
+        if count:
+            logger.info(f"{RankingSnapshotBatch.__tablename__} 归档 {count} 行（早于 {cutoff:%Y-%m-%d %H:%M}）")
+        # 快照移出数据库、派生行删除后，已缓存的接口响应不再对应数据库中的数据
+        get_response_cache().bump_version()
+        return archived
+
+    def read(self, table_name: str, start_time: datetime, end_time: datetime, **equals: Any) -> List[Dict[str, Any]]:
+        """
+        读取时间范围内的归档快照
+
+        :param table_name: 表名
+        :param start_time: 开始时间（包含）
+        :param end_time: 结束时间（包含）
+        :param equals: 额外的等值过滤条件，如novel_id=123
+        :return: 快照字典列表，按snapshot_time升序，没有归档时返回空列表
+        """
+        files = self._files_in_range(table_name, start_time, end_time)
+        if not files or not pyarrow_available():
+            return []
+
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        timestamp = pa.timestamp("us")
+        condition = (ds.field("snapshot_time") >= pa.scalar(start_time, timestamp)) & (
+                ds.field("snapshot_time") <= pa.scalar(end_time, timestamp))
+        for column, value in equals.items():
+            condition = condition & (ds.field(column) == value)
+        rows = ds.dataset(files, format="parquet").to_table(filter=condition).to_pylist()
+
+        # 差量批次还原的行共用批次的id，按(id, novel_id)去重
+        unique_rows = {(row["id"], row.get("novel_id")): row for row in rows}
+        return sorted(unique_rows.values(), key=lambda row: (row["snapshot_time"], row["id"]))
+
+    def read_latest(self, table_name: str, before: datetime, **equals: Any) -> Optional[Dict[str, Any]]:
+        """
+        读取before之前最后一条归档快照，从before所在月份开始向前逐月查找
+
+        :param table_name: 表名
+        :param before: 截止时间（包含）
+        :param equals: 额外的等值过滤条件，如novel_id=123
+        :return: 快照字典，没有归档时返回None
+        """
+        table_dir = self.root / table_name
+        if not table_dir.is_dir():
+            return None
+        months = sorted(
+            (path.name for path in table_dir.glob("month=*") if path.name <= f"month={before:%Y-%m}"),
+            reverse=True,
+        )
+        for name in months:
+            month = datetime.strptime(name, "month=%Y-%m")
+            rows = self.read(table_name, month, min(before, _next_month(month) - timedelta(microseconds=1)), **equals)
+            if rows:
+                return rows[-1]
+        return None
+
+    def _archive_range(self, db: Session, model, start_time: datetime, end_time: datetime) -> int:
+        """按id分段归档一个月份内的快照"""
+        columns = [column.name for column in model.__table__.columns]
+        archived, last_id = 0, 0
+        while True:
+            rows = db.execute(
+                select(model.__table__)
+                .where(model.snapshot_time >= start_time, model.snapshot_time < end_time, model.id > last_id)
+                .order_by(model.id)
+                .limit(self.chunk_size)
+            ).mappings().all()
+            if not rows:
+                return archived
+
+            path = self._write_part(
+                model.__tablename__, model, start_time, [{name: row[name] for name in columns} for row in rows]
+            )
+            ids = [row["id"] for row in rows]
+            try:
+                for chunk in chunked(ids):
+                    db.execute(delete(model).where(model.id.in_(chunk)))
+                db.commit()
+            except Exception:
+                db.rollback()
+                path.unlink(missing_ok=True)
+                raise
+            archived += len(rows)
+            last_id = ids[-1]
+
+    @staticmethod
+    def _prune_derived(db: Session, table_name: str, cutoff: datetime) -> None:
+        """
+        删除指向已归档快照的派生行，查询时对应时间段改为从归档读取
+
+        :param db: 数据库会话对象
+        :param table_name: 已归档的快照表名
+        :param cutoff: 归档截止时间
+        """
+        derived = DERIVED_TABLES[table_name]
+        db.execute(delete(derived).where(derived.snapshot_time < cutoff))
+        db.commit()
+
+    def _archive_delta_batches(self, db: Session, cutoff: datetime) -> int:
+        """
+        归档差量存储中早于cutoff的批次
+
+        差量批次依赖之前最近的关键帧，每个榜单只归档到cutoff之前最后一个关键帧为止，
+        数据库中剩余的批次仍能从关键帧开始还原。
+
+        :param db: 数据库会话对象，每写完一个文件提交一次
+        :param cutoff: 归档截止时间
+        :return: 归档的快照行数（还原后每个批次每本书一行）
+        """
+        keyframes = db.execute(
+            select(RankingSnapshotBatch.ranking_id, func.max(RankingSnapshotBatch.snapshot_time))
+            .where(RankingSnapshotBatch.is_keyframe.is_(True), RankingSnapshotBatch.snapshot_time <= cutoff)
+            .group_by(RankingSnapshotBatch.ranking_id)
+        ).all()
+        return sum(self._archive_delta_chain(db, ranking_id, keyframe_time) for ranking_id, keyframe_time in keyframes)
+
+    def _archive_delta_chain(self, db: Session, ranking_id: int, end_time: datetime) -> int:
+        """
+        从榜单最早的批次（关键帧）开始依次还原end_time之前的批次，按月份和行数分段归档
+
+        :param db: 数据库会话对象
+        :param ranking_id: 榜单ID
+        :param end_time: 归档截止时间（不包含），为关键帧的快照时间
+        :return: 归档的快照行数
+        """
+        batches = db.execute(
+            select(
+                RankingSnapshotBatch.id,
+                RankingSnapshotBatch.batch_id,
+                RankingSnapshotBatch.payload,
+                RankingSnapshotBatch.snapshot_time,
+            )
+            .where(RankingSnapshotBatch.ranking_id == ranking_id, RankingSnapshotBatch.snapshot_time < end_time)
+            .order_by(RankingSnapshotBatch.snapshot_time, RankingSnapshotBatch.id)
+        ).all()
+
+        archived = 0
+        entries: Entries = {}
+        part_ids: List[int] = []
+        part_rows: List[Dict[str, Any]] = []
+        part_month: Optional[datetime] = None
+        for batch in batches:
+            month = _month_start(batch.snapshot_time)
+            if part_ids and (month != part_month or len(part_rows) >= self.chunk_size):
+                archived += self._archive_delta_part(db, part_month, part_ids, part_rows)
+                part_ids, part_rows = [], []
+            part_month = month
+            entries = apply_payload(entries, batch.payload)
+            part_ids.append(batch.id)
+            part_rows.extend(
+                {
+                    "id": batch.id,
+                    "ranking_id": ranking_id,
+                    "novel_id": novel_id,
+                    "batch_id": batch.batch_id,
+                    "position": position,
+                    "snapshot_time": batch.snapshot_time,
+                }
+                for novel_id, position in sorted(entries.items(), key=lambda item: item[1])
+            )
+        if part_ids:
+            archived += self._archive_delta_part(db, part_month, part_ids, part_rows)
+        return archived
+
+    def _archive_delta_part(self, db: Session, month: datetime, batch_ids: List[int], rows: List[Dict[str, Any]]) -> int:
+        """写入一段还原后的差量批次，再删除对应的批次和书籍排名索引行"""
+        # 空榜单的批次没有行，只需删除
+        path = self._write_part(RankingSnapshotBatch.__tablename__, RankingSnapshot, month, rows) if rows else None
+        try:
+            for chunk in chunked(batch_ids):
+                db.execute(delete(RankingBookPosition).where(RankingBookPosition.batch_row_id.in_(chunk)))
+                db.execute(delete(RankingSnapshotBatch).where(RankingSnapshotBatch.id.in_(chunk)))
+            db.commit()
+        except Exception:
+            db.rollback()
+            if path is not None:
+                path.unlink(missing_ok=True)
+            raise
+        return len(rows)
+
+    def _write_part(self, table_name: str, model, month: datetime, rows: List[Dict[str, Any]]) -> Path:
+        """写入一个Parquet文件，列结构取自model，返回文件路径"""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.Table.from_pylist(rows, schema=self._arrow_schema(model))
+        path = self._month_dir(table_name, month) / f"part-{rows[0]['id']}-{rows[-1]['id']}.parquet"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        pq.write_table(table, tmp_path, compression="zstd")
+        os.replace(tmp_path, path)
+        return path
+
+    @staticmethod
+    def _arrow_schema(model):
+        """根据SQLAlchemy表结构生成Arrow schema"""
+        import pyarrow as pa
+
+        fields = []
+        for column in model.__table__.columns:
+            if isinstance(column.type, Boolean):
+                arrow_type = pa.bool_()
+            elif isinstance(column.type, Integer):
+                arrow_type = pa.int64()
+            elif isinstance(column.type, DateTime):
+                arrow_type = pa.timestamp("us")
+            elif isinstance(column.type, LargeBinary):
+                arrow_type = pa.binary()
+            else:
+                arrow_type = pa.string()
+            fields.append(pa.field(column.name, arrow_type))
+        return pa.schema(fields)
+
+    def _month_dir(self, table_name: str, month: datetime) -> Path:
+        return self.root / table_name / f"month={month:%Y-%m}"
+
+    def _files_in_range(self, table_name: str, start_time: datetime, end_time: datetime) -> List[str]:
+        """列出时间范围覆盖的月份分区中的Parquet文件"""
+        files = []
+        month = _month_start(start_time)
+        while month <= end_time:
+            month_dir = self._month_dir(table_name, month)
+            if month_dir.is_dir():
+                files.extend(str(path) for path in sorted(month_dir.glob("*.parquet")))
+            month = _next_month(month)
+        return files
+
+
+# 全局归档实例
+_snapshot_archive: Optional[SnapshotArchive] = None
+_snapshot_archive_lock = threading.Lock()
+
+
+def get_snapshot_archive() -> SnapshotArchive:
+    """获取全局快照归档实例（单例模式）"""
+    global _snapshot_archive
+    if _snapshot_archive is None:
+        with _snapshot_archive_lock:
+            if _snapshot_archive is None:
+                settings = get_settings().database
+                _snapshot_archive = SnapshotArchive(settings.archive_dir, settings.archive_chunk_size)
+    return _snapshot_archive
+
+
+def archive_task_wrapper() -> Dict[str, Any]:
+    """
+    APScheduler归档任务函数 - 归档archive_after_days天之前的快照
+
+    Returns:
+        归档结果字典
+    """
+    from app.database.connection import SessionLocal
+
+    cutoff = datetime.now() - timedelta(days=get_settings().database.archive_after_days)
+    try:
+        with SessionLocal() as db:
+            archived = get_snapshot_archive().archive_before(db, cutoff)
+        return {"success": True, "archived": archived}
+    except Exception as e:
+        error_msg = f"快照归档任务执行失败: {str(e)}"
+        logger.error(error_msg)
+        return {"success": False, "error": error_msg}
@@ -3,17 +3,18 @@
 """
 
 from datetime import datetime, timedelta
-from typing import Any, Optional, cast
+from typing import Any, Mapping, Optional, Sequence, cast
 
-from sqlalchemy import desc, func, select, text
+from sqlalchemy import delete, desc, func, select
 from sqlalchemy.orm import Session
 
-from app.database.sql.book_queries import (
-    BOOK_HISTORY_QUERY,
-)
-from app.database.db.book import Book, BookSnapshot
+from app.database.db.book import Book, BookSnapshot, BookSnapshotRollup
+from app.config import get_settings
+from app.database.service.Base import bulk_insert, chunked, complete_rows, dialect_insert, time_bucket
+from app.database.service.archive_service import get_snapshot_archive
+from app.database.service.snapshot_digest import SNAPSHOT_DIGEST_FIELDS, get_snapshot_digest_cache
 from app.models import book
-from app.utils import filter_dict, get_model_fields
+from app.utils import filter_dict, get_model_fields, iter_time_buckets, time_bucket_start, TIME_BUCKET_FORMATS, update_dict
 
 
 class BookService:
@@ -35,29 +36,34 @@ class BookService:
         return db.get(Book, novel_id)
 
     @staticmethod
-    def create_book(db: Session, book_data: dict[str, Any]) -> Book:
+    def create_book(db: Session, book_data: dict[str, Any], commit: bool = True) -> Book:
         """
         创建新书籍
 
         :param db: 数据库会话对象，用于执行数据库操作
         :param book_data: 书籍数据字典，包含novel_id、title等Book模型字段的键值对
+        :param commit: 是否立即提交事务，为False时只flush，由调用方统一提交
         :return: 创建后的Book对象，包含自动生成的ID和时间戳等信息
         """
         filtered_data = filter_dict(book_data, Book)
         book_record = Book(**filtered_data)
         db.add(book_record)
-        db.commit()
-        db.refresh(book_record)
+        if commit:
+            db.commit()
+            db.refresh(book_record)
+        else:
+            db.flush()
         return book_record
 
     @staticmethod
-    def update_book(db: Session, book_record: Book, book_data: dict[str, Any]) -> Book:
+    def update_book(db: Session, book_record: Book, book_data: dict[str, Any], commit: bool = True) -> Book:
         """
         更新现有书籍
 
         :param db: 数据库会话对象，用于执行数据库操作
         :param book_record: 要更新的Book对象实例，必须是已存在于数据库中的对象
         :param book_data: 更新数据字典，包含要更新的字段名和新值的键值对
+        :param commit: 是否立即提交事务，为False时只flush，由调用方统一提交
         :return: 更新后的Book对象，updated_at字段会被自动设置为当前时间
         """
         filtered_data = filter_dict(book_data, Book)
@@ -65,16 +71,20 @@ class BookService:
             setattr(book_record, key, value)
         book_record.updated_at = datetime.now()
         db.add(book_record)
-        db.commit()
-        db.refresh(book_record)
+        if commit:
+            db.commit()
+            db.refresh(book_record)
+        else:
+            db.flush()
         return book_record
 
-    def create_or_update_book(self, db: Session, book_data: dict[str, Any]) -> Book:
+    def create_or_update_book(self, db: Session, book_data: dict[str, Any], commit: bool = True) -> Book:
         """
         根据novel_id创建或更新书籍（Upsert操作）
 
         :param db: 数据库会话对象，用于执行数据库操作
         :param book_data: 书籍数据字典，必须包含novel_id字段，其他字段为Book模型的属性
+        :param commit: 是否立即提交事务，为False时在SAVEPOINT中创建，冲突只回滚到保存点
         :return: 创建或更新后的Book对象
         :raises ValueError: 当book_data中缺少novel_id字段时抛出
         """
@@ -92,37 +102,276 @@ class BookService:
         # 尝试获取已存在的书籍
         book = self.get_book_by_novel_id(db, novel_id)
         if book:
-            return self.update_book(db, book, book_data)
+            return self.update_book(db, book, book_data, commit=commit)
 
         # 如果不存在，尝试创建新书籍
         try:
-            return self.create_book(db, book_data)
+            if commit:
+                return self.create_book(db, book_data)
+            with db.begin_nested():
+                return self.create_book(db, book_data, commit=False)
         except Exception as e:
             # 如果创建失败（可能是并发导致的重复插入），再次尝试获取并更新
             error_str = str(e).lower()
             if "unique constraint failed" in error_str or "duplicate" in error_str:
-                # 刷新会话，重新获取可能已经被其他事务创建的记录
-                db.rollback()
+                # 刷新会话，重新获取可能已经被其他事务创建的记录；
+                # 非提交模式下保存点已回滚，不能回滚整个事务
+                if commit:
+                    db.rollback()
                 book = self.get_book_by_novel_id(db, novel_id)
                 if book:
-                    return self.update_book(db, book, book_data)
+                    return self.update_book(db, book, book_data, commit=commit)
             # 如果仍然失败，重新抛出异常
             raise e
 
     @staticmethod
-    def batch_create_book_snapshots(db: Session, snapshots: list[dict[str, Any]]) -> list[BookSnapshot]:
+    def bulk_upsert_books(db: Session, books: list[dict[str, Any]]) -> list[int]:
+        """
+        批量创建或更新书籍，使用多行 INSERT ... ON CONFLICT(novel_id) DO UPDATE
+
+        同一novel_id出现多次时按出现顺序合并，后出现的非空字段覆盖先出现的字段；
+        作者字段为空时保留数据库中已有的值；novel_id缺失、格式错误或缺少标题的记录会被跳过，避免单条坏数据导致整批写入失败。
+
+        :param db: 数据库会话对象，用于执行数据库操作
+        :param books: 书籍数据字典列表，每个元素包含novel_id、title等Book模型字段
+        :return: 实际写入的novel_id列表（已去重）
+        """
+        merged: dict[int, dict[str, Any]] = {}
+        for book_data in books:
+            try:
+                novel_id = int(book_data.get("novel_id"))
+            except (ValueError, TypeError):
+                continue
+            row = filter_dict(book_data, Book)
+            row["novel_id"] = novel_id
+            merged[novel_id] = update_dict(merged[novel_id], row) if novel_id in merged else row
+
+        valid_rows = [row for row in merged.values() if row.get("title")]
+        if not valid_rows:
+            return []
+
+        now = datetime.now()
+        rows = [
+            {
+                "novel_id": row["novel_id"],
+                "title": row.get("title"),
+                "author_id": row.get("author_id"),
+                "author_name": row.get("author_name"),
+                "created_at": now,
+                "updated_at": now,
+            }
+            for row in valid_rows
+        ]
+        for chunk in chunked(rows):
+            stmt = dialect_insert(db, Book).values(chunk)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[Book.novel_id],
+                set_={
+                    "title": stmt.excluded.title,
+                    "author_id": func.coalesce(stmt.excluded.author_id, Book.author_id),
+                    "author_name": func.coalesce(stmt.excluded.author_name, Book.author_name),
+                    "updated_at": stmt.excluded.updated_at,
+                },
+            )
+            db.execute(stmt)
+        return [row["novel_id"] for row in rows]
+
+    @staticmethod
+    def batch_create_book_snapshots(
+            db: Session, snapshots: list[dict[str, Any]], commit: bool = True
+    ) -> int:
         """
         批量创建书籍快照
 
+        变化存储模式（snapshot_change_only）下，统计数据与该书上一条快照相同的快照不写入。
+
         :param db: 数据库会话对象，用于执行数据库操作
         :param snapshots: 快照数据列表，每个元素为包含BookSnapshot字段的字典
-        :return: 创建后的BookSnapshot对象列表，包含自动生成的ID等信息
+        :param commit: 是否立即提交事务，为False时只flush，由调用方统一提交
+        :return: 实际写入的快照数量
+        """
+        rows = complete_rows(BookSnapshot.__table__, snapshots)
+        if get_settings().database.snapshot_change_only:
+            rows = get_snapshot_digest_cache().filter_changed(db, rows, BookService.get_latest_snapshots)
+        # Core executemany直接写入行数据，不经过ORM的identity map和unit of work
+        bulk_insert(db, BookSnapshot.__table__, rows)
+        if get_settings().database.book_history_rollups:
+            BookService.upsert_snapshot_rollups(db, rows)
+        if commit:
+            db.commit()
+        return len(rows)
+
+    @staticmethod
+    def upsert_snapshot_rollups(db: Session, snapshot_rows: Sequence[Mapping[str, Any]]) -> None:
+        """
+        增量维护书籍快照时间段汇总表
+
+        每个(书籍, 时间间隔, 时间段)只保留时间最早的快照：新时间段直接插入，
+        已有时间段仅当新快照更早时才覆盖（快照乱序写入或重建汇总时）。
+
+        :param db: 数据库会话对象，用于执行数据库操作
+        :param snapshot_rows: 快照行数据列表，包含novel_id、snapshot_time和各统计字段
+        """
+        rows: dict[tuple[int, str, str], dict[str, Any]] = {}
+        for snapshot in snapshot_rows:
+            snapshot_time = snapshot["snapshot_time"]
+            for interval, time_format in TIME_BUCKET_FORMATS.items():
+                key = (snapshot["novel_id"], interval, snapshot_time.strftime(time_format))
+                if key in rows and rows[key]["snapshot_time"] <= snapshot_time:
+                    continue
+                rows[key] = {
+                    "novel_id": key[0],
+                    "interval": interval,
+                    "bucket": key[2],
+                    "snapshot_time": snapshot_time,
+                    **{field: snapshot[field] for field in SNAPSHOT_DIGEST_FIELDS},
+                }
+
+        if not rows:
+            return
+        # 同一条upsert语句按executemany执行，不为每批行数据重新编译多行VALUES语句
+        update_columns = ("snapshot_time", *SNAPSHOT_DIGEST_FIELDS)
+        stmt = dialect_insert(db, BookSnapshotRollup.__table__)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[BookSnapshotRollup.novel_id, BookSnapshotRollup.interval, BookSnapshotRollup.bucket],
+            set_={column: stmt.excluded[column] for column in update_columns},
+            where=stmt.excluded.snapshot_time < BookSnapshotRollup.snapshot_time,
+        )
+        db.execute(stmt, list(rows.values()))
+
+    @staticmethod
+    def rebuild_snapshot_rollups(db: Session, chunk_size: int = 5000) -> int:
+        """
+        根据book_snapshots重建时间段汇总表，用于开启汇总前已有的历史数据
+
+        :param db: 数据库会话对象，用于执行数据库操作
+        :param chunk_size: 每次读取的快照行数
+        :return: 处理的快照数量
+        """
+        processed, last_id = 0, 0
+        while True:
+            snapshot_rows = db.execute(
+                select(BookSnapshot.__table__)
+                .where(BookSnapshot.id > last_id)
+                .order_by(BookSnapshot.id)
+                .limit(chunk_size)
+            ).mappings().all()
+            if not snapshot_rows:
+                break
+            BookService.upsert_snapshot_rollups(db, snapshot_rows)
+            db.commit()
+            processed += len(snapshot_rows)
+            last_id = snapshot_rows[-1]["id"]
+        return processed
+
+    @staticmethod
+    def get_latest_snapshot_times(db: Session, novel_ids: list[int]) -> dict[int, datetime]:
+        """
+        批量获取书籍最新快照时间
+
+        :param db: 数据库会话对象，用于执行数据库操作
+        :param novel_ids: 书籍novel_id列表
+        :return: novel_id到最新snapshot_time的映射，没有快照的书籍不包含在结果中
+        """
+        latest_times = {}
+        for chunk in chunked(list(novel_ids)):
+            rows = db.execute(
+                select(BookSnapshot.novel_id, func.max(BookSnapshot.snapshot_time))
+                .where(BookSnapshot.novel_id.in_(chunk))
+                .group_by(BookSnapshot.novel_id)
+            )
+            latest_times.update({novel_id: snapshot_time for novel_id, snapshot_time in rows})
+        return latest_times
+
+    @staticmethod
+    def get_latest_snapshots(db: Session, novel_ids: list[int]) -> dict[int, dict[str, Any]]:
+        """
+        批量获取书籍最新一条快照
+
+        :param db: 数据库会话对象，用于执行数据库操作
+        :param novel_ids: 书籍novel_id列表
+        :return: novel_id到最新快照的映射，没有快照的书籍不包含在结果中
+        """
+        return {
+            novel_id: snapshots[0]
+            for novel_id, snapshots in BookService.get_recent_snapshots(db, novel_ids, 1).items()
+        }
+
+    @staticmethod
+    def compact_unchanged_snapshots(db: Session, commit: bool = True) -> int:
+        """
+        删除统计数据与同一本书上一条快照相同的快照，只保留每段不变数据的第一条
+
+        用于开启变化存储模式前已经积累的历史数据，历史查询的阶梯函数结果不变。
+
+        :param db: 数据库会话对象，用于执行数据库操作
+        :param commit: 是否立即提交事务
+        :return: 删除的快照数量
+        """
+        window = {"partition_by": BookSnapshot.novel_id, "order_by": (BookSnapshot.snapshot_time, BookSnapshot.id)}
+        columns = [getattr(BookSnapshot, field) for field in SNAPSHOT_DIGEST_FIELDS]
+        ranked = select(
+            BookSnapshot.id,
+            func.row_number().over(**window).label("rn"),
+            *columns,
+            *[func.lag(column).over(**window).label(f"prev_{column.key}") for column in columns],
+        ).subquery()
+        unchanged = select(ranked.c.id).where(
+            ranked.c.rn > 1,
+            *[ranked.c[field].is_not_distinct_from(ranked.c[f"prev_{field}"]) for field in SNAPSHOT_DIGEST_FIELDS],
+        )
+        ids = list(db.scalars(unchanged))
+        for chunk in chunked(ids):
+            db.execute(delete(BookSnapshot).where(BookSnapshot.id.in_(chunk)))
+        if commit:
+            db.commit()
+        else:
+            db.flush()
+        return len(ids)
+
+    @staticmethod
+    def get_recent_snapshots(
+            db: Session, novel_ids: list[int], count: int = 2
+    ) -> dict[int, list[dict[str, Any]]]:
         """
-        filtered_snapshots = [filter_dict(snapshot, BookSnapshot) for snapshot in snapshots]
-        snapshot_objs = [BookSnapshot(**snapshot) for snapshot in filtered_snapshots]
-        db.add_all(snapshot_objs)
-        db.commit()
-        return snapshot_objs
+        批量获取书籍最近的若干条快照
+
+        每本书的第k新快照用一个LIMIT 1 OFFSET k的关联子查询定位，沿(novel_id, snapshot_time)索引
+        倒序只读取count条，查询代价与书籍的快照总数无关。
+
+        :param db: 数据库会话对象，用于执行数据库操作
+        :param novel_ids: 书籍novel_id列表
+        :param count: 每本书返回的快照数量
+        :return: novel_id到快照列表的映射，快照按时间倒序，包含snapshot_time和各统计字段
+        """
+        fields = ("novel_id", "snapshot_time", *SNAPSHOT_DIGEST_FIELDS)
+        recent_snapshots: dict[int, list[dict[str, Any]]] = {}
+        for chunk in chunked(list(novel_ids)):
+            recent_ids = [
+                select(BookSnapshot.id)
+                .where(BookSnapshot.novel_id == Book.novel_id)
+                .order_by(desc(BookSnapshot.snapshot_time))
+                .limit(1)
+                .offset(offset)
+                .correlate(Book)
+                .scalar_subquery()
+                for offset in range(count)
+            ]
+            ids = [
+                snapshot_id
+                for row in db.execute(select(*recent_ids).where(Book.novel_id.in_(chunk)))
+                for snapshot_id in row if snapshot_id is not None
+            ]
+            if not ids:
+                continue
+            rows = db.execute(
+                select(*[getattr(BookSnapshot, field) for field in fields])
+                .where(BookSnapshot.id.in_(ids))
+                .order_by(BookSnapshot.novel_id, desc(BookSnapshot.snapshot_time))
+            )
+            for row in rows:
+                recent_snapshots.setdefault(row.novel_id, []).append(row._asdict())
+        return recent_snapshots
 
     # ==================== API操作 ====================
 
@@ -163,6 +412,9 @@ class BookService:
         :param count: 时间段数量，表示向前追溯多少个时间间隔单位
         :return: BookSnapshot对象列表，每个时间间隔的第一个快照，按时间倒序排列
         :raises ValueError: 当interval参数不在支持的值范围内时抛出
+
+        变化存储模式下，没有快照的时间段使用之前最近一条快照的值补齐。
+        时间范围覆盖已归档的月份时，从Parquet归档中补充数据。
         """
         # 计算查询时间范围
         end_time = datetime.now()
@@ -177,22 +429,225 @@ class BookService:
             raise ValueError(f"不支持的时间间隔: {interval}")
 
         start_time = end_time - time_deltas[interval]
-        result = db.execute(
-            text(BOOK_HISTORY_QUERY),
-            {
-                "novel_id": novel_id,
-                "interval": interval,
-                "start_time": start_time,
-                "end_time": end_time,
-            }
-        )
+        if get_settings().database.snapshot_change_only:
+            return BookService._get_step_snapshots(db, novel_id, interval, start_time, end_time)
+
+        time_format = TIME_BUCKET_FORMATS[interval]
+        snapshots = None
+        if get_settings().database.book_history_rollups:
+            snapshots = BookService._get_rollup_snapshots(db, novel_id, interval, start_time, end_time)
+        if snapshots is None:
+            # 汇总表未覆盖（未开启、尚未重建或部分时间段缺失）时回退到原始快照查询
+            snapshots = BookService._first_snapshot_per_bucket(db, novel_id, interval, start_time, end_time)
+
+        # 归档的快照都早于数据库中的快照，同一时间段内归档中的第一条即为该段的第一个快照
+        archived = BookService._read_archived_snapshots(novel_id, start_time, end_time)
+        if not archived:
+            return snapshots
+        first_by_bucket: dict[str, book.BookSnapshot] = {}
+        for snapshot in [book.BookSnapshot.model_validate(row) for row in archived] + snapshots:
+            first_by_bucket.setdefault(snapshot.snapshot_time.strftime(time_format), snapshot)
+        return sorted(first_by_bucket.values(), key=lambda snapshot: snapshot.snapshot_time)
+
+    @staticmethod
+    def _get_rollup_snapshots(
+            db: Session, novel_id: int, interval: str, start_time: datetime, end_time: datetime
+    ) -> Optional[list[book.BookSnapshot]]:
+        """
+        从汇总表获取每个时间段的第一个快照
+
+        汇总行是完整时间段的第一个快照。开始时间不在时间段起点时第一个时间段只查询开始时间之后的部分，
+        该段在原始快照上取开始时间之后的第一条，其余时间段使用汇总表。
+
+        :param db: 数据库会话对象
+        :param novel_id: 书籍novel_id
+        :param interval: 时间间隔类型
+        :param start_time: 开始时间（包含）
+        :param end_time: 结束时间（包含）
+        :return: 每个时间段的第一个快照，按时间升序，汇总表未覆盖时间范围时返回None
+        """
+        time_format = TIME_BUCKET_FORMATS[interval]
+        snapshots = []
+        rollup_start = start_time
+        if time_bucket_start(start_time, interval) < start_time:
+            buckets = iter_time_buckets(start_time, end_time, interval)
+            first_snapshot = db.scalars(
+                select(BookSnapshot)
+                .where(
+                    BookSnapshot.novel_id == novel_id,
+                    BookSnapshot.snapshot_time >= start_time,
+                    BookSnapshot.snapshot_time <= end_time,
+                )
+                .order_by(BookSnapshot.snapshot_time)
+                .limit(1)
+            ).first()
+            if first_snapshot is not None and first_snapshot.snapshot_time.strftime(time_format) == buckets[0][0]:
+                snapshots.append(book.BookSnapshot.model_validate(first_snapshot))
+            if len(buckets) == 1:
+                return snapshots
+            rollup_start = buckets[1][1]
+
+        # 汇总表上按时间段键的一次索引范围扫描
+        rollups = list(db.scalars(
+            select(BookSnapshotRollup)
+            .where(
+                BookSnapshotRollup.novel_id == novel_id,
+                BookSnapshotRollup.interval == interval,
+                BookSnapshotRollup.bucket >= rollup_start.strftime(time_format),
+                BookSnapshotRollup.bucket <= end_time.strftime(time_format),
+            )
+            .order_by(BookSnapshotRollup.bucket)
+        ))
+        if not BookService._rollups_cover_range(db, novel_id, rollups, time_format, rollup_start, end_time):
+            return None
+        return snapshots + [book.BookSnapshot.model_validate(row) for row in rollups]
+
+    @staticmethod
+    def _rollups_cover_range(
+            db: Session, novel_id: int, rollups: list[BookSnapshotRollup], time_format: str,
+            start_time: datetime, end_time: datetime
+    ) -> bool:
+        """
+        检查汇总行是否覆盖时间范围内的原始快照
+
+        汇总行由写入时增量维护，缺失只出现在开启汇总之前（未重建）或关闭汇总期间写入的快照，
+        因此只检查范围内最早和最晚一条原始快照所在的时间段，各用一次索引查找。
+
+        :param db: 数据库会话对象
+        :param novel_id: 书籍novel_id
+        :param rollups: 时间范围内的汇总行
+        :param time_format: 时间段格式
+        :param start_time: 开始时间（包含）
+        :param end_time: 结束时间（包含）
+        :return: 最早和最晚的原始快照所在时间段都有汇总行时返回True
+        """
+        in_range = select(BookSnapshot.snapshot_time).where(
+            BookSnapshot.novel_id == novel_id,
+            BookSnapshot.snapshot_time >= start_time,
+            BookSnapshot.snapshot_time <= end_time,
+        ).limit(1)
+        first_time = db.scalar(in_range.order_by(BookSnapshot.snapshot_time))
+        if first_time is None:
+            return True
+        last_time = db.scalar(in_range.order_by(desc(BookSnapshot.snapshot_time)))
+        buckets = {rollup.bucket for rollup in rollups}
+        return first_time.strftime(time_format) in buckets and last_time.strftime(time_format) in buckets
+
+    @staticmethod
+    def _first_snapshot_per_bucket(
+            db: Session, novel_id: int, interval: str, start_time: datetime, end_time: datetime
+    ) -> list[book.BookSnapshot]:
+        """
+        在book_snapshots上按时间段分组，取每个时间段的第一个快照
+
+        :param db: 数据库会话对象
+        :param novel_id: 书籍novel_id
+        :param interval: 时间间隔类型
+        :param start_time: 开始时间（包含）
+        :param end_time: 结束时间（包含）
+        :return: 每个时间段的第一个快照，按时间升序
+        """
+        ranked = select(
+            *BookSnapshot.__table__.columns,
+            func.row_number().over(
+                partition_by=time_bucket(db, BookSnapshot.snapshot_time, interval),
+                order_by=BookSnapshot.snapshot_time,
+            ).label("rn"),
+        ).where(
+            BookSnapshot.novel_id == novel_id,
+            BookSnapshot.snapshot_time >= start_time,
+            BookSnapshot.snapshot_time <= end_time,
+        ).subquery()
+        result = db.execute(select(ranked).where(ranked.c.rn == 1).order_by(ranked.c.snapshot_time))
         return [book.BookSnapshot.model_validate(row._asdict()) for row in result]
 
+    @staticmethod
+    def _read_archived_snapshots(novel_id: int, start_time: datetime, end_time: datetime) -> list[BookSnapshot]:
+        """
+        从Parquet归档中读取书籍快照
+
+        :param novel_id: 书籍novel_id
+        :param start_time: 开始时间（包含）
+        :param end_time: 结束时间（包含）
+        :return: 未加入会话的BookSnapshot对象列表，按时间升序
+        """
+        rows = get_snapshot_archive().read(BookSnapshot.__tablename__, start_time, end_time, novel_id=novel_id)
+        return [BookSnapshot(**row) for row in rows]
+
+    @staticmethod
+    def _read_latest_archived_snapshot(novel_id: int, before: datetime) -> Optional[BookSnapshot]:
+        """
+        从Parquet归档中读取书籍在before之前的最后一条快照
+
+        :param novel_id: 书籍novel_id
+        :param before: 截止时间（包含）
+        :return: 未加入会话的BookSnapshot对象，没有归档时返回None
+        """
+        row = get_snapshot_archive().read_latest(BookSnapshot.__tablename__, before, novel_id=novel_id)
+        return BookSnapshot(**row) if row else None
+
+    @staticmethod
+    def _get_step_snapshots(
+            db: Session, novel_id: int, interval: str, start_time: datetime, end_time: datetime
+    ) -> list[book.BookSnapshot]:
+        """
+        按阶梯函数获取每个时间段开始时的快照值（变化存储模式）
+
+        每个时间段取段开始时刻最近的一条快照，时间记为段开始时间；
+        段开始前还没有快照时取段内第一条快照。
+
+        :param db: 数据库会话对象，用于执行数据库操作
+        :param novel_id: 书籍主键novel_id
+        :param interval: 时间间隔类型
+        :param start_time: 查询开始时间
+        :param end_time: 查询结束时间
+        :return: BookSnapshot对象列表，按时间升序
+        """
+        seed = db.scalars(
+            select(BookSnapshot)
+            .where(BookSnapshot.novel_id == novel_id, BookSnapshot.snapshot_time < start_time)
+            .order_by(desc(BookSnapshot.snapshot_time))
+            .limit(1)
+        ).first()
+        rows = list(db.scalars(
+            select(BookSnapshot)
+            .where(
+                BookSnapshot.novel_id == novel_id,
+                BookSnapshot.snapshot_time >= start_time,
+                BookSnapshot.snapshot_time <= end_time,
+            )
+            .order_by(BookSnapshot.snapshot_time)
+        ))
+
+        # 归档的快照都早于数据库中的快照，数据库中没有段开始前的快照时向前查找最后一条归档快照
+        if seed is None:
+            seed = BookService._read_latest_archived_snapshot(novel_id, start_time - timedelta(microseconds=1))
+        rows = BookService._read_archived_snapshots(novel_id, start_time, end_time) + rows
+
+        time_format = TIME_BUCKET_FORMATS[interval]
+        results = []
+        current, index = seed, 0
+        for bucket_key, bucket_start in iter_time_buckets(start_time, end_time, interval):
+            while index < len(rows) and rows[index].snapshot_time <= bucket_start:
+                current = rows[index]
+                index += 1
+            if current is not None:
+                snapshot = book.BookSnapshot.model_validate(current)
+                results.append(snapshot.model_copy(update={"snapshot_time": bucket_start}))
+            elif index < len(rows) and rows[index].snapshot_time.strftime(time_format) == bucket_key:
+                current = rows[index]
+                index += 1
+                results.append(book.BookSnapshot.model_validate(current))
+        return results
+
     @staticmethod
     def get_book_detail_by_novel_id(db: Session, novel_id: int) -> Optional[book.BookDetail]:
         """
         获取书籍详情和最新快照数据, 并聚合成一个Pydantic模型返回。
 
+        变化存储模式下未变化的快照不写入，最新爬取时间取摘要缓存中的最后爬取时间，未缓存时取最新快照时间。
+        数据库中的快照都已归档时取最后一条归档快照。
+
         :param db: 数据库会话对象，用于执行数据库操作
         :param novel_id: 书籍主键novel_id，对应Book.novel_id字段
         :return: BookDetail Pydantic模型实例，如果书籍不存在则返回None
@@ -204,15 +659,22 @@ class BookService:
             .order_by(desc(BookSnapshot.snapshot_time))
             .limit(1)
         ).scalars().first()
+        if book_record and not latest_snapshot:
+            latest_snapshot = BookService._read_latest_archived_snapshot(novel_id, datetime.now())
         if not book_record or not latest_snapshot:
             return None
         book_dict = {
             "novel_id": book_record.novel_id,
             "title": book_record.title
         }
+        snapshot_time = latest_snapshot.snapshot_time
+        if get_settings().database.snapshot_change_only:
+            last_seen = get_snapshot_digest_cache().last_seen(novel_id)
+            if last_seen is not None and last_seen > snapshot_time:
+                snapshot_time = last_seen
         # 将SQLAlchemy对象转换为字典
         snapshot_dict = {
-            "snapshot_time": latest_snapshot.snapshot_time,
+            "snapshot_time": snapshot_time,
             "favorites": latest_snapshot.favorites,
             "clicks": latest_snapshot.clicks,
             "comments": latest_snapshot.comments,
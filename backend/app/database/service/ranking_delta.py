@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+榜单快照差量编码 - 关键帧加位置差量的紧凑存储格式
+
+每个(榜单, 批次)编码为一个zlib压缩的JSON数据块：
+- 关键帧：完整的 [novel_id, position] 列表，按位置排序
+- 差量：相对上一批次新增或位置变化的书籍(set)和离榜的书籍(del)
+
+还原某一批次时，从它之前最近的关键帧开始依次应用差量。
+"""
+
+import json
+import zlib
+from typing import Dict
+
+# novel_id到排名位置的映射
+Entries = Dict[int, int]
+
+
+def encode_keyframe(entries: Entries) -> bytes:
+    """
+    编码关键帧
+
+    :param entries: 完整的novel_id到位置映射
+    :return: 压缩后的数据块
+    """
+    items = sorted(entries.items(), key=lambda item: item[1])
+    return _compress({"k": [[novel_id, position] for novel_id, position in items]})
+
+
+def encode_delta(previous: Entries, current: Entries) -> bytes:
+    """
+    编码相对上一批次的位置差量
+
+    :param previous: 上一批次的novel_id到位置映射
+    :param current: 当前批次的novel_id到位置映射
+    :return: 压缩后的数据块
+    """
+    changed = [[novel_id, position] for novel_id, position in current.items() if previous.get(novel_id) != position]
+    removed = [novel_id for novel_id in previous if novel_id not in current]
+    return _compress({"set": changed, "del": removed})
+
+
+def apply_payload(previous: Entries, payload: bytes) -> Entries:
+    """
+    在上一批次的基础上应用数据块，得到当前批次的完整映射
+
+    :param previous: 上一批次的novel_id到位置映射，关键帧时忽略
+    :param payload: 关键帧或差量数据块
+    :return: 新的novel_id到位置映射（不修改previous）
+    """
+    data = json.loads(zlib.decompress(payload))
+    if "k" in data:
+        return {novel_id: position for novel_id, position in data["k"]}
+    entries = dict(previous)
+    for novel_id in data.get("del", []):
+        entries.pop(novel_id, None)
+    for novel_id, position in data.get("set", []):
+        entries[novel_id] = position
+    return entries
+
+
+def _compress(data: dict) -> bytes:
+    return zlib.compress(json.dumps(data, separators=(",", ":")).encode("utf-8"))
@@ -2,16 +2,35 @@
 榜单业务逻辑服务 - 集成DAO功能的简化版本
 """
 
+import threading
 from datetime import date, datetime, time, timedelta
-from typing import Any, List, Optional, Tuple
+from typing import Any, List, Mapping, Optional, Sequence, Tuple
 
-from sqlalchemy import and_, desc, func, or_, select
+from sqlalchemy import and_, delete, desc, func, or_, select
 from sqlalchemy.orm import Session
 
+from app.config import get_settings
+from app.logger import get_logger
 from app.models import book, ranking
-from ..db.ranking import Ranking, RankingSnapshot
+from ..db.ranking import Ranking, RankingBatchIndex, RankingBookPosition, RankingSnapshot, RankingSnapshotBatch
+from .Base import bulk_insert, chunked, complete_rows, dialect_insert, time_bucket
+from .archive_service import RANKING_ARCHIVE_TABLES, get_snapshot_archive
+from .ranking_delta import Entries, apply_payload, encode_delta, encode_keyframe
 from ...utils import filter_dict, get_model_fields, generate_ranking_hash_id
 
+logger = get_logger(__name__)
+
+# 批次索引表维护的时间间隔及时间段格式
+BATCH_INDEX_FORMATS = {
+    "hour": "%Y-%m-%d %H",
+    "day": "%Y-%m-%d",
+}
+
+# 每个榜单最后写入的差量批次还原后的排名，键为(批次主键, batch_id, 快照时间)
+# 写入下一批次时与数据库中的上一批次一致才直接计算差量，否则从关键帧重新还原
+_delta_tails: dict[int, tuple[tuple[int, str, datetime], Entries]] = {}
+_delta_tails_lock = threading.Lock()
+
 
 class RankingService:
     """榜单业务逻辑服务 - 直接操作数据库"""
@@ -19,7 +38,7 @@ class RankingService:
     # ==================== 爬虫使用的方法 ====================
 
     def create_or_update_ranking(
-            self, db: Session, ranking_data: dict[str, Any]
+            self, db: Session, ranking_data: dict[str, Any], commit: bool = True
     ) -> Ranking:
         """
         根据ranking_data中的信息创建或更新榜单。
@@ -27,6 +46,7 @@ class RankingService:
         
         :param db: 数据库会话对象
         :param ranking_data: 榜单数据字典
+        :param commit: 是否立即提交事务，为False时只flush，由调用方统一提交
         :return: 创建或更新后的Ranking对象
         """
         # 生成hash_id
@@ -38,34 +58,450 @@ class RankingService:
 
         if existing_ranking:
             # 榜单已存在，更新它
-            return self.update_ranking(db, existing_ranking, ranking_data)
+            return self.update_ranking(db, existing_ranking, ranking_data, commit=commit)
         else:
             # 榜单不存在，创建新榜单
-            return self.create_ranking(db, ranking_data)
+            return self.create_ranking(db, ranking_data, commit=commit)
+
+    @staticmethod
+    def bulk_upsert_rankings(db: Session, rankings_data: list[dict[str, Any]]) -> dict[str, int]:
+        """
+        批量创建或更新榜单，并一次性查询所有榜单的主键ID
+
+        使用 INSERT ... ON CONFLICT(hash_id) DO UPDATE 写入，
+        写入后通过一次 hash_id IN (...) 查询解析出所有榜单ID。
+
+        :param db: 数据库会话对象
+        :param rankings_data: 榜单数据字典列表，会为每个字典补充hash_id字段
+        :return: hash_id到榜单ID的映射
+        """
+        if not rankings_data:
+            return {}
+
+        now = datetime.now()
+        rows: dict[str, dict[str, Any]] = {}
+        for ranking_data in rankings_data:
+            hash_id = generate_ranking_hash_id(ranking_data)
+            ranking_data["hash_id"] = hash_id
+            row = {
+                "rank_id": ranking_data.get("rank_id"),
+                "hash_id": hash_id,
+                "channel_name": ranking_data.get("channel_name"),
+                "rank_group_type": ranking_data.get("rank_group_type"),
+                "channel_id": ranking_data.get("channel_id"),
+                "page_id": ranking_data.get("page_id"),
+                "sub_channel_name": ranking_data.get("sub_channel_name"),
+                "created_at": now,
+                "updated_at": now,
+            }
+            rows[hash_id] = row
+
+        update_columns = ("rank_id", "channel_name", "rank_group_type", "channel_id",
+                          "page_id", "sub_channel_name", "updated_at")
+        for chunk in chunked(list(rows.values())):
+            stmt = dialect_insert(db, Ranking).values(chunk)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[Ranking.hash_id],
+                set_={column: stmt.excluded[column] for column in update_columns},
+            )
+            db.execute(stmt)
+
+        result = db.execute(
+            select(Ranking.hash_id, Ranking.id).where(Ranking.hash_id.in_(list(rows.keys())))
+        )
+        return {hash_id: ranking_id for hash_id, ranking_id in result}
 
     @staticmethod
     def batch_create_ranking_snapshots(
-            db: Session, snapshots: list[dict[str, Any]], batch_id: str = None
-    ) -> list[RankingSnapshot]:
+            db: Session, snapshots: list[dict[str, Any]], batch_id: str = None, commit: bool = True
+    ) -> int:
         """
         批量创建榜单快照 - 支持batch_id
-        
+
+        同一榜单批次中重复出现的书籍只保留第一条（排名最靠前），避免唯一约束冲突导致整个事务失败。
+
         :param db: 数据库会话
         :param snapshots: 快照数据列表
-        :param batch_id: 批次ID，如果不提供则自动生成
-        :return: 创建的快照对象列表
+        :param batch_id: 批次ID，如果不提供则保留快照数据中已有的batch_id
+        :param commit: 是否立即提交事务，为False时只flush，由调用方统一提交
+        :return: 写入的快照数量
         """
 
         # 为所有快照数据添加batch_id
-        for snapshot in snapshots:
-            snapshot['batch_id'] = batch_id
+        if batch_id:
+            for snapshot in snapshots:
+                snapshot['batch_id'] = batch_id
+
+        # 整理为表中的列，缺少快照时间的记录使用同一时间
+        rows = complete_rows(RankingSnapshot.__table__, snapshots, defaults={"snapshot_time": datetime.now()})
+        unique_rows: dict[tuple[int, int, str], dict[str, Any]] = {}
+        for row in rows:
+            unique_rows.setdefault((row["ranking_id"], row["novel_id"], row["batch_id"]), row)
+        if len(unique_rows) < len(rows):
+            logger.warning(f"榜单快照中有 {len(rows) - len(unique_rows)} 条重复书籍，已跳过")
+            rows = list(unique_rows.values())
+        if get_settings().database.ranking_storage == "delta":
+            # 差量存储格式：快照不写入ranking_snapshots表，批次索引只指向ranking_snapshots中的批次，不需要维护
+            RankingService._save_delta_batches(db, rows)
+        else:
+            RankingService.upsert_batch_index(db, rows)
+            # Core executemany直接写入行数据，不经过ORM的identity map和unit of work
+            bulk_insert(db, RankingSnapshot.__table__, rows)
+        if commit:
+            db.commit()
+        else:
+            db.flush()
+        return len(rows)
+
+    @staticmethod
+    def upsert_batch_index(db: Session, snapshot_rows: Sequence[Mapping[str, Any]]) -> None:
+        """
+        维护榜单批次索引表：每个(榜单, 时间间隔, 时间段)记录时间最晚的批次
+
+        :param db: 数据库会话
+        :param snapshot_rows: 快照行数据列表，包含ranking_id、batch_id和snapshot_time
+        """
+        rows: dict[tuple[int, str, str], dict[str, Any]] = {}
+        for snapshot in snapshot_rows:
+            snapshot_time = snapshot["snapshot_time"]
+            for interval, time_format in BATCH_INDEX_FORMATS.items():
+                key = (snapshot["ranking_id"], interval, snapshot_time.strftime(time_format))
+                if key in rows and rows[key]["snapshot_time"] >= snapshot_time:
+                    continue
+                rows[key] = {
+                    "ranking_id": key[0],
+                    "interval": interval,
+                    "bucket": key[2],
+                    "batch_id": snapshot["batch_id"],
+                    "snapshot_time": snapshot_time,
+                }
+
+        if not rows:
+            return
+        stmt = dialect_insert(db, RankingBatchIndex.__table__)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[RankingBatchIndex.ranking_id, RankingBatchIndex.interval, RankingBatchIndex.bucket],
+            set_={"batch_id": stmt.excluded.batch_id, "snapshot_time": stmt.excluded.snapshot_time},
+            where=stmt.excluded.snapshot_time >= RankingBatchIndex.snapshot_time,
+        )
+        db.execute(stmt, list(rows.values()))
+
+    @staticmethod
+    def rebuild_batch_index(db: Session) -> int:
+        """
+        根据ranking_snapshots重建榜单批次索引表，用于索引表上线前已有的历史数据
+
+        :param db: 数据库会话
+        :return: 处理的批次数量
+        """
+        batches = db.execute(
+            select(RankingSnapshot.ranking_id, RankingSnapshot.batch_id, func.max(RankingSnapshot.snapshot_time))
+            .group_by(RankingSnapshot.ranking_id, RankingSnapshot.batch_id)
+        ).all()
+        RankingService.upsert_batch_index(db, [
+            {"ranking_id": ranking_id, "batch_id": batch_id, "snapshot_time": snapshot_time}
+            for ranking_id, batch_id, snapshot_time in batches
+        ])
+        db.commit()
+        return len(batches)
+
+    @staticmethod
+    def _lookup_batch_index(
+            db: Session, ranking_id: int, interval: str, start_time: datetime, end_time: datetime
+    ) -> list[str]:
+        """
+        从批次索引表查找时间段范围内每个时间段的最后一个批次
+
+        :param db: 数据库会话
+        :param ranking_id: 榜单ID
+        :param interval: 时间间隔类型，hour或day
+        :param start_time: 开始时间，所在时间段包含在内
+        :param end_time: 结束时间，所在时间段包含在内
+        :return: 批次ID列表，按时间段升序
+        """
+        time_format = BATCH_INDEX_FORMATS[interval]
+        return list(db.scalars(
+            select(RankingBatchIndex.batch_id)
+            .where(
+                RankingBatchIndex.ranking_id == ranking_id,
+                RankingBatchIndex.interval == interval,
+                RankingBatchIndex.bucket >= start_time.strftime(time_format),
+                RankingBatchIndex.bucket <= end_time.strftime(time_format),
+            )
+            .order_by(RankingBatchIndex.bucket)
+        ))
+
+    @staticmethod
+    def _batch_index_covers_range(
+            db: Session, ranking_id: int, interval: str, start_time: datetime, end_time: datetime
+    ) -> bool:
+        """
+        检查批次索引表是否覆盖时间范围内ranking_snapshots中的批次
+
+        索引表由写入时增量维护，缺失只出现在建表之前（未重建）写入的快照，
+        因此只检查范围内最早和最晚一条快照所在的时间段，各用一次索引查找。
+
+        :param db: 数据库会话
+        :param ranking_id: 榜单ID
+        :param interval: 时间间隔类型，hour或day
+        :param start_time: 开始时间（包含）
+        :param end_time: 结束时间（包含）
+        :return: 最早和最晚的快照所在时间段都有索引行时返回True
+        """
+        in_range = select(RankingSnapshot.snapshot_time).where(
+            RankingSnapshot.ranking_id == ranking_id,
+            RankingSnapshot.snapshot_time >= start_time,
+            RankingSnapshot.snapshot_time <= end_time,
+        ).limit(1)
+        first_time = db.scalar(in_range.order_by(RankingSnapshot.snapshot_time))
+        if first_time is None:
+            return True
+        last_time = db.scalar(in_range.order_by(desc(RankingSnapshot.snapshot_time)))
+        time_format = BATCH_INDEX_FORMATS[interval]
+        buckets = {first_time.strftime(time_format), last_time.strftime(time_format)}
+        indexed = db.scalar(
+            select(func.count())
+            .select_from(RankingBatchIndex)
+            .where(
+                RankingBatchIndex.ranking_id == ranking_id,
+                RankingBatchIndex.interval == interval,
+                RankingBatchIndex.bucket.in_(buckets),
+            )
+        )
+        return indexed == len(buckets)
+
+    @staticmethod
+    def _get_indexed_batch_id(db: Session, ranking_id: int, interval: str, moment: datetime) -> Optional[str]:
+        """
+        按唯一键从批次索引表查找时间点所在时间段的最后一个批次
+
+        :param db: 数据库会话
+        :param ranking_id: 榜单ID
+        :param interval: 时间间隔类型，hour或day
+        :param moment: 时间段内的任意时间点
+        :return: 批次ID，索引表中没有时返回None
+        """
+        return db.scalar(
+            select(RankingBatchIndex.batch_id).where(
+                RankingBatchIndex.ranking_id == ranking_id,
+                RankingBatchIndex.interval == interval,
+                RankingBatchIndex.bucket == moment.strftime(BATCH_INDEX_FORMATS[interval]),
+            )
+        )
+
+    @staticmethod
+    def _save_delta_batches(db: Session, snapshot_rows: Sequence[Mapping[str, Any]]) -> None:
+        """
+        按(榜单, 批次)把快照编码为关键帧或位置差量写入ranking_snapshot_batches
+
+        :param db: 数据库会话
+        :param snapshot_rows: 快照行数据列表
+        """
+        keyframe_interval = get_settings().database.ranking_keyframe_interval
+        batches: dict[tuple[int, str], list[Mapping[str, Any]]] = {}
+        for snapshot in snapshot_rows:
+            batches.setdefault((snapshot["ranking_id"], snapshot["batch_id"]), []).append(snapshot)
+
+        positions = []
+        for (ranking_id, batch_id), batch_snapshots in batches.items():
+            entries = {s["novel_id"]: s["position"] for s in batch_snapshots}
+            previous = db.execute(
+                select(RankingSnapshotBatch)
+                .where(RankingSnapshotBatch.ranking_id == ranking_id)
+                .order_by(desc(RankingSnapshotBatch.snapshot_time), desc(RankingSnapshotBatch.id))
+                .limit(1)
+            ).scalar_one_or_none()
+
+            if previous is None or previous.sequence + 1 >= keyframe_interval:
+                is_keyframe, sequence, payload = True, 0, encode_keyframe(entries)
+            else:
+                is_keyframe, sequence = False, previous.sequence + 1
+                payload = encode_delta(RankingService._previous_delta_entries(db, previous), entries)
+
+            batch = RankingSnapshotBatch(
+                ranking_id=ranking_id,
+                batch_id=batch_id,
+                is_keyframe=is_keyframe,
+                sequence=sequence,
+                book_count=len(entries),
+                payload=payload,
+                snapshot_time=batch_snapshots[0]["snapshot_time"],
+            )
+            db.add(batch)
+            # 同一次写入中的后续批次需要读到本批次，书籍排名索引需要批次的主键
+            db.flush()
+            positions.extend(RankingService._book_positions(batch, entries))
+            with _delta_tails_lock:
+                _delta_tails[ranking_id] = ((batch.id, batch.batch_id, batch.snapshot_time), entries)
+
+        # 书籍排名索引，按书籍查询排名历史时不需要还原批次
+        bulk_insert(db, RankingBookPosition.__table__, positions)
+
+    @staticmethod
+    def _previous_delta_entries(db: Session, previous: RankingSnapshotBatch) -> Entries:
+        """
+        获取上一批次还原后的排名
+
+        上一批次由本进程写入时直接使用写入时的排名，否则从最近的关键帧开始还原
+
+        :param db: 数据库会话
+        :param previous: 榜单在数据库中的上一批次
+        :return: novel_id到位置映射
+        """
+        with _delta_tails_lock:
+            tail = _delta_tails.get(previous.ranking_id)
+        if tail is not None and tail[0] == (previous.id, previous.batch_id, previous.snapshot_time):
+            return tail[1]
+        decoded = RankingService._decode_delta_batches(
+            db, previous.ranking_id, previous.snapshot_time, previous.snapshot_time
+        )
+        return decoded[-1][1] if decoded else {}
+
+    @staticmethod
+    def _book_positions(batch: RankingSnapshotBatch, entries: Entries) -> list[dict[str, Any]]:
+        """把批次中每本书的位置转换为书籍排名索引行"""
+        return [
+            {
+                "novel_id": novel_id,
+                "ranking_id": batch.ranking_id,
+                "batch_row_id": batch.id,
+                "position": position,
+                "snapshot_time": batch.snapshot_time,
+            }
+            for novel_id, position in entries.items()
+        ]
+
+    @staticmethod
+    def rebuild_book_positions(db: Session) -> int:
+        """
+        根据ranking_snapshot_batches重建书籍排名索引表，用于索引表上线前已有的差量批次
 
-        # 过滤数据并创建对象
-        filtered_snapshots = [filter_dict(snapshot, RankingSnapshot) for snapshot in snapshots]
-        snapshot_objs = [RankingSnapshot(**snapshot) for snapshot in filtered_snapshots]
-        db.add_all(snapshot_objs)
+        每个榜单从第一个关键帧开始只还原一次
+
+        :param db: 数据库会话
+        :return: 处理的批次数量
+        """
+        db.execute(delete(RankingBookPosition))
+        ranges = db.execute(
+            select(
+                RankingSnapshotBatch.ranking_id,
+                func.min(RankingSnapshotBatch.snapshot_time),
+                func.max(RankingSnapshotBatch.snapshot_time),
+            ).group_by(RankingSnapshotBatch.ranking_id)
+        ).all()
+        processed = 0
+        for ranking_id, start_time, end_time in ranges:
+            decoded = RankingService._decode_delta_batches(db, ranking_id, start_time, end_time)
+            bulk_insert(db, RankingBookPosition.__table__, [
+                row for batch, entries in decoded for row in RankingService._book_positions(batch, entries)
+            ])
+            processed += len(decoded)
         db.commit()
-        return snapshot_objs
+        return processed
+
+    @staticmethod
+    def _decode_delta_batches(
+            db: Session, ranking_id: int, start_time: datetime, end_time: datetime
+    ) -> list[tuple[RankingSnapshotBatch, Entries]]:
+        """
+        还原时间范围内榜单各批次的完整排名
+
+        从start_time之前最近的关键帧开始依次应用差量，差量链长度不超过关键帧间隔。
+
+        :param db: 数据库会话
+        :param ranking_id: 榜单ID
+        :param start_time: 开始时间（包含）
+        :param end_time: 结束时间（包含）
+        :return: (批次记录, novel_id到位置映射)列表，按时间升序
+        """
+        keyframe_time = db.scalar(
+            select(func.max(RankingSnapshotBatch.snapshot_time)).where(
+                RankingSnapshotBatch.ranking_id == ranking_id,
+                RankingSnapshotBatch.is_keyframe.is_(True),
+                RankingSnapshotBatch.snapshot_time <= start_time,
+            )
+        )
+        rows = db.execute(
+            select(RankingSnapshotBatch)
+            .where(
+                RankingSnapshotBatch.ranking_id == ranking_id,
+                RankingSnapshotBatch.snapshot_time >= (keyframe_time or start_time),
+                RankingSnapshotBatch.snapshot_time <= end_time,
+            )
+            .order_by(RankingSnapshotBatch.snapshot_time, RankingSnapshotBatch.id)
+        ).scalars()
+
+        decoded = []
+        entries: Entries = {}
+        for row in rows:
+            entries = apply_payload(entries, row.payload)
+            if row.snapshot_time >= start_time:
+                decoded.append((row, entries))
+        return decoded
+
+    @staticmethod
+    def _batch_to_snapshots(batch: RankingSnapshotBatch, entries: Entries) -> list[RankingSnapshot]:
+        """把还原后的批次转换为按位置排序的快照对象（不加入会话）"""
+        return [
+            RankingSnapshot(
+                ranking_id=batch.ranking_id,
+                novel_id=novel_id,
+                batch_id=batch.batch_id,
+                position=position,
+                snapshot_time=batch.snapshot_time,
+            )
+            for novel_id, position in sorted(entries.items(), key=lambda item: item[1])
+        ]
+
+    def _get_delta_history_snapshots(
+            self, db: Session, ranking_id: int, start_time: datetime, end_time: datetime, bucket_format: str
+    ) -> list[ranking.RankingSnapshot]:
+        """
+        从差量存储中获取榜单历史，每个时间段选择最后一个批次
+
+        :param db: 数据库会话
+        :param ranking_id: 榜单ID
+        :param start_time: 开始时间（包含）
+        :param end_time: 结束时间（包含）
+        :param bucket_format: 时间段的strftime格式
+        :return: 历史快照列表，按时间升序，差量存储中没有数据时返回空列表
+        """
+        latest_by_bucket: dict[str, tuple[RankingSnapshotBatch, Entries]] = {}
+        for batch, entries in self._decode_delta_batches(db, ranking_id, start_time, end_time):
+            latest_by_bucket[batch.snapshot_time.strftime(bucket_format)] = (batch, entries)
+
+        return [
+            ranking.RankingSnapshot(
+                books=[ranking.RankingBook.model_validate(s) for s in self._batch_to_snapshots(batch, entries)],
+                snapshot_time=batch.snapshot_time,
+            )
+            for batch, entries in latest_by_bucket.values()
+        ]
+
+    @staticmethod
+    def _get_latest_delta_snapshots(
+            db: Session, ranking_id: int, start_time: datetime, end_time: datetime
+    ) -> list[RankingSnapshot]:
+        """
+        从差量存储中获取时间范围内最后一个批次的完整快照
+
+        :param db: 数据库会话
+        :param ranking_id: 榜单ID
+        :param start_time: 开始时间（包含）
+        :param end_time: 结束时间（不包含）
+        :return: 按位置排序的快照对象列表，没有数据时返回空列表
+        """
+        latest_time = db.scalar(
+            select(func.max(RankingSnapshotBatch.snapshot_time)).where(
+                RankingSnapshotBatch.ranking_id == ranking_id,
+                RankingSnapshotBatch.snapshot_time >= start_time,
+                RankingSnapshotBatch.snapshot_time < end_time,
+            )
+        )
+        if latest_time is None:
+            return []
+        decoded = RankingService._decode_delta_batches(db, ranking_id, latest_time, latest_time)
+        return RankingService._batch_to_snapshots(*decoded[-1]) if decoded else []
 
     # ==================== API使用的方法 ====================
 
@@ -105,10 +541,62 @@ class RankingService:
         ).fetchall()
         
         # 转换为BookRankingInfo模型
-        return [
+        ranking_infos = [
             book.BookRankingInfo.model_validate(snapshot) for snapshot in ranking_snapshots
         ]
+        if get_settings().database.ranking_storage == "delta":
+            ranking_infos.extend(self._get_delta_book_ranking_history(db, novel_id, start_time, end_time))
+
+        # 时间范围覆盖已归档的月份时，从Parquet归档中补充
+        archived = self._read_archived_snapshots(start_time, end_time, novel_id=novel_id)
+        if archived:
+            rankings = {r.id: r for r in db.scalars(
+                select(Ranking).where(Ranking.id.in_({snapshot.ranking_id for snapshot in archived}))
+            )}
+            ranking_infos.extend(
+                book.BookRankingInfo(
+                    novel_id=snapshot.novel_id,
+                    position=snapshot.position,
+                    snapshot_time=snapshot.snapshot_time,
+                    page_id=rankings[snapshot.ranking_id].page_id,
+                    channel_name=rankings[snapshot.ranking_id].channel_name,
+                    sub_channel_name=rankings[snapshot.ranking_id].sub_channel_name,
+                )
+                for snapshot in archived if snapshot.ranking_id in rankings
+            )
+        ranking_infos.sort(key=lambda info: info.snapshot_time, reverse=True)
+        return ranking_infos
 
+    @staticmethod
+    def _get_delta_book_ranking_history(
+            db: Session, novel_id: int, start_time: datetime, end_time: datetime
+    ) -> List[book.BookRankingInfo]:
+        """
+        从差量存储的书籍排名索引中获取书籍在时间范围内的排名记录
+
+        :param db: 数据库会话对象
+        :param novel_id: 书籍ID
+        :param start_time: 开始时间（包含）
+        :param end_time: 结束时间（包含）
+        :return: 书籍排名信息列表
+        """
+        rows = db.execute(
+            select(
+                RankingBookPosition.novel_id,
+                RankingBookPosition.position,
+                RankingBookPosition.snapshot_time,
+                Ranking.page_id,
+                Ranking.channel_name,
+                Ranking.sub_channel_name
+            )
+            .join(Ranking, RankingBookPosition.ranking_id == Ranking.id)
+            .where(
+                RankingBookPosition.novel_id == novel_id,
+                RankingBookPosition.snapshot_time >= start_time,
+                RankingBookPosition.snapshot_time <= end_time,
+            )
+        ).fetchall()
+        return [book.BookRankingInfo.model_validate(row) for row in rows]
 
     @staticmethod
     def get_ranking_by_id(db: Session, ranking_id: int) -> Ranking | None:
@@ -286,48 +774,99 @@ class RankingService:
         if not ranking_basic:
             return None
 
-        # 2. 使用子查询获取每天最新的batch_id
-        from sqlalchemy import text
-        latest_batches_subquery = select(
-            func.date(RankingSnapshot.snapshot_time).label('snapshot_date'),
-            RankingSnapshot.batch_id,
-            func.max(RankingSnapshot.snapshot_time).label('max_time')
-        ).where(
-            and_(
-                RankingSnapshot.ranking_id == ranking_id,
-                func.date(RankingSnapshot.snapshot_time) >= start_date,
-                func.date(RankingSnapshot.snapshot_time) <= end_date,
-            )
-        ).group_by(
-            func.date(RankingSnapshot.snapshot_time),
-            RankingSnapshot.batch_id
-        ).subquery()
+        # 2. 按唯一键从批次索引表查找每天最新的batch_id，索引表未覆盖整个范围时回退到聚合查询
+        range_start, range_end = datetime.combine(start_date, time.min), datetime.combine(end_date, time.max)
+        if self._batch_index_covers_range(db, ranking_id, "day", range_start, range_end):
+            batch_ids = self._lookup_batch_index(db, ranking_id, "day", range_start, range_end)
+        else:
+            batch_ids = self._latest_batch_ids_by_day(db, ranking_id, start_date, end_date)
 
-        # 3. 获取每天的最新batch_id
-        latest_batch_ids = db.execute(
-            select(
-                latest_batches_subquery.c.snapshot_date,
-                latest_batches_subquery.c.batch_id
-            ).where(
-                latest_batches_subquery.c.max_time.in_(
-                    select(func.max(latest_batches_subquery.c.max_time))
-                    .group_by(latest_batches_subquery.c.snapshot_date)
-                )
-            )
-        ).fetchall()
+        # 3. 合并ranking_snapshots、差量存储和归档中的历史
+        return self._merge_history(db, ranking_basic, batch_ids, range_start, range_end, "%Y-%m-%d")
 
-        if not latest_batch_ids:
-            return ranking.RankingHistory(
-                id=ranking_basic.id,
-                channel_name=ranking_basic.channel_name,
-                sub_channel_name=ranking_basic.sub_channel_name,
-                page_id=ranking_basic.page_id,
-                rank_group_type=ranking_basic.rank_group_type,
-                snapshots=[],
-            )
+    def get_ranking_history_by_hour(
+            self,
+            db: Session,
+            ranking_id: int,
+            start_time: datetime,
+            end_time: datetime,
+    ) -> Optional[ranking.RankingHistory]:
+        """
+        获取榜单按小时的历史数据，每小时选择当小时最后一次更新的快照
+        使用单次查询优化性能，避免循环查询
+
+        :param db: 数据库会话对象
+        :param ranking_id: 榜单ID
+        :param start_time: 开始时间（分和秒应为0）
+        :param end_time: 结束时间（分和秒应为0）
+        :return: 榜单历史数据
+        """
+        # 1. 获取榜单基础信息
+        ranking_basic = self.get_ranking_by_id(db, ranking_id)
+        if not ranking_basic:
+            return None
+
+        # 2. 按唯一键从批次索引表查找每小时最新的batch_id，索引表未覆盖整个范围时回退到聚合查询
+        if self._batch_index_covers_range(db, ranking_id, "hour", start_time, end_time):
+            batch_ids = self._lookup_batch_index(db, ranking_id, "hour", start_time, end_time)
+        else:
+            batch_ids = self._latest_batch_ids_by_hour(db, ranking_id, start_time, end_time)
+
+        # 3. 合并ranking_snapshots、差量存储和归档中的历史
+        return self._merge_history(db, ranking_basic, batch_ids, start_time, end_time, "%Y-%m-%d %H")
+
+    def _merge_history(
+            self, db: Session, ranking_basic: Ranking, batch_ids: list[str],
+            start_time: datetime, end_time: datetime, bucket_format: str
+    ) -> ranking.RankingHistory:
+        """
+        构造榜单历史：ranking_snapshots中的批次与差量存储还原的批次按时间段合并，再用归档补充
+
+        切换存储格式前后的数据可能落在同一范围甚至同一时间段内，同一时间段两边都有数据时取较晚的批次。
+
+        :param db: 数据库会话对象
+        :param ranking_basic: 榜单记录
+        :param batch_ids: ranking_snapshots中每个时间段最后一个批次的ID，按时间段升序
+        :param start_time: 开始时间（包含）
+        :param end_time: 结束时间（包含）
+        :param bucket_format: 时间段的strftime格式
+        :return: 榜单历史数据
+        """
+        snapshots = self._get_batch_history_snapshots(db, ranking_basic.id, batch_ids)
+        if get_settings().database.ranking_storage == "delta":
+            latest_by_bucket: dict[str, ranking.RankingSnapshot] = {}
+            for snapshot in snapshots + self._get_delta_history_snapshots(
+                    db, ranking_basic.id, start_time, end_time, bucket_format
+            ):
+                bucket = snapshot.snapshot_time.strftime(bucket_format)
+                if bucket not in latest_by_bucket or latest_by_bucket[bucket].snapshot_time < snapshot.snapshot_time:
+                    latest_by_bucket[bucket] = snapshot
+            snapshots = sorted(latest_by_bucket.values(), key=lambda snapshot: snapshot.snapshot_time)
+
+        return self._with_archived_history(ranking.RankingHistory(
+            id=ranking_basic.id,
+            channel_name=ranking_basic.channel_name,
+            sub_channel_name=ranking_basic.sub_channel_name,
+            page_id=ranking_basic.page_id,
+            rank_group_type=ranking_basic.rank_group_type,
+            snapshots=snapshots,
+        ), start_time, end_time, bucket_format)
+
+    @staticmethod
+    def _get_batch_history_snapshots(
+            db: Session, ranking_id: int, batch_ids: list[str]
+    ) -> list[ranking.RankingSnapshot]:
+        """
+        一次性获取ranking_snapshots中多个批次的快照
+
+        :param db: 数据库会话对象
+        :param ranking_id: 榜单ID
+        :param batch_ids: 批次ID列表，按时间段升序
+        :return: 历史快照列表，数据库中没有行的批次不包含在内
+        """
+        if not batch_ids:
+            return []
 
-        # 4. 一次性获取所有需要的快照数据
-        batch_ids = [row.batch_id for row in latest_batch_ids]
         all_snapshots = db.execute(
             select(RankingSnapshot)
             .where(
@@ -339,59 +878,82 @@ class RankingService:
             .order_by(RankingSnapshot.snapshot_time, RankingSnapshot.position)
         ).scalars().all()
 
-        # 5. 按批次分组快照数据
+        # 按批次分组快照数据
         snapshots_by_batch = {}
         for snapshot in all_snapshots:
             if snapshot.batch_id not in snapshots_by_batch:
                 snapshots_by_batch[snapshot.batch_id] = []
             snapshots_by_batch[snapshot.batch_id].append(snapshot)
 
-        # 6. 构建历史快照数据
+        # 构建历史快照数据
         snapshots = []
-        for batch_row in latest_batch_ids:
-            batch_snapshots = snapshots_by_batch.get(batch_row.batch_id, [])
+        for batch_id in batch_ids:
+            batch_snapshots = snapshots_by_batch.get(batch_id, [])
             if batch_snapshots:
                 books = [ranking.RankingBook.model_validate(s) for s in batch_snapshots]
                 snapshots.append(ranking.RankingSnapshot(
                     books=books,
                     snapshot_time=batch_snapshots[0].snapshot_time,
                 ))
+        return snapshots
 
-        # 7. 构造历史数据响应
-        return ranking.RankingHistory(
-            id=ranking_basic.id,
-            channel_name=ranking_basic.channel_name,
-            sub_channel_name=ranking_basic.sub_channel_name,
-            page_id=ranking_basic.page_id,
-            rank_group_type=ranking_basic.rank_group_type,
-            snapshots=snapshots,
-        )
-
-    def get_ranking_history_by_hour(
-            self,
-            db: Session,
-            ranking_id: int,
-            start_time: datetime,
-            end_time: datetime,
-    ) -> Optional[ranking.RankingHistory]:
+    @staticmethod
+    def _latest_batch_ids_by_day(db: Session, ranking_id: int, start_date: date, end_date: date) -> list[str]:
         """
-        获取榜单按小时的历史数据，每小时选择当小时最后一次更新的快照
-        使用单次查询优化性能，避免循环查询
+        聚合ranking_snapshots查找每天最新的batch_id，用于批次索引表未覆盖的历史数据
 
         :param db: 数据库会话对象
         :param ranking_id: 榜单ID
-        :param start_time: 开始时间（分和秒应为0）
-        :param end_time: 结束时间（分和秒应为0）
-        :return: 榜单历史数据
+        :param start_date: 开始日期
+        :param end_date: 结束日期
+        :return: 批次ID列表
         """
-        # 1. 获取榜单基础信息
-        ranking_basic = self.get_ranking_by_id(db, ranking_id)
-        if not ranking_basic:
-            return None
+        # 使用子查询获取每天最新的batch_id
+        # 时间条件使用左闭右开的时间范围，可以命中(ranking_id, snapshot_time)索引
+        latest_batches_subquery = select(
+            func.date(RankingSnapshot.snapshot_time).label('snapshot_date'),
+            RankingSnapshot.batch_id,
+            func.max(RankingSnapshot.snapshot_time).label('max_time')
+        ).where(
+            and_(
+                RankingSnapshot.ranking_id == ranking_id,
+                RankingSnapshot.snapshot_time >= datetime.combine(start_date, time.min),
+                RankingSnapshot.snapshot_time < datetime.combine(end_date + timedelta(days=1), time.min),
+            )
+        ).group_by(
+            func.date(RankingSnapshot.snapshot_time),
+            RankingSnapshot.batch_id
+        ).subquery()
+
+        # 获取每天的最新batch_id
+        latest_batch_ids = db.execute(
+            select(
+                latest_batches_subquery.c.snapshot_date,
+                latest_batches_subquery.c.batch_id
+            ).where(
+                latest_batches_subquery.c.max_time.in_(
+                    select(func.max(latest_batches_subquery.c.max_time))
+                    .group_by(latest_batches_subquery.c.snapshot_date)
+                )
+            )
+        ).fetchall()
+
+        return [row.batch_id for row in latest_batch_ids]
+
+    @staticmethod
+    def _latest_batch_ids_by_hour(db: Session, ranking_id: int, start_time: datetime, end_time: datetime) -> list[str]:
+        """
+        聚合ranking_snapshots查找每小时最新的batch_id，用于批次索引表未覆盖的历史数据
 
-        # 2. 使用子查询获取每小时最新的batch_id
-        # 构造小时级时间截断函数
-        hour_truncate = func.strftime('%Y-%m-%d %H:00:00', RankingSnapshot.snapshot_time)
+        :param db: 数据库会话对象
+        :param ranking_id: 榜单ID
+        :param start_time: 开始时间
+        :param end_time: 结束时间
+        :return: 批次ID列表
+        """
+        # 使用子查询获取每小时最新的batch_id
+        # 构造小时级时间分组键
+        hour_truncate = time_bucket(db, RankingSnapshot.snapshot_time, "hour")
 
         latest_batches_subquery = select(
             hour_truncate.label('snapshot_hour'),
@@ -408,7 +970,7 @@ class RankingService:
             RankingSnapshot.batch_id
         ).subquery()
 
-        # 3. 获取每小时的最新batch_id
+        # 获取每小时的最新batch_id
         latest_batch_ids = db.execute(
             select(
                 latest_batches_subquery.c.snapshot_hour,
@@ -421,56 +983,63 @@ class RankingService:
             )
         ).fetchall()
 
-        if not latest_batch_ids:
-            return ranking.RankingHistory(
-                id=ranking_basic.id,
-                channel_name=ranking_basic.channel_name,
-                sub_channel_name=ranking_basic.sub_channel_name,
-                page_id=ranking_basic.page_id,
-                rank_group_type=ranking_basic.rank_group_type,
-                snapshots=[],
-            )
+        return [row.batch_id for row in latest_batch_ids]
 
-        # 4. 一次性获取所有需要的快照数据
-        batch_ids = [row.batch_id for row in latest_batch_ids]
-        all_snapshots = db.execute(
-            select(RankingSnapshot)
-            .where(
-                and_(
-                    RankingSnapshot.ranking_id == ranking_id,
-                    RankingSnapshot.batch_id.in_(batch_ids)
-                )
-            )
-            .order_by(RankingSnapshot.snapshot_time, RankingSnapshot.position)
-        ).scalars().all()
+    @staticmethod
+    def _read_archived_snapshots(start_time: datetime, end_time: datetime, **equals: Any) -> list[RankingSnapshot]:
+        """
+        从Parquet归档中读取榜单快照，包含差量批次还原后归档的行
 
-        # 5. 按批次分组快照数据
-        snapshots_by_batch = {}
-        for snapshot in all_snapshots:
-            if snapshot.batch_id not in snapshots_by_batch:
-                snapshots_by_batch[snapshot.batch_id] = []
-            snapshots_by_batch[snapshot.batch_id].append(snapshot)
+        :param start_time: 开始时间（包含）
+        :param end_time: 结束时间（包含）
+        :param equals: 等值过滤条件，如ranking_id、novel_id
+        :return: 未加入会话的RankingSnapshot对象列表，按时间升序
+        """
+        archive = get_snapshot_archive()
+        rows = [row for table_name in RANKING_ARCHIVE_TABLES
+                for row in archive.read(table_name, start_time, end_time, **equals)]
+        rows.sort(key=lambda row: row["snapshot_time"])
+        return [RankingSnapshot(**row) for row in rows]
 
-        # 6. 构建历史快照数据
-        snapshots = []
-        for batch_row in latest_batch_ids:
-            batch_snapshots = snapshots_by_batch.get(batch_row.batch_id, [])
-            if batch_snapshots:
-                books = [ranking.RankingBook.model_validate(s) for s in batch_snapshots]
-                snapshots.append(ranking.RankingSnapshot(
-                    books=books,
-                    snapshot_time=batch_snapshots[0].snapshot_time,
-                ))
+    @staticmethod
+    def _latest_archived_batches(archived: list[RankingSnapshot], bucket_format: str) -> dict[str, list[RankingSnapshot]]:
+        """按时间段分组归档快照，每个时间段保留最后一个批次，批次内按位置排序"""
+        batches: dict[str, list[RankingSnapshot]] = {}
+        for snapshot in archived:
+            batches.setdefault(snapshot.batch_id, []).append(snapshot)
+        latest: dict[str, list[RankingSnapshot]] = {}
+        for batch in batches.values():
+            latest[batch[0].snapshot_time.strftime(bucket_format)] = sorted(batch, key=lambda s: s.position)
+        return latest
+
+    def _with_archived_history(
+            self, history: ranking.RankingHistory, start_time: datetime, end_time: datetime, bucket_format: str
+    ) -> ranking.RankingHistory:
+        """
+        用归档中的批次补充数据库中没有的时间段
 
-        # 7. 构造历史数据响应
-        return ranking.RankingHistory(
-            id=ranking_basic.id,
-            channel_name=ranking_basic.channel_name,
-            sub_channel_name=ranking_basic.sub_channel_name,
-            page_id=ranking_basic.page_id,
-            rank_group_type=ranking_basic.rank_group_type,
-            snapshots=snapshots,
-        )
+        归档的快照都早于数据库中的快照，同一时间段两边都有数据时以数据库中较晚的批次为准。
+
+        :param history: 从数据库查询的榜单历史
+        :param start_time: 开始时间（包含）
+        :param end_time: 结束时间（包含）
+        :param bucket_format: 时间段的strftime格式
+        :return: 补充后的榜单历史
+        """
+        archived = self._read_archived_snapshots(start_time, end_time, ranking_id=history.id)
+        if not archived:
+            return history
+        hot_buckets = {snapshot.snapshot_time.strftime(bucket_format) for snapshot in history.snapshots}
+        archived_snapshots = [
+            ranking.RankingSnapshot(
+                books=[ranking.RankingBook.model_validate(s) for s in batch],
+                snapshot_time=batch[0].snapshot_time,
+            )
+            for bucket, batch in self._latest_archived_batches(archived, bucket_format).items()
+            if bucket not in hot_buckets
+        ]
+        history.snapshots = archived_snapshots + history.snapshots
+        return history
 
     # ==================== 内部依赖方法 ====================
 
@@ -485,21 +1054,24 @@ class RankingService:
         return db.execute(select(Ranking).where(Ranking.hash_id == hash_id)).scalar_one_or_none()
 
     @staticmethod
-    def create_ranking(db: Session, ranking_data: dict[str, Any]) -> Ranking:
-        """创建榜单"""
+    def create_ranking(db: Session, ranking_data: dict[str, Any], commit: bool = True) -> Ranking:
+        """创建榜单，commit为False时只flush，由调用方统一提交"""
         valid_fields = get_model_fields(Ranking)
         filtered_data = filter_dict(ranking_data, valid_fields)
 
         ranking = Ranking(**filtered_data)
         db.add(ranking)
-        db.commit()
-        db.refresh(ranking)
+        if commit:
+            db.commit()
+            db.refresh(ranking)
+        else:
+            db.flush()
         return ranking
 
     @staticmethod
-    def update_ranking(db: Session, ranking: Ranking, ranking_data: dict[str, Any]
+    def update_ranking(db: Session, ranking: Ranking, ranking_data: dict[str, Any], commit: bool = True
                        ) -> Ranking:
-        """更新榜单"""
+        """更新榜单，commit为False时只flush，由调用方统一提交"""
         valid_fields = get_model_fields(Ranking)
         filtered_data = filter_dict(ranking_data, valid_fields)
 
@@ -508,8 +1080,11 @@ class RankingService:
                 setattr(ranking, key, value)
         ranking.updated_at = datetime.now()
         db.add(ranking)
-        db.commit()
-        db.refresh(ranking)
+        if commit:
+            db.commit()
+            db.refresh(ranking)
+        else:
+            db.flush()
         return ranking
 
     @staticmethod
@@ -527,35 +1102,43 @@ class RankingService:
         :param limit: 返回数量限制
         :return: 榜单快照列表
         """
-        # 首先查找目标日期最新的batch_id
-        latest_batch_id = db.scalar(
+        day_start = datetime.combine(target_date, time.min)
+        if get_settings().database.ranking_storage == "delta":
+            delta_snapshots = RankingService._get_latest_delta_snapshots(
+                db, ranking_id, day_start, day_start + timedelta(days=1)
+            )
+            if delta_snapshots:
+                return delta_snapshots[:limit]
+
+        # 首先按唯一键从批次索引表查找目标日期最新的batch_id，索引表未覆盖时回退到按时间查询
+        latest_batch_id = RankingService._get_indexed_batch_id(db, ranking_id, "day", day_start) or db.scalar(
             select(RankingSnapshot.batch_id)
             .where(
                 and_(
                     RankingSnapshot.ranking_id == ranking_id,
-                    func.date(RankingSnapshot.snapshot_time) == target_date,
+                    RankingSnapshot.snapshot_time >= day_start,
+                    RankingSnapshot.snapshot_time < day_start + timedelta(days=1),
                 )
             )
             .order_by(desc(RankingSnapshot.snapshot_time))
             .limit(1)
         )
 
-        if not latest_batch_id:
-            raise ValueError("Don't exist records in target time")
-
         # 使用batch_id获取同一批次的所有数据，确保时间一致性
-        result = db.execute(
-            select(RankingSnapshot)
-            .where(
-                and_(
-                    RankingSnapshot.ranking_id == ranking_id,
-                    RankingSnapshot.batch_id == latest_batch_id,
-                )
-            )
-            .order_by(RankingSnapshot.position)
-            .limit(limit)
+        snapshots = RankingService._get_batch_snapshots(db, ranking_id, latest_batch_id, limit)
+        if snapshots:
+            return snapshots
+
+        # 没有批次或批次已被归档时从归档读取
+        archived = RankingService._latest_archived_batches(
+            RankingService._read_archived_snapshots(
+                day_start, datetime.combine(target_date, time.max), ranking_id=ranking_id
+            ),
+            "%Y-%m-%d",
         )
-        return list(result.scalars())
+        if archived:
+            return list(archived.values())[-1][:limit]
+        raise ValueError("Don't exist records in target time")
 
     @staticmethod
     def get_snapshots_by_hour(
@@ -574,8 +1157,13 @@ class RankingService:
         start_time = datetime.combine(target_date, time(target_hour, 0, 0))
         end_time = start_time + timedelta(hours=1)
 
-        # 首先查找目标小时内最新的batch_id
-        latest_batch_id = db.scalar(
+        if get_settings().database.ranking_storage == "delta":
+            delta_snapshots = RankingService._get_latest_delta_snapshots(db, ranking_id, start_time, end_time)
+            if delta_snapshots:
+                return delta_snapshots
+
+        # 首先按唯一键从批次索引表查找目标小时内最新的batch_id，索引表未覆盖时回退到按时间查询
+        latest_batch_id = RankingService._get_indexed_batch_id(db, ranking_id, "hour", start_time) or db.scalar(
             select(RankingSnapshot.batch_id)
             .where(
                 and_(
@@ -588,18 +1176,44 @@ class RankingService:
             .limit(1)
         )
 
-        if not latest_batch_id:
-            return []
-
         # 使用batch_id获取同一批次的所有数据，确保时间一致性
+        snapshots = RankingService._get_batch_snapshots(db, ranking_id, latest_batch_id)
+        if snapshots:
+            return snapshots
+
+        # 没有批次或批次已被归档时从归档读取
+        archived = RankingService._latest_archived_batches(
+            RankingService._read_archived_snapshots(
+                start_time, end_time - timedelta(microseconds=1), ranking_id=ranking_id
+            ),
+            "%Y-%m-%d %H",
+        )
+        return list(archived.values())[-1] if archived else []
+
+    @staticmethod
+    def _get_batch_snapshots(
+            db: Session, ranking_id: int, batch_id: Optional[str], limit: Optional[int] = None
+    ) -> list[RankingSnapshot]:
+        """
+        获取榜单某一批次的快照
+
+        :param db: 数据库会话
+        :param ranking_id: 榜单ID
+        :param batch_id: 批次ID，为空时返回空列表
+        :param limit: 返回数量限制，为None时不限制
+        :return: 按位置排序的快照列表，批次不在数据库中时返回空列表
+        """
+        if not batch_id:
+            return []
         result = db.execute(
             select(RankingSnapshot)
             .where(
                 and_(
                     RankingSnapshot.ranking_id == ranking_id,
-                    RankingSnapshot.batch_id == latest_batch_id,
+                    RankingSnapshot.batch_id == batch_id,
                 )
             )
             .order_by(RankingSnapshot.position)
+            .limit(limit)
         )
         return list(result.scalars())
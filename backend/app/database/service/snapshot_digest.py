@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+书籍快照变化检测 - 只保存统计数据发生变化的快照
+
+缓存每本书最后一次已提交快照的统计字段摘要（last-value cache）和最后一次爬取到该书的时间。
+变化存储模式下，新快照的摘要与缓存一致时不再写入，历史查询按阶梯函数
+把上一条快照的值延续到之后的时间段；书籍详情的最新爬取时间取缓存中的最后爬取时间。
+
+摘要只在事务提交后才写入缓存，事务回滚时丢弃，缓存不会领先于数据库。
+"""
+
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.logger import get_logger
+from app.utils import generate_snapshot_digest
+
+logger = get_logger(__name__)
+
+# 参与变化检测的快照统计字段
+SNAPSHOT_DIGEST_FIELDS = (
+    "favorites",
+    "clicks",
+    "comments",
+    "nutrition",
+    "word_counts",
+    "chapter_counts",
+    "vip_chapter_id",
+    "status",
+)
+
+# 会话info中保存未提交摘要的键
+PENDING_DIGESTS_KEY = "pending_snapshot_digests"
+
+
+def snapshot_digest(snapshot: Dict[str, Any]) -> str:
+    """
+    计算快照统计字段的摘要
+
+    :param snapshot: 快照数据字典
+    :return: 摘要字符串
+    """
+    return generate_snapshot_digest(snapshot, SNAPSHOT_DIGEST_FIELDS)
+
+
+class SnapshotDigestCache:
+    """
+    线程安全的书籍快照摘要LRU缓存
+
+    只保存已提交快照的摘要；缓存未命中时由调用方从数据库加载最新快照。
+    每本书同时记录最后一次爬取的时间，未变化、未写入的快照也会更新该时间。
+    """
+
+    def __init__(self, max_size: int = 50000):
+        """
+        :param max_size: 最多缓存的书籍数量，超出时淘汰最久未使用的书籍
+        """
+        self.max_size = max_size
+        self._digests: OrderedDict[int, Tuple[str, datetime]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, novel_id: int) -> Optional[str]:
+        """获取书籍最后一次已提交快照的摘要，未缓存时返回None"""
+        with self._lock:
+            entry = self._digests.get(novel_id)
+            if entry is None:
+                return None
+            self._digests.move_to_end(novel_id)
+            return entry[0]
+
+    def last_seen(self, novel_id: int) -> Optional[datetime]:
+        """获取书籍最后一次已提交的爬取时间，未缓存时返回None"""
+        with self._lock:
+            entry = self._digests.get(novel_id)
+            return entry[1] if entry is not None else None
+
+    def update(self, digests: Dict[int, Tuple[str, datetime]]) -> None:
+        """
+        批量写入书籍摘要和爬取时间，爬取时间只前进不后退
+
+        :param digests: novel_id到(摘要, 爬取时间)的映射
+        """
+        with self._lock:
+            for novel_id, (digest, seen_at) in digests.items():
+                previous = self._digests.get(novel_id)
+                if previous is not None and previous[1] > seen_at:
+                    seen_at = previous[1]
+                self._digests[novel_id] = (digest, seen_at)
+                self._digests.move_to_end(novel_id)
+            while len(self._digests) > self.max_size:
+                self._digests.popitem(last=False)
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._digests.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._digests)
+
+    def filter_changed(
+            self, db: Session, snapshots: List[Dict[str, Any]], load_latest
+    ) -> List[Dict[str, Any]]:
+        """
+        过滤掉统计数据与上一条快照相同的快照
+
+        :param db: 数据库会话对象，未提交的摘要和爬取时间记录在会话中，提交后写入缓存
+        :param snapshots: 快照数据列表，按时间顺序，包含snapshot_time
+        :param load_latest: 加载书籍最新快照的函数，签名为(db, novel_ids) -> {novel_id: 快照字典}
+        :return: 需要写入的快照列表
+        """
+        pending = _pending_digests(db)
+
+        # 缓存和本事务中都没有的书籍，从数据库加载最新快照
+        missing_ids = set()
+        for snapshot in snapshots:
+            novel_id = snapshot.get("novel_id")
+            if novel_id is not None and novel_id not in pending and self.get(novel_id) is None:
+                missing_ids.add(novel_id)
+        if missing_ids:
+            latest = load_latest(db, list(missing_ids))
+            self.update({
+                novel_id: (snapshot_digest(row), row["snapshot_time"]) for novel_id, row in latest.items()
+            })
+
+        changed = []
+        for snapshot in snapshots:
+            novel_id = snapshot.get("novel_id")
+            digest = snapshot_digest(snapshot)
+            previous = pending[novel_id][0] if novel_id in pending else self.get(novel_id)
+            if novel_id is not None:
+                # 未变化的快照不写入，但同样记录为该书最后一次爬取
+                pending[novel_id] = (digest, snapshot.get("snapshot_time") or datetime.now())
+            if novel_id is not None and digest == previous:
+                continue
+            changed.append(snapshot)
+
+        skipped = len(snapshots) - len(changed)
+        if skipped:
+            logger.debug(f"跳过 {skipped} 条未变化的书籍快照")
+        return changed
+
+
+def _pending_digests(db: Session) -> Dict[int, Tuple[str, datetime]]:
+    """获取会话中未提交的摘要，首次调用时注册提交/回滚回调"""
+    pending = db.info.get(PENDING_DIGESTS_KEY)
+    if pending is None:
+        pending = db.info[PENDING_DIGESTS_KEY] = {}
+        event.listen(db, "after_commit", _on_commit)
+        event.listen(db, "after_rollback", _on_rollback)
+    return pending
+
+
+def _on_commit(db: Session) -> None:
+    """事务提交后把摘要写入缓存"""
+    pending = db.info.get(PENDING_DIGESTS_KEY)
+    if pending:
+        get_snapshot_digest_cache().update(pending)
+        pending.clear()
+
+
+def _on_rollback(db: Session) -> None:
+    """事务回滚时丢弃未提交的摘要"""
+    pending = db.info.get(PENDING_DIGESTS_KEY)
+    if pending:
+        pending.clear()
+
+
+# 全局快照摘要缓存实例
+_snapshot_digest_cache: Optional[SnapshotDigestCache] = None
+_snapshot_digest_cache_lock = threading.Lock()
+
+
+def get_snapshot_digest_cache() -> SnapshotDigestCache:
+    """获取全局快照摘要缓存实例（单例模式）"""
+    global _snapshot_digest_cache
+    if _snapshot_digest_cache is None:
+        with _snapshot_digest_cache_lock:
+            if _snapshot_digest_cache is None:
+                _snapshot_digest_cache = SnapshotDigestCache()
+    return _snapshot_digest_cache
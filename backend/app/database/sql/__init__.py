@@ -6,7 +6,7 @@ SQL查询模块
 - ranking_queries: 榜单相关的SQL查询
 
 使用示例:
-    from app.database.sql.book_queries import BOOK_HOURLY_SNAPSHOTS_QUERY
+    from app.database.sql.book_queries import BOOK_BY_NOVEL_ID_QUERY
     from app.database.sql.ranking_queries import RANKING_HISTORY_QUERY
 """
 
@@ -2,6 +2,7 @@
 FastAPI应用程序入口
 """
 
+import asyncio
 import sys
 import time
 from contextlib import asynccontextmanager
@@ -63,6 +64,14 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"任务调度器停止失败: {e}")
 
+    # 停止爬虫运行时，释放常驻的HTTP连接池
+    try:
+        from .crawl.runtime import shutdown_crawler_runtime
+        await asyncio.to_thread(shutdown_crawler_runtime)
+        logger.info("爬虫运行时已停止")
+    except Exception as e:
+        logger.error(f"爬虫运行时停止失败: {e}")
+
     logger.info("应用程序关闭")
 
 
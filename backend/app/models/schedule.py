@@ -15,6 +15,8 @@ from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.interval import IntervalTrigger
 from pydantic import BaseModel, Field
 
+from app.config import get_settings
+
 
 class JobType(str, Enum):
     """任务处理器类型"""
@@ -22,6 +24,7 @@ class JobType(str, Enum):
     CRAWL = "crawl"  # 爬虫任务
     REPORT = "report"  # 报告任务
     CLEAN = "clean"  # 系统任务
+    MAINTAIN = "maintain"  # 数据库维护任务
 
 
 class SchedulerInfo(BaseModel):
@@ -53,7 +56,7 @@ class Job(JobBasic):
 # 预定义任务配置 - 使用Job模型
 def get_predefined_jobs() -> List[Job]:
     """获取预定义的调度任务列表"""
-    return [
+    jobs = [
         Job(
             job_id="jiazi_crawl",
             job_type=JobType.CRAWL,
@@ -69,5 +72,37 @@ def get_predefined_jobs() -> List[Job]:
             page_ids=["page"]
         )
     ]
+    scheduler_settings = get_settings().scheduler
+    if scheduler_settings.job_cleanup_enabled:
+        jobs.append(Job(
+            job_id="snapshot_archive",
+            job_type=JobType.CLEAN,
+            trigger=IntervalTrigger(hours=scheduler_settings.cleanup_interval_hours),
+            desc="旧快照归档任务",
+        ))
+    database_settings = get_settings().database
+    if database_settings.url.startswith("sqlite") and database_settings.sqlite_maintenance_enabled:
+        jobs.extend([
+            Job(
+                job_id="sqlite_wal_checkpoint",
+                job_type=JobType.MAINTAIN,
+                trigger=IntervalTrigger(minutes=database_settings.sqlite_checkpoint_interval_minutes),
+                desc="SQLite WAL检查点任务",
+            ),
+            Job(
+                job_id="sqlite_optimize",
+                job_type=JobType.MAINTAIN,
+                trigger=IntervalTrigger(hours=database_settings.sqlite_optimize_interval_hours),
+                desc="SQLite统计信息优化任务",
+            ),
+        ])
+    if database_settings.url.startswith("postgresql"):
+        jobs.append(Job(
+            job_id="postgres_partition_maintenance",
+            job_type=JobType.MAINTAIN,
+            trigger=CronTrigger(hour=3, minute=0),
+            desc="PostgreSQL快照月分区维护任务",
+        ))
+    return jobs
 
 
@@ -49,6 +49,17 @@ class JobScheduler:
             from ..crawl.crawl_flow import crawl_task_wrapper
             exe_func = crawl_task_wrapper
             job_args = [job.page_ids]
+        elif job.job_type == JobType.CLEAN:
+            from ..database.service.archive_service import archive_task_wrapper
+            exe_func = archive_task_wrapper
+        elif job.job_type == JobType.MAINTAIN:
+            if job.job_id == "postgres_partition_maintenance":
+                from ..database.postgres import partition_task_wrapper
+                exe_func = partition_task_wrapper
+            else:
+                from ..database.connection import sqlite_maintenance_task_wrapper
+                exe_func = sqlite_maintenance_task_wrapper
+                job_args = [job.job_id]
 
         if exe_func is None:
             self.logger.error(f"{job.job_id}未给定调度函数")
@@ -1,6 +1,7 @@
 import uuid
 import hashlib
 from datetime import datetime, timedelta
+from functools import lru_cache
 from time import strftime
 from typing import Dict, List, Any, Set, Type
 import re
@@ -38,43 +39,53 @@ def update_dict(base_d: Dict, new_d: Dict, check_none: bool = True) -> Dict:
     return result
 
 
-def extract_number(string: str) -> int:
+# 非数字字符，预编译后供extract_number重复使用
+NON_DIGIT_PATTERN = re.compile(r'\D')
+
+
+def extract_number(string: str | int) -> int:
     """
     将数字从字符串中提取出来
+
+    纯数字字符串和整数直接转换，只有夹杂其他字符（如"1,234字"）时才用预编译正则去掉非数字字符
     :param string:
     :return:
     """
     if not string:
         return 0
-    digits_str = ''.join(re.findall(r'\d', string))
-    number = int(digits_str)
-    return number
+    if isinstance(string, int):
+        return string
+    if string.isascii() and string.isdigit():
+        return int(string)
+    return int(NON_DIGIT_PATTERN.sub('', string))
 
 
-def filter_dict(raw_dict: dict, valid_field: set | list | Any):
+def filter_dict(raw_dict: dict, valid_field: set | frozenset | list | Any):
     """
     过滤字典
     :param raw_dict:
-    :param valid_field:
+    :param valid_field: 字段集合、字段列表或SQLAlchemy模型类
     :return:
     """
-    if isinstance(valid_field, set) or isinstance(valid_field, list):
+    if isinstance(valid_field, list):
         valid_field = set(valid_field)
-    else:
-        # 如果是SQLAlchemy模型类，获取字段集合
+    elif not isinstance(valid_field, (set, frozenset)):
+        # 如果是SQLAlchemy模型类，获取缓存的字段集合
         valid_field = get_model_fields(valid_field)
     return {k: v for k, v in raw_dict.items() if k in valid_field}
 
 
-def get_model_fields(model_class) -> set[str]:
+@lru_cache(maxsize=None)
+def get_model_fields(model_class) -> frozenset[str]:
     """
     获取 SQLAlchemy 模型的所有字段名
-    
+
+    模型的列在运行期间不会变化，结果按模型缓存，爬虫写入时逐行过滤不再重复反射
     :param model_class: SQLAlchemy 模型类
-    :return: 字段名集合
+    :return: 字段名集合（不可变）
     """
     mapper = inspect(model_class)
-    return set(mapper.columns.keys())
+    return frozenset(mapper.columns.keys())
 
 
 def delta_to_str(delta: timedelta | int = None) -> str:
@@ -136,4 +147,68 @@ def generate_ranking_hash_id(ranking_data: dict) -> str:
     text_to_hash = "|".join(str(field) for field in fields)
     
     # 生成MD5哈希
-    return hashlib.md5(text_to_hash.encode('utf-8')).hexdigest()
\ No newline at end of file
+    return hashlib.md5(text_to_hash.encode('utf-8')).hexdigest()
+
+
+def generate_snapshot_digest(snapshot: dict, fields: List[str] | tuple) -> str:
+    """
+    为快照的统计字段生成MD5摘要，用于判断两次快照的数据是否相同
+
+    :param snapshot: 快照数据字典
+    :param fields: 参与摘要的字段，按顺序拼接，空值使用空字符串
+    :return: 32位MD5哈希字符串
+    """
+    text_to_hash = "|".join("" if snapshot.get(field) is None else str(snapshot.get(field)) for field in fields)
+    return hashlib.md5(text_to_hash.encode('utf-8')).hexdigest()
+
+
+# 时间分组格式，与SQL中strftime的分组方式保持一致
+TIME_BUCKET_FORMATS = {
+    "hour": "%Y-%m-%d %H",
+    "day": "%Y-%m-%d",
+    "week": "%Y-W%W",
+    "month": "%Y-%m",
+}
+
+
+def time_bucket_start(value: datetime, interval: str) -> datetime:
+    """
+    计算时间点所在时间分组的开始时间
+
+    :param value: 时间点
+    :param interval: 时间间隔类型，支持"hour"、"day"、"week"、"month"
+    :return: 分组键与value相同的最早整点（小时分组）或零点（其他分组）
+    """
+    time_format = TIME_BUCKET_FORMATS[interval]
+    step = timedelta(hours=1) if interval == "hour" else timedelta(days=1)
+    start = value.replace(minute=0, second=0, microsecond=0)
+    if interval != "hour":
+        start = start.replace(hour=0)
+    key = start.strftime(time_format)
+    while (start - step).strftime(time_format) == key:
+        start -= step
+    return start
+
+
+def iter_time_buckets(start_time: datetime, end_time: datetime, interval: str) -> List[tuple[str, datetime]]:
+    """
+    列出时间范围内的所有时间分组
+
+    :param start_time: 开始时间
+    :param end_time: 结束时间
+    :param interval: 时间间隔类型，支持"hour"、"day"、"week"、"month"
+    :return: (分组键, 分组在范围内的开始时间)列表，按时间升序
+    """
+    time_format = TIME_BUCKET_FORMATS[interval]
+    step = timedelta(hours=1) if interval == "hour" else timedelta(days=1)
+    current = start_time.replace(minute=0, second=0, microsecond=0)
+    if interval != "hour":
+        current = current.replace(hour=0)
+
+    buckets = []
+    while current <= end_time:
+        key = current.strftime(time_format)
+        if not buckets or buckets[-1][0] != key:
+            buckets.append((key, max(current, start_time)))
+        current += step
+    return buckets
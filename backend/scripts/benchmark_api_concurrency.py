@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+接口并发吞吐基准测试
+
+对比两种路由写法在并发请求下的吞吐和事件循环延迟：
+- sync: async路由中直接调用同步Session（改造前的写法），查询期间阻塞事件循环
+- async: 通过AsyncSession.run_sync在异步驱动上执行同一个服务方法（当前写法）
+
+用法：
+    uv run python scripts/benchmark_api_concurrency.py --novel-id 123456 --requests 200 --concurrency 20
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.database.connection import async_engine, engine, get_async_db, get_db
+from app.database.service.book_service import BookService
+
+book_service = BookService()
+
+
+def create_benchmark_app() -> FastAPI:
+    """创建只包含两个对照路由的应用，两者执行相同的历史快照查询"""
+    app = FastAPI()
+
+    @app.get("/sync/{novel_id}")
+    async def sync_route(novel_id: int, interval: str = "day", count: int = 30, db: Session = Depends(get_db)):
+        snapshots = book_service.get_historical_snapshots_by_novel_id(db, novel_id, interval, count)
+        return {"count": len(snapshots)}
+
+    @app.get("/async/{novel_id}")
+    async def async_route(novel_id: int, interval: str = "day", count: int = 30,
+                          db: AsyncSession = Depends(get_async_db)):
+        snapshots = await db.run_sync(book_service.get_historical_snapshots_by_novel_id, novel_id, interval, count)
+        return {"count": len(snapshots)}
+
+    return app
+
+
+async def measure_loop_lag(stop: asyncio.Event, interval: float = 0.005) -> float:
+    """定时醒来并记录实际醒来时间与预期的最大偏差，即事件循环被阻塞的最长时间"""
+    max_lag = 0.0
+    while not stop.is_set():
+        expected = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        max_lag = max(max_lag, time.perf_counter() - expected)
+    return max_lag
+
+
+async def run_mode(app: FastAPI, mode: str, novel_id: int, total: int, concurrency: int) -> dict:
+    """以指定并发发送total个请求，返回吞吐、延迟和事件循环最大阻塞时间"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        async def one_request():
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.get(f"/{mode}/{novel_id}")
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - started)
+
+        # 预热连接池
+        await one_request()
+        latencies.clear()
+
+        stop = asyncio.Event()
+        lag_task = asyncio.create_task(measure_loop_lag(stop))
+        started = time.perf_counter()
+        await asyncio.gather(*(one_request() for _ in range(total)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        max_lag = await lag_task
+
+    latencies.sort()
+    return {
+        "mode": mode,
+        "rps": total / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "max_loop_lag_ms": max_lag * 1000,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="同步Session与AsyncSession路由的并发吞吐对比")
+    parser.add_argument("--novel-id", type=int, required=True, help="用于查询历史快照的小说ID")
+    parser.add_argument("--requests", type=int, default=200, help="每种模式的请求总数")
+    parser.add_argument("--concurrency", type=int, default=20, help="并发请求数")
+    args = parser.parse_args()
+
+    app = create_benchmark_app()
+    try:
+        for mode in ("sync", "async"):
+            result = await run_mode(app, mode, args.novel_id, args.requests, args.concurrency)
+            print(
+                f"{result['mode']:>5}: {result['rps']:8.1f} req/s  "
+                f"p50 {result['p50_ms']:7.1f} ms  p95 {result['p95_ms']:7.1f} ms  "
+                f"事件循环最大阻塞 {result['max_loop_lag_ms']:7.1f} ms"
+            )
+    finally:
+        await async_engine.dispose()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+榜单与书籍详情解析基准测试
+
+使用data/example/*.json中的真实响应样例对比两种解析方式：
+- legacy: 每个字段驼峰/小写两次get回退、每本书调用datetime.now()、正则findall+join提取数字、输出字典（改造前的写法）
+- current: 每个榜单检测一次键名、共用批次时间、预编译数字提取、输出__slots__记录（当前写法）
+
+已安装msgspec时，额外对比响应体的json.loads与按接口结构的类型化解码（typed）。
+
+用法：
+    uv run python scripts/benchmark_parsers.py --repeat 200
+"""
+
+import argparse
+import json
+import re
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.crawl.parser import NovelPageParser, PageParser, RankingParser
+from app.crawl.payload_decoder import PayloadDecoder, msgspec_available
+from app.utils import update_dict
+
+EXAMPLE_DIR = project_root / "data" / "example"
+# 书籍详情样例与榜单页面样例
+BOOK_EXAMPLE = "book_example.json"
+
+
+def legacy_extract_number(string) -> int:
+    """改造前的数字提取"""
+    if not string:
+        return 0
+    return int(''.join(re.findall(r'\d', str(string))))
+
+
+class LegacyRankingParser(RankingParser):
+    """改造前的榜单书籍解析"""
+
+    def parse_ranking_info(self, raw_data, parent_ranking_info=None):
+        self.ranking_info = self._parse_ranking_info(raw_data, is_sub_ranking=parent_ranking_info is not None)
+        if parent_ranking_info:
+            self.ranking_info = update_dict(parent_ranking_info, self.ranking_info)
+        data_list = self._get_ranking_data(raw_data)
+        if self.has_sub_ranking:
+            self.sub_rankings = data_list
+            return
+        for index, book_data in enumerate(data_list):
+            self.book_snapshots.append({
+                "position": index,
+                "novel_id": book_data.get("novelId") or book_data.get("novelid"),
+                "title": book_data.get("novelName") or book_data.get("novelname"),
+                "author_id": book_data.get("authorId") or book_data.get("authorid") or 0,
+                "author_name": book_data.get("authorName") or book_data.get("authorname") or None,
+                "snapshot_time": datetime.now(),
+            })
+
+
+def legacy_parse_page(raw_page_data: dict, page_id: str) -> list:
+    """改造前的页面解析，榜单层级的处理与PageParser一致"""
+    result = []
+    data_list = raw_page_data.get("data", [])
+    if isinstance(data_list, dict):
+        data_list = [data_list]
+    for ranking_data in data_list:
+        rank_info = LegacyRankingParser(page_id)
+        rank_info.parse_ranking_info(ranking_data)
+        if not rank_info.has_sub_ranking:
+            result.append(rank_info)
+            continue
+        for sub_ranking_data in rank_info.sub_rankings:
+            sub_rank_info = LegacyRankingParser(page_id)
+            sub_rank_info.parse_ranking_info(sub_ranking_data, rank_info.ranking_info)
+            result.append(sub_rank_info)
+    return result
+
+
+def legacy_parse_novel(raw: dict) -> dict:
+    """改造前的书籍详情解析"""
+    return {
+        "novel_id": raw.get("novelId", None),
+        "title": raw.get("novelName", None),
+        "author_id": raw.get("authorId", 0),
+        "author_name": raw.get("authorName", None),
+        "status": raw.get("series", None),
+        "word_counts": legacy_extract_number(raw.get("novelSize")),
+        "chapter_counts": legacy_extract_number(raw.get("novelChapterCount")),
+        "vip_chapter_id": legacy_extract_number(raw.get("vipChapterid")),
+        "favorites": legacy_extract_number(raw.get("novelbefavoritedcount")),
+        "clicks": legacy_extract_number(raw.get("novip_clicks")),
+        "comments": legacy_extract_number(raw.get("comment_count")),
+        "nutrition": legacy_extract_number(raw.get("nutrition_novel")),
+        "snapshot_time": datetime.now(),
+    }
+
+
+def load_examples() -> tuple[dict, list[tuple[str, dict]]]:
+    """读取样例响应，返回(书籍详情, [(page_id, 页面响应)])"""
+    book = json.loads((EXAMPLE_DIR / BOOK_EXAMPLE).read_text(encoding="utf-8"))["content"]
+    pages = []
+    for path in sorted(EXAMPLE_DIR.glob("*_example.json")):
+        if path.name != BOOK_EXAMPLE:
+            pages.append((path.stem.removesuffix("_example"), json.loads(path.read_text(encoding="utf-8"))["content"]))
+    return book, pages
+
+
+def load_raw_examples() -> list[tuple[str, bytes]]:
+    """读取样例响应，返回[(url, 响应体)]"""
+    raws = []
+    for path in sorted(EXAMPLE_DIR.glob("*_example.json")):
+        example = json.loads(path.read_text(encoding="utf-8"))
+        raws.append((example["url"], json.dumps(example["content"], ensure_ascii=False).encode("utf-8")))
+    return raws
+
+
+def measure(parse, repeat: int) -> tuple[float, int]:
+    """执行repeat次解析，返回单次耗时中位数（秒）和单次解析结果占用的内存（字节）"""
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        parse()
+        durations.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    result = parse()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return statistics.median(durations), retained
+
+
+def main():
+    parser = argparse.ArgumentParser(description="榜单与书籍详情解析耗时对比")
+    parser.add_argument("--repeat", type=int, default=200, help="每种方式的重复次数，取中位数")
+    args = parser.parse_args()
+
+    book, pages = load_examples()
+    book_count = sum(len(ranking.book_snapshots) for page_id, page in pages for ranking in PageParser(page, page_id).rankings)
+    novels = [book] * 1000
+    cases = [
+        (f"pages({book_count} books)", "legacy", lambda: [legacy_parse_page(page, page_id) for page_id, page in pages]),
+        (f"pages({book_count} books)", "current", lambda: [PageParser(page, page_id) for page_id, page in pages]),
+        ("novels(1000)", "legacy", lambda: [legacy_parse_novel(raw) for raw in novels]),
+        ("novels(1000)", "current", lambda: [NovelPageParser(raw) for raw in novels]),
+    ]
+    if msgspec_available():
+        raws = load_raw_examples()
+        decoder = PayloadDecoder()
+        cases += [
+            (f"decode({len(raws)} bodies)", "json", lambda: [json.loads(content) for _, content in raws]),
+            (f"decode({len(raws)} bodies)", "typed", lambda: [decoder.decode(url, content) for url, content in raws]),
+        ]
+    for name, mode, parse in cases:
+        elapsed, retained = measure(parse, args.repeat)
+        print(f"{name:>20} {mode:>7}: {elapsed * 1000:8.2f} ms  {retained / 1024:8.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
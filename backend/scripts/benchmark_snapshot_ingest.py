@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+快照批量写入基准测试
+
+在临时SQLite数据库上对比两种快照写入方式：
+- orm: 逐行filter_dict后构造ORM对象，db.add_all + flush（改造前的写法）
+- core: complete_rows按预先计算的列整理后Core INSERT executemany（当前写法）
+
+为只比较写入本身，测试期间关闭变化存储模式；core方式的榜单快照写入包含批次索引表的维护，
+core+rollups方式在core的基础上开启书籍快照汇总表，汇总行与批次索引均直接由行字典生成。
+
+用法：
+    uv run python scripts/benchmark_snapshot_ingest.py --rows 10000 --repeat 5
+"""
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest.mock import patch
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.config import get_settings
+from app.database.connection import configure_sqlite_engine
+from app.database.db.base import Base
+from app.database.db.book import Book, BookSnapshot
+from app.database.db.ranking import Ranking, RankingSnapshot
+from app.database.service.book_service import BookService
+from app.database.service.ranking_service import RankingService
+from app.utils import filter_dict
+
+
+def make_book_snapshots(count: int) -> list[dict]:
+    """构造与爬虫解析结果结构相同的书籍快照数据，包含表中不存在的字段"""
+    now = datetime.now()
+    return [
+        {
+            "novel_id": i % 1000 + 1,
+            "title": f"书籍{i % 1000}",
+            "author_name": "作者",
+            "favorites": i,
+            "clicks": i * 3,
+            "comments": i % 50,
+            "nutrition": i % 7,
+            "word_counts": 100000 + i,
+            "chapter_counts": 50,
+            "status": "连载中",
+            "snapshot_time": now - timedelta(seconds=i),
+        }
+        for i in range(count)
+    ]
+
+
+def make_ranking_snapshots(count: int, ranking_id: int) -> list[dict]:
+    """构造榜单快照数据，每100本书一个批次"""
+    now = datetime.now()
+    return [
+        {
+            "ranking_id": ranking_id,
+            "novel_id": i % 1000 + 1,
+            "batch_id": f"batch-{i // 100}",
+            "position": i % 100 + 1,
+            "title": f"书籍{i % 1000}",
+            "snapshot_time": now - timedelta(minutes=i // 100),
+        }
+        for i in range(count)
+    ]
+
+
+def orm_insert(db: Session, model, snapshots: list[dict]) -> None:
+    """改造前的写入方式"""
+    objs = [model(**filter_dict(snapshot, model)) for snapshot in snapshots]
+    db.add_all(objs)
+    db.flush()
+
+
+def timed(session_factory, write, repeat: int) -> float:
+    """执行repeat次写入并回滚，返回耗时中位数（秒）"""
+    durations = []
+    for _ in range(repeat):
+        with session_factory() as db:
+            started = time.perf_counter()
+            write(db)
+            durations.append(time.perf_counter() - started)
+            db.rollback()
+    return statistics.median(durations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ORM与Core executemany的快照写入耗时对比")
+    parser.add_argument("--rows", type=int, default=10000, help="每次写入的快照行数")
+    parser.add_argument("--repeat", type=int, default=5, help="每种方式的重复次数，取中位数")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        engine = create_engine(f"sqlite:///{Path(tmp_dir) / 'ingest.db'}")
+        configure_sqlite_engine(engine)
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        with session_factory() as db:
+            db.add_all([Book(novel_id=i, title=f"书籍{i}") for i in range(1, 1001)])
+            ranking = Ranking(rank_id="bench", hash_id="b" * 32, channel_name="基准", page_id="bench")
+            db.add(ranking)
+            db.commit()
+            ranking_id = ranking.id
+
+        book_snapshots = make_book_snapshots(args.rows)
+        ranking_snapshots = make_ranking_snapshots(args.rows, ranking_id)
+        database_settings = get_settings().database
+        write_books = lambda db: BookService.batch_create_book_snapshots(db, book_snapshots, commit=False)
+        cases = [
+            ("book_snapshots", "orm", False, lambda db: orm_insert(db, BookSnapshot, book_snapshots)),
+            ("book_snapshots", "core", False, write_books),
+            ("book_snapshots", "core+rollups", True, write_books),
+            ("ranking_snapshots", "orm", False, lambda db: orm_insert(db, RankingSnapshot, ranking_snapshots)),
+            ("ranking_snapshots", "core", False, lambda db: RankingService.batch_create_ranking_snapshots(
+                db, ranking_snapshots, commit=False)),
+        ]
+        with patch.object(database_settings, "snapshot_change_only", False), \
+                patch.object(database_settings, "ranking_storage", "rows"):
+            for table, mode, rollups, write in cases:
+                with patch.object(database_settings, "book_history_rollups", rollups):
+                    elapsed = timed(session_factory, write, args.repeat)
+                print(f"{table:>18} {mode:>12}: {elapsed * 1000:8.1f} ms  {args.rows / elapsed:10.0f} rows/s")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -489,6 +489,51 @@ def delete_tables(table_names: List[str]):
         raise
 
 
+def rebuild_book_snapshot_rollups():
+    """
+    根据book_snapshots重建书籍快照时间段汇总表
+
+    开启book_history_rollups之前已有的快照不在汇总表中，执行一次即可补齐
+    """
+    from app.database.service.book_service import BookService
+
+    logger = get_logger(__name__)
+    with SessionLocal() as db:
+        processed = BookService.rebuild_snapshot_rollups(db)
+    logger.info(f"书籍快照汇总表重建完成，处理快照 {processed} 条")
+    return processed
+
+
+def rebuild_ranking_batch_index():
+    """
+    根据ranking_snapshots重建榜单批次索引表
+
+    批次索引表上线之前已有的榜单快照不在索引表中，执行一次即可补齐
+    """
+    from app.database.service.ranking_service import RankingService
+
+    logger = get_logger(__name__)
+    with SessionLocal() as db:
+        processed = RankingService.rebuild_batch_index(db)
+    logger.info(f"榜单批次索引表重建完成，处理批次 {processed} 个")
+    return processed
+
+
+def rebuild_ranking_book_positions():
+    """
+    根据ranking_snapshot_batches重建差量存储的书籍排名索引表
+
+    书籍排名索引表上线之前已有的差量批次不在索引表中，执行一次即可补齐
+    """
+    from app.database.service.ranking_service import RankingService
+
+    logger = get_logger(__name__)
+    with SessionLocal() as db:
+        processed = RankingService.rebuild_book_positions(db)
+    logger.info(f"书籍排名索引表重建完成，处理批次 {processed} 个")
+    return processed
+
+
 if __name__ == '__main__':
     # 示例运行：删除book表格的running、age列
     try:
@@ -503,3 +548,6 @@ if __name__ == '__main__':
     # add_columns("books", {"isbn": "String", "published_date": "DateTime"})
     # migrate_table(("old_books", "books"), {"old_title": "title", "old_content": "content"})
     # delete_tables(["temp_table", "backup_table"])
+    # rebuild_book_snapshot_rollups()
+    # rebuild_ranking_batch_index()
+    # rebuild_ranking_book_positions()
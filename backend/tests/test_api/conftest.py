@@ -7,9 +7,18 @@ from datetime import date, datetime
 
 import pytest
 
+from app.cache import get_response_cache
 from app.database.db.book import Book, BookSnapshot
 from app.database.db.ranking import Ranking
 
+
+@pytest.fixture(autouse=True)
+def clear_response_cache():
+    """每个测试前后清空接口响应缓存，避免不同测试的mock结果互相命中"""
+    get_response_cache().clear()
+    yield
+    get_response_cache().clear()
+
 # ==================== API专用Mock数据 ====================
 
 
@@ -358,8 +358,8 @@ class TestErrorHandling:
 
     def test_database_connection_error(self, client, mocker):
         """测试数据库连接错误"""
-        # 模拟get_db抛出异常
-        mocker.patch("app.api.rankings.get_db", side_effect=Exception("数据库连接失败"))
+        # 模拟get_async_db抛出异常
+        mocker.patch("app.api.rankings.get_async_db", side_effect=Exception("数据库连接失败"))
 
         # 发送请求
         response = client.get("/api/v1/rankings/?page=1&size=20")
@@ -0,0 +1,83 @@
+"""
+接口响应缓存测试文件
+测试app.cache模块的版本号失效、LRU淘汰和接口缓存命中
+"""
+
+from unittest.mock import Mock
+
+import pytest
+
+from app.cache import ResponseCache, get_response_cache
+
+
+class TestResponseCache:
+    """测试响应缓存"""
+
+    @pytest.mark.asyncio
+    async def test_bump_version_invalidates_entries(self):
+        """测试递增版本号后旧缓存不再命中"""
+        cache = ResponseCache()
+        request = Mock(query_params=Mock(multi_items=lambda: [("b", "2"), ("a", "1")]))
+        request.url.path = "/api/v1/rankings/detail/day/1"
+
+        key = await cache.key_for(request)
+        await cache.set(key, b'{"data":1}')
+
+        assert key == "v0:/api/v1/rankings/detail/day/1?a=1&b=2"
+        assert await cache.get(key) == b'{"data":1}'
+        cache.bump_version()
+        assert await cache.get(await cache.key_for(request)) is None
+        assert cache.get_stats()["version"] == 1
+
+    @pytest.mark.asyncio
+    async def test_lru_eviction_and_disabled(self):
+        """测试超出容量时淘汰最久未使用的条目，禁用时不缓存"""
+        cache = ResponseCache(max_size=2)
+        await cache.set("a", b"1")
+        await cache.set("b", b"2")
+        await cache.get("a")
+        await cache.set("c", b"3")
+
+        assert await cache.get("b") is None
+        assert await cache.get("a") == b"1"
+        assert await ResponseCache(enabled=False).key_for(Mock()) is None
+
+    @pytest.mark.asyncio
+    async def test_redis_reads_do_not_block(self, mocker):
+        """测试配置Redis时接口读写走redis.asyncio客户端，递增版本号走同步客户端"""
+        sync_client, async_client = Mock(), mocker.AsyncMock()
+        async_client.get.side_effect = [b"3", b'{"data":1}']
+        mocker.patch("app.cache._connect_redis", side_effect=[sync_client, async_client])
+        cache = ResponseCache(redis_url="redis://localhost:6379/0")
+        request = Mock(query_params=Mock(multi_items=lambda: []))
+        request.url.path = "/api/v1/books/1"
+
+        key = await cache.key_for(request)
+        body = await cache.get(key)
+        await cache.set(key, b'{"data":1}')
+        cache.bump_version()
+
+        assert (key, body) == ("v3:/api/v1/books/1?", b'{"data":1}')
+        async_client.set.assert_awaited_once_with("jjcrawler:response:v3:/api/v1/books/1?", b'{"data":1}', ex=300)
+        sync_client.incr.assert_called_once_with("jjcrawler:response:version")
+        sync_client.get.assert_not_called()
+
+
+class TestCachedEndpoints:
+    """测试接口缓存命中"""
+
+    def test_book_ranking_history_served_from_cache(self, client, mocker):
+        """测试相同请求第二次直接返回缓存，爬取批次提交后重新查询"""
+        mocker.patch("app.api.books.book_service").get_book_by_novel_id.return_value = Mock(novel_id=12345)
+        mock_ranking_service = mocker.patch("app.api.books.ranking_service")
+        mock_ranking_service.get_book_ranking_history.return_value = []
+
+        first = client.get("/api/v1/books/12345/rankings?days=7")
+        second = client.get("/api/v1/books/12345/rankings?days=7")
+        get_response_cache().bump_version()
+        client.get("/api/v1/books/12345/rankings?days=7")
+
+        assert first.status_code == second.status_code == 200
+        assert first.content == second.content
+        assert second.json()["message"] == "获取0条排名历史成功"
+        assert mock_ranking_service.get_book_ranking_history.call_count == 2
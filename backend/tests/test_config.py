@@ -257,6 +257,38 @@ class TestCrawlerSettings:
             CrawlerSettings(concurrent_requests=20)  # 大于最大值
 
 
+class TestCrawlerProfiles:
+    """测试CrawlerSettings连接配置档位"""
+
+    def test_profile_applies_pool_and_concurrency(self):
+        """测试配置档位统一设置并发、连接池和请求间隔"""
+        settings = CrawlerSettings(profile="aggressive")
+
+        assert settings.max_concurrent_requests == 16
+        assert settings.max_connections == 32
+        assert settings.request_delay == 0.5
+        assert settings.http2 is True
+
+    def test_explicit_fields_override_profile(self):
+        """测试显式设置的字段优先于配置档位"""
+        settings = CrawlerSettings(profile="conservative", max_concurrent_requests=4)
+
+        assert settings.max_concurrent_requests == 4
+        assert settings.request_delay == 3.0
+        assert settings.max_connections == 4
+
+    def test_keepalive_clamped_to_max_connections(self):
+        """测试keep-alive连接数不超过连接池大小"""
+        settings = CrawlerSettings(max_connections=5, max_keepalive_connections=20)
+
+        assert settings.max_keepalive_connections == 5
+
+    def test_invalid_profile(self):
+        """测试无效的配置档位"""
+        with pytest.raises(ValidationError):
+            CrawlerSettings(profile="turbo")
+
+
 class TestSchedulerSettings:
     """测试SchedulerSettings配置类"""
 
@@ -35,6 +35,24 @@ def test_db_session(test_engine):
         session.close()
 
 
+@pytest.fixture(autouse=True)
+def reset_freshness_index():
+    """每个测试前后清空全局新鲜度索引，避免测试之间互相影响"""
+    from app.crawl.freshness import get_freshness_index
+    get_freshness_index().clear()
+    yield
+    get_freshness_index().clear()
+
+
+@pytest.fixture(autouse=True)
+def reset_request_coalescer():
+    """每个测试前后清空全局响应缓存，避免不同测试的mock响应互相命中"""
+    from app.crawl.request_coalescer import get_request_coalescer
+    get_request_coalescer().clear()
+    yield
+    get_request_coalescer().clear()
+
+
 # ==================== 爬虫配置数据 ====================
 
 @pytest.fixture
@@ -191,7 +209,7 @@ def mock_book_service(mocker):
     mock_book.novel_id = 123456
     
     service.create_or_update_book.return_value = mock_book
-    service.batch_create_book_snapshots.return_value = []
+    service.batch_create_book_snapshots.return_value = 0
     
     return service
 
@@ -207,7 +225,7 @@ def mock_ranking_service(mocker):
     mock_ranking.rank_id = "test_rank"
     
     service.create_or_update_ranking.return_value = mock_ranking
-    service.batch_create_ranking_snapshots.return_value = []
+    service.batch_create_ranking_snapshots.return_value = 0
     
     return service
 
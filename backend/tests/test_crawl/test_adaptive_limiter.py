@@ -0,0 +1,92 @@
+"""
+自适应并发限制器测试
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+import pytest
+
+from app.crawl.adaptive_limiter import AdaptiveLimiter, AdaptiveLimiterConfig, is_overload_error
+from app.crawl.http_client import HttpClient
+
+
+def make_status_error(status_code: int) -> httpx.HTTPStatusError:
+    response = MagicMock()
+    response.status_code = status_code
+    return httpx.HTTPStatusError(f"{status_code}", request=None, response=response)
+
+
+class TestAdaptiveLimiter:
+    """AIMD并发窗口测试"""
+
+    def test_additive_increase_and_multiplicative_decrease(self):
+        """测试健康延迟时加性增长，过载时乘性减小"""
+        limiter = AdaptiveLimiter(AdaptiveLimiterConfig(initial_limit=4, max_limit=8, decrease_cooldown=0))
+        # 约一个完整窗口的成功请求使窗口增长1
+        for _ in range(5):
+            limiter.record_success(0.1)
+        assert limiter.limit == 5
+
+        assert limiter.record_overload("503") is False
+        assert limiter.limit == 2
+
+    def test_high_latency_shrinks_window(self):
+        """测试延迟超过阈值时收缩窗口"""
+        limiter = AdaptiveLimiter(AdaptiveLimiterConfig(initial_limit=8, latency_threshold=1.0))
+        limiter.record_success(3.0)
+        assert limiter.limit == 4
+
+    def test_reports_sustained_overload_only_at_floor(self):
+        """测试只有窗口已在下限时过载才视为持续失败"""
+        limiter = AdaptiveLimiter(AdaptiveLimiterConfig(initial_limit=2, min_limit=1, decrease_cooldown=0))
+        assert limiter.record_overload("503") is False
+        assert limiter.at_floor
+        assert limiter.record_overload("503") is True
+
+    def test_cooldown_prevents_repeated_halving(self):
+        """测试同一波过载在冷却时间内只减小一次"""
+        limiter = AdaptiveLimiter(AdaptiveLimiterConfig(initial_limit=16, max_limit=16, decrease_cooldown=60))
+        for _ in range(5):
+            limiter.record_overload("503")
+        assert limiter.limit == 8
+
+    def test_overload_errors(self):
+        """测试过载错误判断"""
+        assert is_overload_error(make_status_error(503))
+        assert is_overload_error(make_status_error(429))
+        assert is_overload_error(httpx.ReadTimeout("timeout"))
+        assert not is_overload_error(make_status_error(404))
+        assert not is_overload_error(ValueError("bad json"))
+
+    @pytest.mark.asyncio
+    async def test_window_bounds_concurrency(self):
+        """测试并发数不超过当前窗口"""
+        limiter = AdaptiveLimiter.fixed(2)
+        peak = 0
+
+        async def task():
+            nonlocal peak
+            async with limiter.slot():
+                peak = max(peak, limiter.inflight)
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(*(task() for _ in range(6)))
+        assert peak == 2
+        assert limiter.inflight == 0
+
+    @pytest.mark.asyncio
+    async def test_http_client_feeds_breaker_only_at_floor(self):
+        """测试HTTP客户端只在窗口降到下限后才向熔断器报告503"""
+        limiter = AdaptiveLimiter(AdaptiveLimiterConfig(initial_limit=2, min_limit=1, decrease_cooldown=0))
+        client = HttpClient(limiter=limiter)
+
+        with patch("app.crawl.http_client.report_service_error", new_callable=AsyncMock) as mock_report:
+            await client._record_failure(make_status_error(503))
+            mock_report.assert_not_awaited()
+            await client._record_failure(make_status_error(503))
+            mock_report.assert_awaited_once()
+            await client._record_failure(make_status_error(404))
+            mock_report.assert_awaited_once()
+        await client.close()
@@ -0,0 +1,63 @@
+"""
+书籍获取优先级测试
+"""
+
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+
+from app.crawl.book_priority import collect_best_positions, prioritize_novel_ids, priority_score
+from app.crawl.parser import RankingParser
+
+
+class TestBookPriority:
+    """书籍优先级排序测试"""
+
+    def test_collect_best_positions(self):
+        """测试跨榜单统计最好名次"""
+        first, second = RankingParser("jiazi"), RankingParser("index")
+        first.book_snapshots = [{"novel_id": "1", "position": 5}, {"novel_id": "2", "position": 0}]
+        second.book_snapshots = [{"novel_id": "1", "position": 1}, {"novel_id": None, "position": 2}]
+
+        assert collect_best_positions([first, second]) == {1: 1, 2: 0}
+
+    def test_score_components(self):
+        """测试排名越高、波动越大、越久未更新，分数越高"""
+        now = datetime.now()
+        fresh_flat = [
+            {"snapshot_time": now, "favorites": 100, "clicks": 1000},
+            {"snapshot_time": now - timedelta(hours=1), "favorites": 100, "clicks": 1000},
+        ]
+        fresh_volatile = [
+            {"snapshot_time": now, "favorites": 150, "clicks": 1500},
+            {"snapshot_time": now - timedelta(hours=1), "favorites": 100, "clicks": 1000},
+        ]
+        stale_flat = [{**s, "snapshot_time": s["snapshot_time"] - timedelta(days=2)} for s in fresh_flat]
+
+        assert priority_score(0, fresh_flat, now) > priority_score(10, fresh_flat, now)
+        assert priority_score(10, fresh_volatile, now) > priority_score(10, fresh_flat, now)
+        assert priority_score(10, stale_flat, now) > priority_score(10, fresh_flat, now)
+        # 从未获取过的书籍视为完全陈旧
+        assert priority_score(None, [], now) == pytest.approx(0.2)
+
+    def test_prioritize_keeps_order_on_ties(self):
+        """测试按分数排序，分数相同时保持原顺序"""
+        now = datetime.now()
+        recent = {3: [{"snapshot_time": now, "favorites": 1, "clicks": 1}]}
+
+        assert prioritize_novel_ids(["3", "1", "2"], {2: 0}, recent, now) == ["2", "1", "3"]
+
+    @pytest.mark.asyncio
+    async def test_crawl_flow_applies_budget(self):
+        """测试CrawlFlow按优先级截取书籍获取预算"""
+        from app.crawl.crawl_flow import CrawlFlow, crawler_config
+
+        flow = CrawlFlow()
+        with patch.object(flow.freshness, "warm"), \
+                patch("app.crawl.crawl_flow.load_recent_snapshots", return_value={}), \
+                patch.object(crawler_config, "book_fetch_budget", 2):
+            selected = await flow._select_novel_ids([1, 2, 3, 4], {4: 0, 3: 1, 1: 5})
+        await flow.close()
+
+        assert selected == [4, 3]
@@ -197,6 +197,21 @@ class TestRankingParser:
         assert "789101" in novel_ids
         assert "789102" in novel_ids
 
+    def test_mixed_key_styles_and_batch_time(self):
+        """按第一本书逐字段检测键名，同一榜单的书籍共用一个快照时间"""
+        parser = RankingParser("index")
+        parser.parse_ranking_info({"rankid": "mixed", "data": [
+            {"novelId": "1", "novelname": "小写书名", "authorName": "作者1"},
+            {"novelId": "2", "novelname": "小写书名2"},
+        ]})
+
+        first, second = parser.book_snapshots
+        assert first["title"] == "小写书名"
+        assert first["author_id"] == 0
+        assert second["author_name"] is None
+        assert first["snapshot_time"] is second["snapshot_time"]
+        assert {**first, "position": 5}["novel_id"] == "1"
+
 
 class TestPageParser:
     """测试页面解析器"""
@@ -239,6 +254,18 @@ class TestNovelPageParser:
         assert book_detail["comments"] == 100
         assert book_detail["nutrition"] == 95
 
+    def test_novel_record_mapping(self, mock_book_detail_response):
+        """书籍详情记录可以像字典一样读取、修改、展开，且不接受未定义的字段"""
+        book_detail = NovelPageParser(mock_book_detail_response).book_detail
+
+        book_detail["novel_id"] = int(book_detail["novel_id"])
+        assert dict(book_detail)["novel_id"] == 123456
+        assert book_detail.get("unknown") is None
+        assert book_detail.replace(favorites=1)["favorites"] == 1
+        assert book_detail["favorites"] == 1200
+        with pytest.raises(KeyError):
+            book_detail["unknown"] = 1
+
 
 class TestIntegration:
     """集成测试"""
@@ -348,4 +348,206 @@ class TestCrawlFlowErrorScenarios:
         # 即使部分失败，整体流程可能仍然成功
         # 具体取决于实现的容错策略
         assert "success" in result
-        assert "execution_time" in result
\ No newline at end of file
+        assert "execution_time" in result
+
+class TestBulkIngest:
+    """批量写入模式测试 - 使用内存数据库"""
+
+    def test_bulk_save_ranking_parsers(self, mock_jiazi_response, mock_page_response, test_db_session):
+        """测试批量保存榜单、书籍和榜单快照"""
+        from app.crawl.parser import PageParser
+        from app.database.db.book import Book
+        from app.database.db.ranking import RankingSnapshot
+
+        rankings = PageParser(mock_jiazi_response, "jiazi").rankings + PageParser(mock_page_response, "index").rankings
+
+        ranking_num, snapshot_num = CrawlFlow.bulk_save_ranking_parsers(rankings, test_db_session)
+        test_db_session.commit()
+
+        assert ranking_num == len(rankings)
+        assert snapshot_num == 4
+        for novel_id in (123456, 123457, 789101, 789102):
+            assert test_db_session.get(Book, novel_id) is not None
+        batch_ids = {s.batch_id for s in test_db_session.query(RankingSnapshot).filter(
+            RankingSnapshot.novel_id.in_([123456, 123457])
+        )}
+        assert len(batch_ids) >= 1
+
+    def test_bulk_save_duplicate_book_in_ranking(self, mock_jiazi_response, test_db_session):
+        """测试批量保存 - 同一榜单中重复出现的书籍只保留排名靠前的一条，不中断整批写入"""
+        from app.crawl.parser import PageParser
+        from app.database.db.ranking import RankingSnapshot
+
+        rankings = PageParser(mock_jiazi_response, "jiazi").rankings
+        first = rankings[0].book_snapshots[0]
+        rankings[0].book_snapshots.append({**first, "position": first["position"] + 100})
+        existing_ids = {s.id for s in test_db_session.query(RankingSnapshot)}
+
+        _, snapshot_num = CrawlFlow.bulk_save_ranking_parsers(rankings, test_db_session)
+        test_db_session.commit()
+
+        stored = [
+            s for s in test_db_session.query(RankingSnapshot).filter_by(novel_id=int(first["novel_id"]))
+            if s.id not in existing_ids
+        ]
+        assert snapshot_num == sum(len(ranking.book_snapshots) for ranking in rankings) - 1
+        assert [s.position for s in stored] == [first["position"]]
+
+    def test_bulk_save_novel_parsers(self, mock_book_detail_response, test_db_session):
+        """测试批量保存书籍详情和书籍快照"""
+        from app.crawl.parser import NovelPageParser
+
+        detail = {**mock_book_detail_response, "novelSize": "50000", "novelChapterCount": "25",
+                  "novelbefavoritedcount": "1200", "novip_clicks": "5000", "comment_count": "100",
+                  "nutrition_novel": "95"}
+        books = [NovelPageParser(detail), NovelPageParser({**detail, "novelId": None})]
+
+        saved_novel_ids = CrawlFlow.bulk_save_novel_parsers(books, test_db_session)
+        test_db_session.commit()
+
+        assert saved_novel_ids == [int(detail["novelId"])]
+
+
+@pytest.fixture
+def savepoint_db_session():
+    """启用SAVEPOINT支持的内存数据库会话"""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+
+    from app.database.connection import configure_sqlite_engine
+    from app.database.db.base import Base
+
+    engine = create_engine("sqlite:///:memory:", poolclass=StaticPool,
+                           connect_args={"check_same_thread": False})
+    configure_sqlite_engine(engine)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+class TestUnitOfWorkIngest:
+    """单事务写入测试 - 保存点隔离单条坏数据"""
+
+    def test_bad_book_only_rolls_back_its_savepoint(self, savepoint_db_session):
+        """测试坏数据只回滚自身保存点，不影响同一事务中的其他书籍"""
+        from app.crawl.parser import NovelPageParser
+        from app.database.db.book import Book, BookSnapshot
+
+        good, bad, later = NovelPageParser(), NovelPageParser(), NovelPageParser()
+        good.book_detail = {"novel_id": 1001, "title": "正常书籍", "favorites": 10}
+        bad.book_detail = {"novel_id": 1002, "title": None, "favorites": 20}
+        later.book_detail = {"novel_id": 1003, "title": "后续书籍", "favorites": 30}
+
+        saved_novel_ids = CrawlFlow.save_novel_parsers([good, bad, later], savepoint_db_session)
+        savepoint_db_session.commit()
+
+        assert saved_novel_ids == [1001, 1003]
+        assert savepoint_db_session.get(Book, 1001) is not None
+        assert savepoint_db_session.get(Book, 1002) is None
+        assert savepoint_db_session.get(Book, 1003) is not None
+        assert savepoint_db_session.query(BookSnapshot).count() == 2
+
+    def test_save_crawl_batch_does_not_commit(self, savepoint_db_session):
+        """测试工作单元写入不在内部提交，回滚后不留下任何数据"""
+        from app.crawl.parser import NovelPageParser
+        from app.database.db.book import Book
+
+        book = NovelPageParser()
+        book.book_detail = {"novel_id": 2001, "title": "未提交书籍"}
+
+        result, saved_novel_ids = CrawlFlow.save_crawl_batch([], [book], savepoint_db_session)
+        savepoint_db_session.rollback()
+
+        assert result["books_snapshots"] == 1
+        assert saved_novel_ids == [2001]
+        assert savepoint_db_session.get(Book, 2001) is None
+
+    @pytest.mark.asyncio
+    async def test_save_data_writes_in_worker_thread(self):
+        """测试阶段3的批次写入在线程中执行，不阻塞事件循环"""
+        import threading
+        from app.crawl.crawl_flow import NovelsResult, PagesResult
+
+        flow = CrawlFlow()
+        write_threads = []
+
+        def fake_write(rankings, books):
+            write_threads.append(threading.get_ident())
+            return {"rankings": 0, "ranking_snapshots": 0, "books": 0, "books_snapshots": 1}, [1001]
+
+        with patch.object(flow, "write_crawl_batch", side_effect=fake_write):
+            result = await flow._save_data(PagesResult(), NovelsResult())
+        await flow.close()
+
+        assert result["books_snapshots"] == 1
+        assert write_threads and write_threads[0] != threading.get_ident()
+
+
+class TestStreamingIngest:
+    """流式流水线测试 - 页面、书籍获取与写入重叠执行"""
+
+    @pytest.mark.asyncio
+    async def test_streaming_pipeline_dedups_and_flushes(self, mock_jiazi_response, savepoint_db_session):
+        """测试流式模式跨页面去重书籍ID，并按微批写入全部数据"""
+        from app.crawl.crawl_flow import crawler_config
+        from app.crawl.crawl_task import PageTask
+        from app.crawl.parser import NovelPageParser, PageParser
+        from app.database.db.book import BookSnapshot
+
+        flow = CrawlFlow()
+        fetched = []
+
+        async def fake_page(page_task):
+            return PageParser(mock_jiazi_response, page_id=page_task.id)
+
+        async def fake_book(novel_id):
+            fetched.append(novel_id)
+            parser = NovelPageParser()
+            parser.book_detail = {"novel_id": int(novel_id), "title": f"书籍{novel_id}"}
+            return parser
+
+        page_tasks = [PageTask(id="jiazi", name="jiazi", type="jiazi", url="jiazi"), PageTask(id="jiazi_copy", name="jiazi_copy", type="jiazi", url="jiazi_copy")]
+        with patch.object(flow, "_fetch_and_parse_page", side_effect=fake_page), \
+                patch.object(flow, "_fetch_and_parse_book", side_effect=fake_book), \
+                patch.object(crawler_config, "stream_batch_size", 1), \
+                patch('app.crawl.crawl_flow.SessionLocal', return_value=savepoint_db_session):
+            pages_result, novels_result, save_results = await flow._execute_streaming(page_tasks)
+        await flow.close()
+
+        assert sorted(fetched) == sorted(set(fetched))
+        assert pages_result.success_num == 2
+        assert novels_result.success_num == len(fetched)
+        assert save_results["books_snapshots"] == len(fetched)
+        assert savepoint_db_session.query(BookSnapshot).count() == len(fetched)
+
+    @pytest.mark.asyncio
+    async def test_streaming_pipeline_records_failures(self, mock_jiazi_response, savepoint_db_session):
+        """测试流式模式中页面和书籍失败只记录，不中断其余处理"""
+        from app.crawl.crawl_task import PageTask
+        from app.crawl.parser import PageParser
+
+        flow = CrawlFlow()
+
+        async def fake_page(page_task):
+            if page_task.id == "broken":
+                raise ValueError("页面内容获取失败")
+            return PageParser(mock_jiazi_response, page_id=page_task.id)
+
+        async def fake_book(novel_id):
+            raise KeyError("Invalid book data")
+
+        page_tasks = [PageTask(id="jiazi", name="jiazi", type="jiazi", url="jiazi"), PageTask(id="broken", name="broken", type="jiazi", url="broken")]
+        with patch.object(flow, "_fetch_and_parse_page", side_effect=fake_page), \
+                patch.object(flow, "_fetch_and_parse_book", side_effect=fake_book), \
+                patch('app.crawl.crawl_flow.SessionLocal', return_value=savepoint_db_session):
+            pages_result, novels_result, save_results = await flow._execute_streaming(page_tasks)
+        await flow.close()
+
+        assert pages_result.failed_ids == ["broken"]
+        assert novels_result.success_num == 0
+        assert novels_result.to_dict()["total_novels_num"] == len(novels_result.failed_items) > 0
+        assert save_results["rankings"] == len(pages_result.rankings)
@@ -0,0 +1,104 @@
+"""
+书籍详情新鲜度索引测试
+"""
+
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+
+from app.crawl.freshness import FreshnessIndex
+
+
+class TestFreshnessIndex:
+    """新鲜度索引测试"""
+
+    def test_mark_and_expire(self):
+        """测试窗口内为新鲜，超过TTL后过期"""
+        index = FreshnessIndex(ttl_seconds=600)
+        now = datetime.now()
+        index.mark_fetched("1001", now - timedelta(seconds=60))
+        index.mark_fetched(1002, now - timedelta(seconds=3600))
+
+        assert index.is_fresh(1001, now)
+        assert not index.is_fresh("1002", now)
+        assert not index.is_fresh(1003, now)
+        assert not index.is_fresh(None, now)
+
+    def test_disabled_when_ttl_is_zero(self):
+        """测试TTL为0时不跳过任何书籍"""
+        index = FreshnessIndex(ttl_seconds=0)
+        index.mark_fetched(1001)
+
+        assert index.partition([1001, 1002]) == ([1001, 1002], [])
+
+    def test_lru_eviction(self):
+        """测试超过容量时淘汰最久未使用的记录"""
+        index = FreshnessIndex(ttl_seconds=600, max_size=2)
+        index.mark_fetched(1)
+        index.mark_fetched(2)
+        index.is_fresh(1)
+        index.mark_fetched(3)
+
+        assert index.is_fresh(1)
+        assert not index.is_fresh(2)
+        assert index.get_stats()["size"] == 2
+
+    def test_partition_warms_from_latest_snapshot(self, test_db_session):
+        """测试缓存未命中时回源数据库最新快照时间"""
+        from app.database.db.book import Book, BookSnapshot
+
+        now = datetime.now()
+        test_db_session.add_all([
+            Book(novel_id=5001, title="近期快照"),
+            Book(novel_id=5002, title="过期快照"),
+            BookSnapshot(novel_id=5001, snapshot_time=now - timedelta(days=1)),
+            BookSnapshot(novel_id=5001, snapshot_time=now - timedelta(minutes=5)),
+            BookSnapshot(novel_id=5002, snapshot_time=now - timedelta(days=1)),
+        ])
+        test_db_session.commit()
+
+        index = FreshnessIndex(ttl_seconds=600)
+        with patch('app.crawl.freshness.SessionLocal', return_value=test_db_session):
+            stale, fresh = index.partition(["5002", "5001", "5003"])
+
+        assert stale == ["5002", "5003"]
+        assert fresh == ["5001"]
+
+    @pytest.mark.asyncio
+    async def test_crawl_flow_skips_fresh_novels(self):
+        """测试CrawlFlow跳过新鲜度窗口内已获取的书籍，defer模式则排到最后"""
+        from app.crawl.crawl_flow import CrawlFlow, crawler_config
+
+        flow = CrawlFlow()
+        flow.freshness = FreshnessIndex(ttl_seconds=600)
+        flow.freshness.mark_fetched(1001)
+        with patch.object(flow.freshness, "warm"):
+            assert await flow._select_novel_ids([1001, 1002]) == [1002]
+            with patch.object(crawler_config, "freshness_mode", "defer"):
+                assert await flow._select_novel_ids([1001, 1002]) == [1002, 1001]
+        await flow.close()
+
+    @pytest.mark.asyncio
+    async def test_crawl_flow_marks_fresh_after_write(self):
+        """测试书籍只在批次写入成功后记入新鲜度索引，写入失败的书籍下次仍会获取"""
+        from app.crawl.crawl_flow import CrawlFlow, NovelsResult, PagesResult
+        from app.crawl.parser import NovelPageParser
+
+        flow = CrawlFlow()
+        flow.freshness = FreshnessIndex(ttl_seconds=600)
+        novels_result = NovelsResult()
+        for novel_id in (1001, 1002):
+            parser = NovelPageParser()
+            parser.book_detail = {"novel_id": novel_id, "title": f"书籍{novel_id}"}
+            novels_result.success_items.append(parser)
+
+        with patch.object(flow, "write_crawl_batch", side_effect=RuntimeError("写入失败")):
+            await flow._save_data(PagesResult(), novels_result)
+        assert not flow.freshness.is_fresh(1001)
+
+        # 保存点回滚的书籍没有写入，不记入新鲜度索引
+        with patch.object(flow, "write_crawl_batch", return_value=({"books_snapshots": 1}, [1001])):
+            await flow._save_data(PagesResult(), novels_result)
+        assert flow.freshness.is_fresh(1001) and not flow.freshness.is_fresh(1002)
+        await flow.close()
@@ -59,6 +59,21 @@ class TestHttpClient:
         assert isinstance(res, httpx.Response)
         assert res.status_code == 200
 
+    def test_pool_limits_from_settings(self):
+        """测试连接池大小和HTTP/2开关来自配置，未安装h2时回退HTTP/1.1"""
+        client = HttpClient()
+        with patch.object(default_config, "max_connections", 7), \
+                patch.object(default_config, "max_keepalive_connections", 3), \
+                patch.object(default_config, "http2", True), \
+                patch.dict("sys.modules", {"h2": None}):
+            http_client = client._create_http_client()
+
+        pool = http_client._transport._pool
+        assert pool._max_connections == 7
+        assert pool._max_keepalive_connections == 3
+        assert pool._http2 is False
+        assert http_client.headers["Connection"] == "keep-alive"
+
     @pytest.mark.asyncio
     async def test_run_single_url_success(self, async_client, mock_response):
         """测试单个URL请求 - 成功场景"""
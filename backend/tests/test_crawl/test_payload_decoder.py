@@ -0,0 +1,93 @@
+"""
+类型化响应解码测试
+"""
+
+import json
+from pathlib import Path
+
+import pytest
+
+from app.crawl.http_client import should_retry_request
+from app.crawl.parser import NovelPageParser, PageParser
+from app.crawl.payload_decoder import PayloadDecoder, PayloadSchemaError
+
+EXAMPLE_DIR = Path(__file__).parents[2] / "data" / "example"
+PAGE_URL = "https://app-cdn.jjwxc.com/bookstore/getFullPageV1?channel={}&version=20"
+JIAZI_URL = "https://app-cdn.jjwxc.com/bookstore/favObservationByDate?day=today&use_cdn=1&version=20"
+BOOK_URL = "https://app-cdn.jjwxc.com/androidapi/novelbasicinfo?novelId=8877874"
+
+
+def load_example(name: str) -> bytes:
+    """读取样例响应体"""
+    example = json.loads((EXAMPLE_DIR / f"{name}_example.json").read_text(encoding="utf-8"))
+    return json.dumps(example["content"], ensure_ascii=False).encode("utf-8")
+
+
+class TestJsonFallback:
+    """未开启快速解码时的回退"""
+
+    def test_returns_full_payload(self):
+        """回退json时返回完整响应"""
+        decoder = PayloadDecoder(fast_decode=False)
+
+        assert not decoder.enabled
+        assert decoder.decode(BOOK_URL, load_example("book")) == json.loads(load_example("book"))
+
+    def test_schema_error_not_retried(self):
+        """结构不一致时不重试，普通解析错误仍然重试"""
+        assert should_retry_request(PayloadSchemaError("drift")) is False
+        assert should_retry_request(ValueError("bad json")) is True
+
+
+class TestTypedDecode:
+    """msgspec类型化解码"""
+
+    @pytest.fixture
+    def decoder(self):
+        pytest.importorskip("msgspec")
+        return PayloadDecoder()
+
+    @pytest.mark.parametrize("page_id, url", [
+        ("index", PAGE_URL.format("index")),
+        ("yq", PAGE_URL.format("yq")),
+        ("gywx", PAGE_URL.format("gywx")),
+        ("jiazi", JIAZI_URL),
+    ])
+    def test_ranking_pages_parse_like_json(self, decoder, page_id, url):
+        """类型化解码的榜单页面与完整JSON解析出相同的榜单和书籍"""
+        content = load_example(page_id)
+
+        typed = PageParser(decoder.decode(url, content), page_id)
+        full = PageParser(json.loads(content), page_id)
+
+        assert [r.ranking_info for r in typed.rankings] == [r.ranking_info for r in full.rankings]
+        assert [
+            [{**book, "snapshot_time": None} for book in r.book_snapshots] for r in typed.rankings
+        ] == [
+            [{**book, "snapshot_time": None} for book in r.book_snapshots] for r in full.rankings
+        ]
+
+    def test_novel_detail_skips_unused_fields(self, decoder):
+        """书籍详情只保留解析器需要的字段"""
+        content = load_example("book")
+        payload = decoder.decode(BOOK_URL, content)
+
+        assert "novelIntro" not in payload
+        typed = NovelPageParser(payload).book_detail
+        full = NovelPageParser(json.loads(content)).book_detail
+        assert typed.replace(snapshot_time=None) == full.replace(snapshot_time=None)
+
+    def test_schema_drift_raises(self, decoder):
+        """字段类型变化时抛出PayloadSchemaError"""
+        with pytest.raises(PayloadSchemaError):
+            decoder.decode(BOOK_URL, b'{"novelId": "1", "novelName": {"text": "title"}}')
+
+    def test_invalid_json_raises_value_error(self, decoder):
+        """非法JSON抛出可重试的ValueError"""
+        with pytest.raises(ValueError) as exc_info:
+            decoder.decode(BOOK_URL, b"{not json")
+        assert not isinstance(exc_info.value, PayloadSchemaError)
+
+    def test_unknown_endpoint_uses_generic_decode(self, decoder):
+        """未声明结构的接口返回完整响应"""
+        assert decoder.decode("http://example.com/api", b'{"a": {"b": [1]}}') == {"a": {"b": [1]}}
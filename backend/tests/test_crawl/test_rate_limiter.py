@@ -0,0 +1,63 @@
+"""
+令牌桶限速模块测试
+"""
+
+import time
+
+import pytest
+
+from app.config import RateLimitSettings
+from app.crawl.crawl_task import get_crawl_task
+from app.crawl.rate_limiter import EndpointRateLimiter, TokenBucket
+
+
+class TestTokenBucket:
+    """令牌桶测试"""
+
+    def test_burst_then_rate(self):
+        """测试桶满时允许突发，之后按速率预约等待时间"""
+        bucket = TokenBucket(rate=10.0, burst=3)
+
+        assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 0.0]
+        assert bucket.reserve() == pytest.approx(0.1, abs=0.01)
+        assert bucket.reserve() == pytest.approx(0.2, abs=0.01)
+
+    @pytest.mark.asyncio
+    async def test_acquire_enforces_sustained_rate(self):
+        """测试持续请求速率不超过配置"""
+        bucket = TokenBucket(rate=50.0, burst=1)
+        start = time.monotonic()
+        for _ in range(6):
+            await bucket.acquire()
+
+        assert time.monotonic() - start >= 0.09
+
+
+class TestEndpointRateLimiter:
+    """按接口族限速测试"""
+
+    def test_match_template(self):
+        """测试URL按模板归属到接口族"""
+        crawl_task = get_crawl_task()
+
+        assert crawl_task.match_template(crawl_task.build_novel_url(123456)) == "novel_detail"
+        assert crawl_task.match_template(crawl_task.get_task("jiazi").url) == "jiazi_ranking"
+        assert crawl_task.match_template(crawl_task.get_task("index").url) == "page_ranking"
+        assert crawl_task.match_template("http://example.com/api") is None
+
+    @pytest.mark.asyncio
+    async def test_buckets_are_independent(self):
+        """测试不同接口族使用独立的令牌桶，未配置的接口不限速"""
+        crawl_task = get_crawl_task()
+        limiter = EndpointRateLimiter({
+            "novel_detail": RateLimitSettings(rate=0.001, burst=1),
+            "page_ranking": RateLimitSettings(rate=1000, burst=5),
+        })
+
+        await limiter.acquire(crawl_task.build_novel_url(1))
+        start = time.monotonic()
+        await limiter.acquire(crawl_task.get_task("index").url)
+        await limiter.acquire("http://example.com/api")
+
+        assert time.monotonic() - start < 0.05
+        assert limiter._buckets["novel_detail"].reserve() > 100
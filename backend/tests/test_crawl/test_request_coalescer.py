@@ -0,0 +1,121 @@
+"""
+请求合并模块测试
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+from app.crawl.request_coalescer import RequestCoalescer
+
+
+class TestRequestCoalescer:
+    """请求合并器测试"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_share_one_fetch(self):
+        """测试同一事件循环中并发的相同请求只执行一次"""
+        coalescer = RequestCoalescer()
+        calls = []
+
+        async def fetcher():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return {"novelId": "1001"}
+
+        results = await asyncio.gather(*(coalescer.fetch("url", fetcher) for _ in range(5)))
+
+        assert len(calls) == 1
+        assert all(r == {"novelId": "1001"} for r in results)
+        # 调用方之间不共享同一对象
+        assert results[0] is not results[1]
+        assert coalescer.get_stats()["coalesced"] == 4
+
+    @pytest.mark.asyncio
+    async def test_unshared_result_is_not_copied(self):
+        """测试没有被合并且不缓存的请求直接返回原对象，缓存的结果仍然复制"""
+        payload = {"novelId": "1002"}
+
+        async def fetcher():
+            return payload
+
+        assert await RequestCoalescer().fetch("url", fetcher) is payload
+
+        cached = RequestCoalescer(cache_ttl=60)
+        first = await cached.fetch("url", fetcher)
+        second = await cached.fetch("url", fetcher)
+        assert first == second == payload
+        assert first is not payload and second is not payload and first is not second
+
+    def test_requests_coalesce_across_event_loops(self):
+        """测试不同线程中各自asyncio.run的请求也能合并"""
+        coalescer = RequestCoalescer()
+        calls = []
+        started = threading.Event()
+
+        async def fetcher():
+            calls.append(1)
+            started.set()
+            await asyncio.sleep(0.2)
+            return {"novelId": "2002"}
+
+        results = []
+
+        def job():
+            results.append(asyncio.run(coalescer.fetch("url", fetcher)))
+
+        leader = threading.Thread(target=job)
+        leader.start()
+        started.wait(timeout=1)
+        follower = threading.Thread(target=job)
+        follower.start()
+        leader.join()
+        follower.join()
+
+        assert len(calls) == 1
+        assert results == [{"novelId": "2002"}, {"novelId": "2002"}]
+
+    @pytest.mark.asyncio
+    async def test_errors_are_shared_but_not_cached(self):
+        """测试失败结果共享给并发等待方，但不进入缓存"""
+        coalescer = RequestCoalescer(cache_ttl=60)
+        calls = []
+
+        async def failing():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            raise ValueError("请求失败")
+
+        results = await asyncio.gather(*(coalescer.fetch("url", failing) for _ in range(3)),
+                                       return_exceptions=True)
+        assert all(isinstance(r, ValueError) for r in results)
+        assert len(calls) == 1
+
+        async def succeeding():
+            calls.append(1)
+            return {"ok": True}
+
+        assert await coalescer.fetch("url", succeeding) == {"ok": True}
+        assert await coalescer.fetch("url", succeeding) == {"ok": True}
+        assert len(calls) == 2
+        assert coalescer.get_stats()["cache_hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_cancelled_follower_does_not_cancel_leader(self):
+        """测试等待方被取消时不影响发起方"""
+        coalescer = RequestCoalescer()
+
+        async def fetcher():
+            await asyncio.sleep(0.05)
+            return {"ok": True}
+
+        leader = asyncio.create_task(coalescer.fetch("url", fetcher))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(coalescer.fetch("url", fetcher))
+        await asyncio.sleep(0)
+        follower.cancel()
+
+        assert await leader == {"ok": True}
+        with pytest.raises(asyncio.CancelledError):
+            await follower
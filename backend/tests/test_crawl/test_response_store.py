@@ -0,0 +1,90 @@
+"""
+条件请求和本地响应存储测试
+"""
+
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.crawl.http_client import HttpClient
+from app.crawl.response_store import ResponseStore
+
+
+def make_response(status_code: int, body: dict | None = None, headers: dict | None = None) -> MagicMock:
+    response = MagicMock()
+    response.status_code = status_code
+    response.content = json.dumps(body).encode("utf-8") if body is not None else b""
+    response.headers = headers or {}
+    response.raise_for_status = MagicMock()
+    return response
+
+
+class TestResponseStore:
+    """本地响应存储测试"""
+
+    def test_save_and_conditional_headers(self, tmp_path):
+        """测试保存校验器和压缩响应体后生成条件请求头"""
+        store = ResponseStore(tmp_path)
+        url = "https://app-cdn.jjwxc.com/androidapi/novelbasicinfo?novelId=1"
+
+        assert store.conditional_headers(url) == {}
+        store.save(url, '"v1"', "Wed, 01 Oct 2025 00:00:00 GMT", b'{"novelId": "1"}')
+
+        assert store.conditional_headers(url) == {
+            "If-None-Match": '"v1"', "If-Modified-Since": "Wed, 01 Oct 2025 00:00:00 GMT"
+        }
+        assert store.load_body(url) == b'{"novelId": "1"}'
+        assert store.current_validator(url) == '"v1"'
+
+    def test_response_without_validators_not_stored(self, tmp_path):
+        """测试没有校验器的响应不保存"""
+        store = ResponseStore(tmp_path)
+        store.save("http://example.com/a", None, None, b"{}")
+
+        assert store.conditional_headers("http://example.com/a") == {}
+        assert not any(tmp_path.iterdir())
+
+
+class TestConditionalRequests:
+    """HTTP客户端条件请求测试"""
+
+    @pytest.mark.asyncio
+    async def test_not_modified_uses_stored_body(self, tmp_path):
+        """测试304响应视为缓存命中，返回本地保存的响应体"""
+        url = "http://example.com/novel"
+        client = HttpClient()
+        client.response_store = ResponseStore(tmp_path)
+        await client._ensure_client_ready()
+
+        first = make_response(200, {"novelId": "1", "novelName": "书名"}, {"ETag": '"v1"'})
+        second = make_response(304)
+        with patch.object(client._client, "get", side_effect=[first, second]) as mock_get:
+            assert await client._execute_single_request(url) == {"novelId": "1", "novelName": "书名"}
+            assert await client._execute_single_request(url) == {"novelId": "1", "novelName": "书名"}
+
+        assert mock_get.call_args_list[1].kwargs["headers"] == {"If-None-Match": '"v1"'}
+        second.raise_for_status.assert_not_called()
+        await client.close()
+
+    @pytest.mark.asyncio
+    async def test_unchanged_book_reuses_parsed_result(self, tmp_path, mock_book_detail_response):
+        """测试书籍响应校验器未变化时复用解析结果并刷新快照时间"""
+        from app.crawl.crawl_flow import CrawlFlow
+
+        flow = CrawlFlow()
+        flow.client.response_store = ResponseStore(tmp_path)
+        url = "http://example.com/novel"
+        detail = {**mock_book_detail_response, "novelSize": "50000", "novelChapterCount": "25",
+                  "novelbefavoritedcount": "1200", "novip_clicks": "5000", "comment_count": "100",
+                  "nutrition_novel": "95"}
+
+        flow.client.response_store.remember_validator(url, '"v1"')
+        first = flow._parse_book(url, detail)
+        with patch("app.crawl.crawl_flow.NovelPageParser.parse_novel_info") as mock_parse:
+            second = flow._parse_book(url, detail)
+            mock_parse.assert_not_called()
+        await flow.close()
+
+        assert second.book_detail["novel_id"] == first.book_detail["novel_id"]
+        assert second.book_detail["snapshot_time"] >= first.book_detail["snapshot_time"]
@@ -0,0 +1,71 @@
+"""
+爬虫运行时测试 - 常驻事件循环复用CrawlFlow
+"""
+
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from app.crawl.crawl_flow import CrawlFlow, crawl_task_wrapper, crawler_config
+from app.crawl.runtime import CrawlerRuntime
+
+
+@pytest.fixture
+def runtime():
+    """独立的爬虫运行时实例，测试结束后停止"""
+    crawler_runtime = CrawlerRuntime()
+    yield crawler_runtime
+    crawler_runtime.stop()
+
+
+class TestCrawlerRuntime:
+    """爬虫运行时测试"""
+
+    def test_jobs_share_loop_and_crawl_flow(self, runtime):
+        """测试多次任务在同一个后台事件循环中复用同一个CrawlFlow"""
+        seen = []
+
+        async def fake_execute(flow, page_ids):
+            seen.append((id(flow), threading.current_thread().name))
+            return {"success": True, "page_ids": page_ids}
+
+        with patch.object(CrawlFlow, "execute_crawl_task", fake_execute):
+            first = runtime.run_crawl(["jiazi"])
+            second = runtime.run_crawl(["index"])
+
+        assert first == {"success": True, "page_ids": ["jiazi"]}
+        assert second["page_ids"] == ["index"]
+        assert seen[0] == seen[1]
+        assert seen[0][1] == "crawler-runtime"
+
+    def test_stop_closes_crawl_flow(self, runtime):
+        """测试停止运行时会关闭CrawlFlow并结束后台线程"""
+        async def fake_execute(flow, page_ids):
+            return {"success": True}
+
+        with patch.object(CrawlFlow, "execute_crawl_task", fake_execute), \
+                patch.object(CrawlFlow, "close") as mock_close:
+            runtime.run_crawl(["jiazi"])
+            runtime.stop()
+
+        mock_close.assert_awaited_once()
+        assert not runtime.is_running
+
+    def test_wrapper_uses_runtime_or_falls_back(self, runtime):
+        """测试包装函数默认提交到运行时，关闭配置时回退到asyncio.run"""
+        threads = []
+
+        async def fake_execute(flow, page_ids):
+            threads.append(threading.current_thread().name)
+            return {"success": True}
+
+        with patch.object(CrawlFlow, "execute_crawl_task", fake_execute), \
+                patch("app.crawl.runtime.get_crawler_runtime", return_value=runtime):
+            with patch.object(crawler_config, "persistent_runtime", True):
+                assert crawl_task_wrapper(["jiazi"])["success"]
+            with patch.object(crawler_config, "persistent_runtime", False):
+                assert crawl_task_wrapper(["jiazi"])["success"]
+
+        assert threads[0] == "crawler-runtime"
+        assert threads[1] == threading.current_thread().name
@@ -0,0 +1,198 @@
+"""
+快照归档测试
+使用真实内存数据库和临时目录验证Parquet归档、删除和查询回查
+"""
+
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from app.cache import get_response_cache
+from app.config import get_settings
+from app.database.db.book import Book, BookSnapshot, BookSnapshotRollup
+from app.database.db.ranking import (
+    Ranking, RankingBatchIndex, RankingBookPosition, RankingSnapshot, RankingSnapshotBatch
+)
+from app.database.service import archive_service
+from app.database.service.archive_service import SnapshotArchive
+from app.database.service.book_service import BookService
+from app.database.service.ranking_service import RankingService
+from app.models.schedule import JobType, get_predefined_jobs
+
+
+class TestSnapshotArchive:
+    """快照归档测试类"""
+
+    @pytest.fixture
+    def archive(self, tmp_path):
+        archive = SnapshotArchive(tmp_path, chunk_size=1000)
+        with patch.object(archive_service, "_snapshot_archive", archive):
+            yield archive
+
+    @pytest.fixture
+    def seeded_session(self, test_db_session):
+        """写入一本书和一个榜单，各有40天前和1天前的快照"""
+        now = datetime.now().replace(hour=12, minute=0, second=0, microsecond=0)
+        test_db_session.add(Book(novel_id=444001, title="归档书籍"))
+        ranking = Ranking(rank_id="archive", hash_id="archive-hash", channel_name="归档榜单", page_id="archive")
+        test_db_session.add(ranking)
+        test_db_session.flush()
+        for days, favorites in ((40, 100), (1, 200)):
+            snapshot_time = now - timedelta(days=days)
+            test_db_session.add(BookSnapshot(
+                novel_id=444001, favorites=favorites, chapter_counts=10, snapshot_time=snapshot_time
+            ))
+            test_db_session.add_all([
+                RankingSnapshot(ranking_id=ranking.id, novel_id=novel_id, batch_id=f"batch-{days}",
+                                position=position, snapshot_time=snapshot_time)
+                for position, novel_id in enumerate([444001, 444002], start=1)
+            ])
+        test_db_session.commit()
+        return test_db_session, ranking.id, now
+
+    def test_archive_moves_old_snapshots(self, archive, seeded_session, tmp_path):
+        """测试归档 - 旧快照写入按表和月份分区的Parquet文件并从数据库删除"""
+        db, _, now = seeded_session
+
+        archived = archive.archive_before(db, now - timedelta(days=30))
+
+        assert archived == {"book_snapshots": 1, "ranking_snapshots": 2, "ranking_snapshot_batches": 0}
+        assert db.query(BookSnapshot).count() == 1
+        assert db.query(RankingSnapshot).count() == 2
+        month = (now - timedelta(days=40)).strftime("%Y-%m")
+        assert list((tmp_path / "book_snapshots" / f"month={month}").glob("*.parquet"))
+        rows = archive.read("book_snapshots", now - timedelta(days=41), now, novel_id=444001)
+        assert [row["favorites"] for row in rows] == [100]
+
+    def test_archive_invalidates_response_cache(self, archive, seeded_session):
+        """测试归档后递增接口响应缓存的版本号"""
+        db, _, now = seeded_session
+        cache = get_response_cache()
+        version = cache.get_stats()["version"]
+
+        archive.archive_before(db, now - timedelta(days=30))
+
+        assert cache.get_stats()["version"] == version + 1
+
+    def test_queries_fall_through_to_archive(self, archive, seeded_session):
+        """测试查询回查 - 时间范围覆盖归档月份时合并归档数据"""
+        db, ranking_id, now = seeded_session
+        archive.archive_before(db, now - timedelta(days=30))
+
+        book_history = BookService.get_historical_snapshots_by_novel_id(db, 444001, "day", 60)
+        ranking_history = RankingService().get_ranking_history_by_day(
+            db, ranking_id, (now - timedelta(days=45)).date(), now.date()
+        )
+        rank_info = RankingService().get_book_ranking_history(db, 444001, 60)
+        archived_day = RankingService.get_snapshots_by_day(db, ranking_id, (now - timedelta(days=40)).date())
+
+        assert [s.favorites for s in book_history] == [100, 200]
+        assert len(ranking_history.snapshots) == 2
+        assert [b.novel_id for b in ranking_history.snapshots[0].books] == [444001, 444002]
+        assert [info.snapshot_time for info in rank_info] == [now - timedelta(days=1), now - timedelta(days=40)]
+        assert [s.novel_id for s in archived_day] == [444001, 444002]
+
+    def test_detail_of_archived_day_after_indexed_write(self, archive, test_db_session):
+        """测试归档后查询详情 - 批次索引和汇总行随快照一起删除，归档日期的详情从归档读取"""
+        db = test_db_session
+        old_time = datetime.now().replace(hour=12, minute=0, second=0, microsecond=0) - timedelta(days=40)
+        db.add(Book(novel_id=444001, title="归档书籍"))
+        ranking = Ranking(rank_id="archive", hash_id="archive-hash", channel_name="归档榜单", page_id="archive")
+        db.add(ranking)
+        db.flush()
+        RankingService.batch_create_ranking_snapshots(db, [
+            {"ranking_id": ranking.id, "novel_id": 444001, "position": 1, "snapshot_time": old_time},
+        ], batch_id="batch-old")
+        BookService.batch_create_book_snapshots(db, [
+            {"novel_id": 444001, "favorites": 100, "snapshot_time": old_time},
+        ])
+        assert db.query(RankingBatchIndex).count() == 2
+
+        archive.archive_before(db, old_time + timedelta(days=10))
+
+        assert db.query(RankingBatchIndex).count() == 0
+        assert db.query(BookSnapshotRollup).count() == 0
+        detail = RankingService().get_ranking_detail_by_day(db, ranking.id, old_time.date())
+        hour_snapshots = RankingService.get_snapshots_by_hour(db, ranking.id, old_time.date(), old_time.hour)
+        assert [b.novel_id for b in detail.books] == [444001]
+        assert [s.novel_id for s in hour_snapshots] == [444001]
+
+    def test_stale_batch_index_falls_back_to_archive(self, archive, seeded_session):
+        """测试索引残留 - 索引指向的批次已不在数据库中时从归档读取"""
+        db, ranking_id, now = seeded_session
+        old_time = now - timedelta(days=40)
+        archive.archive_before(db, now - timedelta(days=30))
+        db.add(RankingBatchIndex(ranking_id=ranking_id, interval="day", bucket=old_time.strftime("%Y-%m-%d"),
+                                 batch_id="batch-40", snapshot_time=old_time))
+        db.commit()
+
+        snapshots = RankingService.get_snapshots_by_day(db, ranking_id, old_time.date())
+
+        assert [s.novel_id for s in snapshots] == [444001, 444002]
+
+    def test_book_detail_after_all_snapshots_archived(self, archive, seeded_session):
+        """测试书籍详情 - 数据库中的快照都已归档时取最后一条归档快照"""
+        db, _, now = seeded_session
+        archive.archive_before(db, now)
+
+        detail = BookService.get_book_detail_by_novel_id(db, 444001)
+
+        assert db.query(BookSnapshot).count() == 0
+        assert detail.favorites == 200
+        assert detail.snapshot_time == now - timedelta(days=1)
+
+    def test_step_history_seed_from_older_archive(self, archive, test_db_session):
+        """测试变化存储的历史 - 段开始前的最后一条快照在一个多月前的归档中时仍能作为起始值"""
+        db = test_db_session
+        old_time = datetime.now().replace(hour=12, minute=0, second=0, microsecond=0) - timedelta(days=70)
+        db.add(Book(novel_id=444003, title="长期未变化书籍"))
+        db.add(BookSnapshot(novel_id=444003, favorites=300, chapter_counts=10, snapshot_time=old_time))
+        db.commit()
+        archive.archive_before(db, old_time + timedelta(days=1))
+
+        with patch.object(get_settings().database, "snapshot_change_only", True):
+            history = BookService.get_historical_snapshots_by_novel_id(db, 444003, "day", 7)
+
+        assert len(history) >= 7
+        assert {s.favorites for s in history} == {300}
+
+    def test_archive_delta_batches(self, archive, test_db_session):
+        """测试差量存储归档 - 只归档到截止时间前最后一个关键帧，归档的批次还原后仍能查询"""
+        db = test_db_session
+        now = datetime.now().replace(hour=12, minute=0, second=0, microsecond=0)
+        db.add_all([Book(novel_id=novel_id, title=f"差量书籍{novel_id}") for novel_id in (444011, 444012, 444013)])
+        ranking = Ranking(rank_id="delta", hash_id="delta-hash", channel_name="差量榜单", page_id="delta")
+        db.add(ranking)
+        db.flush()
+        orders = {50: [444011, 444012], 49: [444012, 444011], 48: [444013, 444011], 47: [444011, 444013],
+                  1: [444012, 444013]}
+        with patch.object(get_settings().database, "ranking_storage", "delta"), \
+                patch.object(get_settings().database, "ranking_keyframe_interval", 2):
+            for days, order in orders.items():
+                RankingService.batch_create_ranking_snapshots(db, [
+                    {"ranking_id": ranking.id, "novel_id": novel_id, "position": position,
+                     "snapshot_time": now - timedelta(days=days)}
+                    for position, novel_id in enumerate(order, start=1)
+                ], batch_id=f"delta-{days}")
+
+            archived = archive.archive_before(db, now - timedelta(days=30))
+            history = RankingService().get_ranking_history_by_day(
+                db, ranking.id, (now - timedelta(days=55)).date(), now.date()
+            )
+            rank_info = RankingService().get_book_ranking_history(db, 444011, 55)
+
+        # 第48天是截止时间前最后一个关键帧，之前的两个批次归档
+        assert archived["ranking_snapshot_batches"] == 4
+        assert db.query(RankingSnapshotBatch).count() == 3
+        assert db.query(RankingBookPosition).count() == 6
+        assert [[b.novel_id for b in s.books] for s in history.snapshots] == list(orders.values())
+        assert [info.position for info in rank_info] == [1, 2, 2, 1]
+
+    def test_archive_job_is_predefined(self):
+        """测试预定义任务 - 启用清理时包含CLEAN类型的归档任务"""
+        jobs = {job.job_id: job for job in get_predefined_jobs()}
+
+        assert jobs["snapshot_archive"].job_type == JobType.CLEAN
@@ -4,11 +4,14 @@ BookService集成测试
 """
 
 from datetime import datetime, timedelta
+from unittest.mock import patch
 
 import pytest
 
+from app.config import get_settings
 from app.database.service.book_service import BookService
-from app.database.db.book import Book, BookSnapshot
+from app.database.service.snapshot_digest import get_snapshot_digest_cache
+from app.database.db.book import Book, BookSnapshot, BookSnapshotRollup
 
 
 class TestBookServiceIntegration:
@@ -149,18 +152,262 @@ class TestBookServiceIntegration:
         result = book_service.batch_create_book_snapshots(populated_db_session, sample_book_snapshots_data)
 
         # 验证结果
-        assert len(result) == len(sample_book_snapshots_data)
-        
+        assert result == len(sample_book_snapshots_data)
+
         # 验证每个快照
-        for i, snapshot in enumerate(result):
-            assert snapshot.novel_id == sample_book_snapshots_data[i]["novel_id"]
-            assert snapshot.favorites == sample_book_snapshots_data[i]["favorites"]
-            assert snapshot.clicks == sample_book_snapshots_data[i]["clicks"]
+        for data in sample_book_snapshots_data:
+            snapshot = populated_db_session.query(BookSnapshot).filter_by(
+                novel_id=data["novel_id"], snapshot_time=data["snapshot_time"]
+            ).one()
+            assert snapshot.favorites == data["favorites"]
+            assert snapshot.clicks == data["clicks"]
 
         # 验证数据库中的记录数量
         total_snapshots = populated_db_session.query(BookSnapshot).count()
         assert total_snapshots >= len(sample_book_snapshots_data)
 
+    def test_batch_create_book_snapshots_core_insert(self, book_service, test_db_session):
+        """测试批量创建书籍快照 - 忽略表外字段、补齐列默认值，返回写入数量"""
+        test_db_session.add(Book(novel_id=555100, title="批量写入书籍"))
+        test_db_session.commit()
+
+        created = book_service.batch_create_book_snapshots(test_db_session, [
+            {"novel_id": 555100, "title": "批量写入书籍", "clicks": 7},
+        ])
+
+        stored = test_db_session.query(BookSnapshot).filter_by(novel_id=555100).one()
+        assert created == 1
+        assert (stored.clicks, stored.favorites) == (7, 0)
+        assert stored.snapshot_time is not None
+
+    def test_create_book_without_commit(self, book_service, test_db_session, sample_book_data):
+        """测试创建书籍 - commit=False时由调用方决定提交或回滚"""
+        result = book_service.create_book(test_db_session, sample_book_data, commit=False)
+        assert result.novel_id == sample_book_data["novel_id"]
+
+        test_db_session.rollback()
+        assert test_db_session.get(Book, sample_book_data["novel_id"]) is None
+
+    def test_bulk_upsert_books_dedup_and_update(self, book_service, test_db_session, sample_book_data):
+        """测试批量upsert书籍 - 跨批次去重并更新已存在书籍"""
+        book_service.create_book(test_db_session, sample_book_data)
+
+        books = [
+            {"novel_id": "999999", "title": "批量更新标题", "author_id": 9999, "position": 1},
+            {"novel_id": 888888, "title": "批量新书", "author_id": 8888},
+            {"novel_id": 888888, "title": "批量新书-重复", "author_name": None},
+            {"novel_id": "abc", "title": "无效ID"},
+            {"novel_id": 777777, "title": None},
+        ]
+
+        # 执行测试 - 批量upsert
+        saved_ids = book_service.bulk_upsert_books(test_db_session, books)
+        test_db_session.commit()
+        test_db_session.expire_all()
+
+        # 验证结果 - 无效ID和缺少标题的记录被跳过
+        assert sorted(saved_ids) == [888888, 999999]
+        assert test_db_session.get(Book, 999999).title == "批量更新标题"
+        assert test_db_session.get(Book, 888888).title == "批量新书-重复"
+        assert test_db_session.get(Book, 888888).author_id == 8888
+        assert test_db_session.get(Book, 777777) is None
+
+    def test_bulk_upsert_books_keeps_missing_author(self, book_service, test_db_session):
+        """测试批量upsert书籍 - 榜单数据缺少作者字段时保留已有的作者信息"""
+        book_service.bulk_upsert_books(test_db_session, [
+            {"novel_id": 888001, "title": "作者书籍", "author_id": 8001, "author_name": "原作者"},
+        ])
+        book_service.bulk_upsert_books(test_db_session, [{"novel_id": 888001, "title": "作者书籍-新标题"}])
+        test_db_session.commit()
+        test_db_session.expire_all()
+
+        stored = test_db_session.get(Book, 888001)
+        assert (stored.title, stored.author_id, stored.author_name) == ("作者书籍-新标题", 8001, "原作者")
+
+    def test_get_recent_snapshots(self, book_service, test_db_session):
+        """测试批量获取最近快照 - 每本书按时间倒序最多返回指定条数"""
+        now = datetime.now()
+        test_db_session.add_all([Book(novel_id=666001, title="快照书籍A"), Book(novel_id=666002, title="快照书籍B")])
+        test_db_session.add_all([
+            BookSnapshot(novel_id=666001, favorites=hours, clicks=hours, snapshot_time=now - timedelta(hours=hours))
+            for hours in (1, 2, 3)
+        ] + [BookSnapshot(novel_id=666002, favorites=5, clicks=5, snapshot_time=now)])
+        test_db_session.commit()
+
+        # 执行测试
+        recent = book_service.get_recent_snapshots(test_db_session, [666001, 666002, 666003], 2)
+        latest_times = book_service.get_latest_snapshot_times(test_db_session, [666001, 666002, 666003])
+
+        # 验证结果 - 没有快照的书籍不在结果中
+        assert [s["favorites"] for s in recent[666001]] == [1, 2]
+        assert len(recent[666002]) == 1
+        assert 666003 not in recent
+        assert latest_times[666001] == now - timedelta(hours=1)
+        assert 666003 not in latest_times
+
+    @pytest.fixture
+    def change_only_mode(self):
+        """开启变化存储模式，并隔离全局摘要缓存"""
+        get_snapshot_digest_cache().clear()
+        with patch.object(get_settings().database, "snapshot_change_only", True):
+            yield
+        get_snapshot_digest_cache().clear()
+
+    @staticmethod
+    def _stat_snapshot(novel_id, favorites, snapshot_time):
+        return {
+            "novel_id": novel_id, "favorites": favorites, "clicks": 100, "comments": 5, "nutrition": 8,
+            "word_counts": 30000, "chapter_counts": 10, "status": "连载中", "snapshot_time": snapshot_time,
+        }
+
+    def test_change_only_skips_unchanged_snapshots(self, book_service, test_db_session, change_only_mode):
+        """测试变化存储模式 - 统计数据未变化的快照不写入，包括同一批次内和数据库中已有的"""
+        now = datetime.now()
+        test_db_session.add(Book(novel_id=555001, title="变化检测书籍"))
+        test_db_session.add(BookSnapshot(**self._stat_snapshot(555001, 10, now - timedelta(hours=3))))
+        test_db_session.commit()
+
+        created = book_service.batch_create_book_snapshots(test_db_session, [
+            self._stat_snapshot(555001, 10, now - timedelta(hours=2)),
+            self._stat_snapshot(555001, 12, now - timedelta(hours=1)),
+            self._stat_snapshot(555001, 12, now),
+        ])
+
+        stored = test_db_session.query(BookSnapshot).filter_by(novel_id=555001).order_by(BookSnapshot.snapshot_time)
+        assert created == 1
+        assert [s.favorites for s in stored] == [10, 12]
+
+    def test_change_only_rollback_discards_digests(self, book_service, test_db_session, change_only_mode):
+        """测试变化存储模式 - 事务回滚后摘要不进入缓存，相同数据可以再次写入"""
+        now = datetime.now()
+        test_db_session.add(Book(novel_id=555002, title="回滚书籍"))
+        test_db_session.commit()
+
+        book_service.batch_create_book_snapshots(
+            test_db_session, [self._stat_snapshot(555002, 20, now)], commit=False
+        )
+        test_db_session.rollback()
+        created = book_service.batch_create_book_snapshots(test_db_session, [self._stat_snapshot(555002, 20, now)])
+
+        assert created == 1
+        assert get_snapshot_digest_cache().get(555002) is not None
+
+    def test_change_only_detail_uses_last_seen_time(self, book_service, test_db_session, change_only_mode):
+        """测试变化存储模式 - 书籍详情的最新爬取时间为最后一次爬取，而不是最后一条变化快照的时间"""
+        now = datetime.now().replace(microsecond=0)
+        test_db_session.add(Book(novel_id=555007, title="最后爬取书籍"))
+        test_db_session.commit()
+
+        book_service.batch_create_book_snapshots(test_db_session, [
+            self._stat_snapshot(555007, 30, now - timedelta(hours=2)),
+        ])
+        created = book_service.batch_create_book_snapshots(test_db_session, [
+            self._stat_snapshot(555007, 30, now),
+        ])
+        detail = book_service.get_book_detail_by_novel_id(test_db_session, 555007)
+
+        assert created == 0
+        assert (detail.favorites, detail.snapshot_time) == (30, now)
+
+    def test_change_only_history_matches_full_storage(self, book_service, test_db_session):
+        """测试变化存储模式 - 压缩后的历史查询与完整存储一致，并把最后的值延续到当前时间段"""
+        now = datetime.now().replace(minute=0, second=0, microsecond=0)
+        favorites = [10, 10, 10, 15, 15, 20]
+        test_db_session.add(Book(novel_id=555003, title="历史书籍"))
+        test_db_session.add_all([
+            BookSnapshot(**self._stat_snapshot(555003, value, now - timedelta(hours=len(favorites) - i)))
+            for i, value in enumerate(favorites)
+        ])
+        test_db_session.commit()
+        full = book_service.get_historical_snapshots_by_novel_id(test_db_session, 555003, "hour", 8)
+
+        removed = book_service.compact_unchanged_snapshots(test_db_session)
+        get_snapshot_digest_cache().clear()
+        with patch.object(get_settings().database, "snapshot_change_only", True):
+            compact = book_service.get_historical_snapshots_by_novel_id(test_db_session, 555003, "hour", 8)
+
+        assert removed == 3
+        assert test_db_session.query(BookSnapshot).filter_by(novel_id=555003).count() == 3
+        assert [(s.snapshot_time, s.favorites) for s in compact[:-1]] == [(s.snapshot_time, s.favorites) for s in full]
+        assert compact[-1].snapshot_time == now and compact[-1].favorites == 20
+
+    def test_snapshot_rollups_keep_first_snapshot(self, book_service, test_db_session):
+        """测试时间段汇总 - 每个时间段保留最早的快照，乱序写入的更早快照会覆盖"""
+        hour = datetime.now().replace(minute=0, second=0, microsecond=0) - timedelta(hours=2)
+        test_db_session.add(Book(novel_id=555004, title="汇总书籍"))
+        test_db_session.commit()
+
+        book_service.batch_create_book_snapshots(test_db_session, [
+            self._stat_snapshot(555004, 20, hour + timedelta(minutes=30)),
+            self._stat_snapshot(555004, 30, hour + timedelta(minutes=45)),
+        ])
+        book_service.batch_create_book_snapshots(test_db_session, [
+            self._stat_snapshot(555004, 10, hour + timedelta(minutes=5)),
+        ])
+
+        rollups = {r.interval: r for r in test_db_session.query(BookSnapshotRollup).filter_by(novel_id=555004)}
+        assert set(rollups) == {"hour", "day", "week", "month"}
+        assert rollups["hour"].favorites == 10
+        assert rollups["hour"].bucket == hour.strftime("%Y-%m-%d %H")
+
+    def test_history_from_rollups_matches_raw_query(self, book_service, test_db_session):
+        """测试时间段汇总 - 汇总表查询与原始快照查询结果一致，重建后结果不变"""
+        now = datetime.now().replace(minute=0, second=0, microsecond=0)
+        test_db_session.add(Book(novel_id=555005, title="汇总历史书籍"))
+        test_db_session.commit()
+        book_service.batch_create_book_snapshots(test_db_session, [
+            self._stat_snapshot(555005, minutes, now - timedelta(minutes=minutes))
+            for minutes in (20, 50, 80, 110, 170, 200)
+        ])
+
+        rollup_history = book_service.get_historical_snapshots_by_novel_id(test_db_session, 555005, "hour", 5)
+        with patch.object(get_settings().database, "book_history_rollups", False):
+            raw_history = book_service.get_historical_snapshots_by_novel_id(test_db_session, 555005, "hour", 5)
+        test_db_session.query(BookSnapshotRollup).delete()
+        processed = book_service.rebuild_snapshot_rollups(test_db_session)
+        rebuilt_history = book_service.get_historical_snapshots_by_novel_id(test_db_session, 555005, "hour", 5)
+
+        assert processed == 6
+        assert [(s.snapshot_time, s.favorites) for s in rollup_history] == \
+               [(s.snapshot_time, s.favorites) for s in raw_history]
+        assert [s.favorites for s in rebuilt_history] == [200, 170, 110, 50]
+        assert rebuilt_history == rollup_history
+
+    def test_history_falls_back_when_rollups_partial(self, book_service, test_db_session):
+        """测试时间段汇总 - 开启汇总前写入的快照没有汇总行时，回退到原始快照查询"""
+        now = datetime.now().replace(microsecond=0)
+        test_db_session.add(Book(novel_id=555006, title="部分汇总书籍"))
+        test_db_session.add_all([
+            BookSnapshot(**self._stat_snapshot(555006, hours, now - timedelta(hours=hours))) for hours in (4, 3)
+        ])
+        test_db_session.commit()
+        book_service.batch_create_book_snapshots(test_db_session, [
+            self._stat_snapshot(555006, hours, now - timedelta(hours=hours)) for hours in (1, 0)
+        ])
+
+        history = book_service.get_historical_snapshots_by_novel_id(test_db_session, 555006, "hour", 5)
+
+        assert [s.favorites for s in history] == [4, 3, 1, 0]
+
+    def test_history_excludes_snapshots_before_start(self, book_service, test_db_session):
+        """测试历史快照 - 开始时间所在的时间段只取开始时间之后的快照，汇总表和原始快照查询一致"""
+        now = datetime.now().replace(microsecond=0)
+        test_db_session.add(Book(novel_id=555007, title="起始时间书籍"))
+        test_db_session.commit()
+        book_service.batch_create_book_snapshots(test_db_session, [
+            self._stat_snapshot(555007, 1, now - timedelta(hours=2, minutes=1)),
+            self._stat_snapshot(555007, 2, now - timedelta(hours=1, minutes=55)),
+            self._stat_snapshot(555007, 3, now - timedelta(minutes=1)),
+        ])
+
+        rollup_history = book_service.get_historical_snapshots_by_novel_id(test_db_session, 555007, "hour", 2)
+        with patch.object(get_settings().database, "book_history_rollups", False):
+            raw_history = book_service.get_historical_snapshots_by_novel_id(test_db_session, 555007, "hour", 2)
+
+        assert [s.favorites for s in rollup_history][0] == 2
+        assert 1 not in [s.favorites for s in rollup_history]
+        assert rollup_history == raw_history
+
     # ==================== API操作测试 ====================
 
     def test_get_books_with_pagination_success(self, book_service, populated_db_session):
@@ -298,8 +545,7 @@ class TestBookServiceIntegration:
         result = book_service.batch_create_book_snapshots(test_db_session, [])
 
         # 验证结果
-        assert isinstance(result, list)
-        assert len(result) == 0
+        assert result == 0
 
     def test_pagination_with_zero_size(self, book_service, populated_db_session):
         """测试分页 - size为0的边界情况"""
@@ -0,0 +1,74 @@
+"""
+数据库连接测试
+验证异步连接URL的推导规则、SQLite连接PRAGMA和维护任务
+"""
+
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import create_engine
+
+from app.database import connection
+from app.database.connection import configure_sqlite_engine, get_async_url, sqlite_maintenance_task_wrapper
+from app.models.schedule import JobType, get_predefined_jobs
+
+
+class TestGetAsyncUrl:
+    """异步连接URL推导测试类"""
+
+    @pytest.mark.parametrize(
+        "url,expected",
+        [
+            ("sqlite:///./data/jjcrawler.db", "sqlite+aiosqlite:///./data/jjcrawler.db"),
+            ("postgresql://user:pw@db:5432/jj", "postgresql+asyncpg://user:pw@db:5432/jj"),
+            ("postgresql+psycopg2://user:pw@db/jj", "postgresql+asyncpg://user:pw@db/jj"),
+            ("sqlite+aiosqlite:///./data/jjcrawler.db", "sqlite+aiosqlite:///./data/jjcrawler.db"),
+        ],
+    )
+    def test_get_async_url(self, url, expected):
+        """同步驱动映射到对应的异步驱动，已是异步驱动的URL保持不变"""
+        assert get_async_url(url) == expected
+
+
+class TestSqlitePragmas:
+    """SQLite连接参数与维护任务测试类"""
+
+    @pytest.fixture
+    def file_engine(self, tmp_path):
+        engine = create_engine(f"sqlite:///{tmp_path / 'pragma.db'}")
+        configure_sqlite_engine(engine)
+        yield engine
+        engine.dispose()
+
+    def test_pragmas_applied_on_connect(self, file_engine):
+        """每个新连接都应用WAL、NORMAL同步、内存临时表和忙等待超时"""
+        with file_engine.connect() as conn:
+            assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+            assert conn.exec_driver_sql("PRAGMA synchronous").scalar() == 1
+            assert conn.exec_driver_sql("PRAGMA temp_store").scalar() == 2
+            assert conn.exec_driver_sql("PRAGMA busy_timeout").scalar() == 5000
+            assert conn.exec_driver_sql("PRAGMA cache_size").scalar() == -65536
+
+    def test_reader_not_blocked_by_open_write_transaction(self, file_engine):
+        """WAL模式下写事务未提交时，其他连接仍可读取已提交的数据"""
+        with file_engine.begin() as conn:
+            conn.exec_driver_sql("CREATE TABLE t (id INTEGER)")
+            conn.exec_driver_sql("INSERT INTO t VALUES (1)")
+
+        with file_engine.connect() as writer, file_engine.connect() as reader:
+            writer.exec_driver_sql("INSERT INTO t VALUES (2)")
+            assert reader.exec_driver_sql("SELECT COUNT(*) FROM t").scalar() == 1
+            writer.commit()
+
+    @pytest.mark.parametrize("job_id", ["sqlite_wal_checkpoint", "sqlite_optimize"])
+    def test_maintenance_task(self, file_engine, job_id):
+        """维护任务在原始连接上执行，不报告错误"""
+        with patch.object(connection, "engine", file_engine):
+            result = sqlite_maintenance_task_wrapper(job_id)
+        assert result["success"] is True
+
+    def test_maintenance_jobs_are_predefined(self):
+        """SQLite数据库下注册WAL检查点和optimize维护任务"""
+        jobs = {job.job_id: job for job in get_predefined_jobs()}
+        assert jobs["sqlite_wal_checkpoint"].job_type == JobType.MAINTAIN
+        assert jobs["sqlite_optimize"].job_type == JobType.MAINTAIN
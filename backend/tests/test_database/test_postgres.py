@@ -0,0 +1,181 @@
+"""
+PostgreSQL后端测试
+时间分组表达式与分区表DDL在SQLite/方言编译层面验证；
+连接真实PostgreSQL的用例使用TEST_POSTGRES_URL指定的数据库，或已安装pgserver时启动的嵌入式实例，都没有时跳过
+"""
+
+import os
+from datetime import date, datetime, timedelta
+from unittest.mock import Mock
+
+import pytest
+from sqlalchemy import DateTime, create_engine, literal, select, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.schema import CreateTable
+
+from app.database.db.base import Base
+from app.database.db.book import Book, BookSnapshot
+from app.database.db.ranking import Ranking, RankingSnapshot
+from app.database.postgres import create_partitioned_tables, ensure_month_partitions, month_partitions, partitioned_table
+from app.database.service.Base import time_bucket
+from app.database.service.book_service import BookService
+from app.database.service.ranking_service import RankingService
+from app.utils import TIME_BUCKET_FORMATS
+
+# 覆盖跨年、周一、周日、闰年等%W周分组的边界日期
+BUCKET_SAMPLES = [
+    datetime(2023, 1, 1, 0, 5),
+    datetime(2024, 1, 1, 23, 59, 59),
+    datetime(2024, 2, 29, 12, 0),
+    datetime(2024, 12, 29, 8, 30),
+    datetime(2024, 12, 31, 18, 0),
+    datetime(2025, 1, 5, 1, 0),
+    datetime(2025, 1, 6, 1, 0),
+]
+
+
+def postgres_session_stub():
+    """只用于编译表达式的PostgreSQL会话替身"""
+    db = Mock()
+    db.get_bind.return_value.dialect.name = "postgresql"
+    return db
+
+
+class TestTimeBucket:
+    """方言无关时间分组测试类"""
+
+    @pytest.mark.parametrize("interval", list(TIME_BUCKET_FORMATS))
+    def test_sqlite_matches_python_strftime(self, test_db_session, interval):
+        """SQLite上的分组键与Python strftime结果一致"""
+        for moment in BUCKET_SAMPLES:
+            bucket = test_db_session.scalar(select(time_bucket(test_db_session, literal(moment, DateTime), interval)))
+            assert bucket == moment.strftime(TIME_BUCKET_FORMATS[interval])
+
+    def test_postgres_expression(self):
+        """PostgreSQL上使用to_char，周分组按年内天数和星期几换算"""
+        db = postgres_session_stub()
+        week = str(time_bucket(db, BookSnapshot.snapshot_time, "week").compile(dialect=postgresql.dialect()))
+        assert "to_char" in week and "isodow" in week and "strftime" not in week
+        hour = str(time_bucket(db, BookSnapshot.snapshot_time, "hour").compile(dialect=postgresql.dialect()))
+        assert "to_char" in hour
+
+    def test_invalid_interval(self, test_db_session):
+        with pytest.raises(ValueError):
+            time_bucket(test_db_session, BookSnapshot.snapshot_time, "year")
+
+
+class TestPartitionDDL:
+    """快照分区表DDL测试类"""
+
+    def test_partitioned_ranking_snapshots(self):
+        """分区表按snapshot_time范围分区，主键和唯一约束包含分区列"""
+        ddl = str(CreateTable(partitioned_table(RankingSnapshot.__table__)).compile(dialect=postgresql.dialect()))
+        assert "PARTITION BY RANGE (snapshot_time)" in ddl
+        assert "PRIMARY KEY (id, snapshot_time)" in ddl
+        assert "UNIQUE (ranking_id, novel_id, batch_id, snapshot_time)" in ddl
+        assert "SERIAL" in ddl
+
+    def test_model_table_unchanged(self):
+        """生成分区DDL不修改ORM映射使用的原表"""
+        partitioned_table(BookSnapshot.__table__)
+        assert [column.name for column in BookSnapshot.__table__.primary_key] == ["id"]
+        assert not BookSnapshot.__table__.dialect_options["postgresql"]["partition_by"]
+
+    def test_month_partitions_cross_year(self):
+        partitions = month_partitions("book_snapshots", date(2024, 11, 15), 3)
+        assert partitions == [
+            ("book_snapshots_2024_11", date(2024, 11, 1), date(2024, 12, 1)),
+            ("book_snapshots_2024_12", date(2024, 12, 1), date(2025, 1, 1)),
+            ("book_snapshots_2025_01", date(2025, 1, 1), date(2025, 2, 1)),
+        ]
+
+
+@pytest.fixture(scope="module")
+def postgres_url(tmp_path_factory):
+    """测试用PostgreSQL连接URL"""
+    pytest.importorskip("psycopg2")
+    url = os.environ.get("TEST_POSTGRES_URL")
+    if url:
+        yield url
+        return
+    pgserver = pytest.importorskip("pgserver")
+    server = pgserver.get_server(tmp_path_factory.mktemp("pgdata"), cleanup_mode="stop")
+    yield server.get_uri()
+
+
+@pytest.fixture
+def postgres_session(postgres_url):
+    """在PostgreSQL上建表（快照表分区）并返回会话，结束后删除所有表"""
+    engine = create_engine(postgres_url)
+    Base.metadata.drop_all(bind=engine)
+    create_partitioned_tables(engine, Base.metadata)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+        engine.dispose()
+
+
+class TestPostgresBackend:
+    """真实PostgreSQL后端测试类"""
+
+    def test_snapshot_tables_are_partitioned(self, postgres_session):
+        partitions = postgres_session.scalars(text(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class parent ON pg_inherits.inhparent = parent.oid "
+            "JOIN pg_class child ON pg_inherits.inhrelid = child.oid "
+            "WHERE parent.relname = 'book_snapshots'"
+        )).all()
+        assert "book_snapshots_default" in partitions
+        assert f"book_snapshots_{date.today():%Y_%m}" in partitions
+
+    @pytest.mark.parametrize("interval", list(TIME_BUCKET_FORMATS))
+    def test_time_bucket_matches_python_strftime(self, postgres_session, interval):
+        for moment in BUCKET_SAMPLES:
+            bucket = postgres_session.scalar(select(time_bucket(postgres_session, literal(moment, DateTime), interval)))
+            assert bucket == moment.strftime(TIME_BUCKET_FORMATS[interval])
+
+    def test_copy_ingest_and_history(self, postgres_session):
+        """COPY写入书籍和榜单快照后，历史查询按时间段返回每段第一个快照"""
+        postgres_session.add(Book(novel_id=1, title="测试书籍"))
+        ranking = Ranking(rank_id="jiazi", hash_id="h" * 32, channel_name="夹子", page_id="jiazi")
+        postgres_session.add(ranking)
+        postgres_session.commit()
+
+        now = datetime.now().replace(minute=0, second=0, microsecond=0)
+        BookService.batch_create_book_snapshots(postgres_session, [
+            {"novel_id": 1, "favorites": 10 + hours, "chapter_counts": 10,
+             "snapshot_time": now - timedelta(hours=hours, minutes=-10)}
+            for hours in range(3)
+        ] + [{"novel_id": 1, "favorites": 99, "status": "", "snapshot_time": now + timedelta(minutes=40)}])
+        RankingService.batch_create_ranking_snapshots(
+            postgres_session, [{"ranking_id": ranking.id, "novel_id": 1, "position": 1}], batch_id="b1"
+        )
+
+        assert postgres_session.scalar(select(BookSnapshot.status).where(BookSnapshot.favorites == 99)) == ""
+        assert postgres_session.scalar(select(RankingSnapshot.batch_id)) == "b1"
+        snapshots = BookService._first_snapshot_per_bucket(
+            postgres_session, 1, "hour", now - timedelta(hours=5), now + timedelta(hours=1)
+        )
+        assert [snapshot.favorites for snapshot in snapshots] == [12, 11, 10]
+
+    def test_partition_created_after_rows_landed_in_default(self, postgres_session):
+        """DEFAULT分区中已有某月的行时，创建该月分区会把这些行移入新分区"""
+        postgres_session.add(Book(novel_id=1, title="测试书籍"))
+        postgres_session.commit()
+        future = date.today().replace(day=1) + timedelta(days=800)
+        snapshot_time = datetime(future.year, future.month, 15, 12)
+        BookService.batch_create_book_snapshots(postgres_session, [
+            {"novel_id": 1, "favorites": 42, "snapshot_time": snapshot_time},
+        ])
+
+        ensure_month_partitions(postgres_session.get_bind(), start=future, months=1)
+        postgres_session.commit()
+
+        partition = f"book_snapshots_{future:%Y_%m}"
+        assert postgres_session.scalar(text(f"SELECT count(*) FROM {partition}")) == 1
+        assert postgres_session.scalar(text("SELECT count(*) FROM book_snapshots_default")) == 0
+        assert postgres_session.scalar(select(BookSnapshot.favorites)) == 42
@@ -0,0 +1,130 @@
+"""
+查询计划回归测试
+通过EXPLAIN QUERY PLAN检查服务层公开方法对快照表的查询都能命中索引，不出现全表扫描
+"""
+
+import re
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from app.database.db.book import Book
+from app.database.db.ranking import Ranking, RankingBatchIndex
+from app.database.service.book_service import BookService
+from app.database.service.ranking_service import RankingService
+
+# 会随历史数据增长的快照相关表
+SNAPSHOT_TABLES = (
+    "book_snapshots",
+    "book_snapshot_rollups",
+    "ranking_snapshots",
+    "ranking_snapshot_batches",
+    "ranking_batch_index",
+)
+FULL_SCAN_PATTERN = re.compile(rf"\bSCAN ({'|'.join(SNAPSHOT_TABLES)})\b")
+# 对时间列套函数后再比较（如date(snapshot_time) >= ?）无法使用索引范围查找
+WRAPPED_TIME_PATTERN = re.compile(r"\w+\(\w+\.snapshot_time\)\s*(=|<|>|BETWEEN)")
+
+NOW = datetime.now().replace(minute=30, second=0, microsecond=0)
+
+
+@contextmanager
+def capture_selects(session):
+    """记录会话执行的所有SELECT语句及参数"""
+    statements = []
+    engine = session.get_bind()
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def plan_problems(session, statements):
+    """
+    对每条语句执行EXPLAIN QUERY PLAN，返回无法走索引的查询
+
+    :return: 快照表的全表扫描，以及时间列套函数导致只能按前缀列查找的查询
+    """
+    cursor = session.connection().connection.dbapi_connection.cursor()
+    problems = []
+    for statement, parameters in statements:
+        sql = " ".join(statement.split())
+        plan = [row[-1] for row in cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()]
+        problems.extend(f"{detail} <- {sql[:200]}" for detail in plan if FULL_SCAN_PATTERN.search(detail))
+        if WRAPPED_TIME_PATTERN.search(sql):
+            problems.append(f"{' / '.join(plan)} <- {sql[:200]}")
+    return problems
+
+
+@pytest.fixture
+def plan_session(test_db_session):
+    """写入书籍快照和两个批次的榜单快照"""
+    test_db_session.add(Book(novel_id=333001, title="查询计划书籍"))
+    ranking = Ranking(rank_id="plan", hash_id="plan-hash", channel_name="查询计划榜单", page_id="plan")
+    test_db_session.add(ranking)
+    test_db_session.commit()
+
+    BookService.batch_create_book_snapshots(test_db_session, [
+        {"novel_id": 333001, "favorites": hours, "chapter_counts": 10, "snapshot_time": NOW - timedelta(hours=hours)}
+        for hours in range(3)
+    ])
+    for hours in range(2):
+        RankingService.batch_create_ranking_snapshots(test_db_session, [
+            {"ranking_id": ranking.id, "novel_id": 333001, "position": 1,
+             "snapshot_time": NOW - timedelta(hours=hours)},
+        ], batch_id=f"plan-{hours}")
+    return test_db_session, ranking.id
+
+
+CALLS = {
+    "book_history_hour": lambda db, rid: BookService.get_historical_snapshots_by_novel_id(db, 333001, "hour", 24),
+    "book_history_month": lambda db, rid: BookService.get_historical_snapshots_by_novel_id(db, 333001, "month", 3),
+    "book_detail": lambda db, rid: BookService.get_book_detail_by_novel_id(db, 333001),
+    "latest_snapshot_times": lambda db, rid: BookService.get_latest_snapshot_times(db, [333001]),
+    "recent_snapshots": lambda db, rid: BookService.get_recent_snapshots(db, [333001], 2),
+    "snapshots_by_day": lambda db, rid: RankingService.get_snapshots_by_day(db, rid, NOW.date()),
+    "snapshots_by_hour": lambda db, rid: RankingService.get_snapshots_by_hour(db, rid, NOW.date(), NOW.hour),
+    "ranking_detail_by_day": lambda db, rid: RankingService().get_ranking_detail_by_day(db, rid, NOW.date()),
+    "ranking_detail_by_hour": lambda db, rid: RankingService().get_ranking_detail_by_hour(
+        db, rid, NOW.date(), NOW.hour),
+    "ranking_history_by_day": lambda db, rid: RankingService().get_ranking_history_by_day(
+        db, rid, (NOW - timedelta(days=7)).date(), NOW.date()),
+    "ranking_history_by_hour": lambda db, rid: RankingService().get_ranking_history_by_hour(
+        db, rid, NOW - timedelta(hours=6), NOW),
+    "book_ranking_history": lambda db, rid: RankingService().get_book_ranking_history(db, 333001, 7),
+}
+
+
+class TestQueryPlans:
+    """查询计划回归测试类"""
+
+    @pytest.mark.parametrize("name", list(CALLS))
+    def test_public_methods_use_indexes(self, plan_session, name):
+        """测试公开查询方法 - 快照表查询全部走索引"""
+        db, ranking_id = plan_session
+
+        with capture_selects(db) as statements:
+            CALLS[name](db, ranking_id)
+
+        assert statements
+        assert plan_problems(db, statements) == []
+
+    @pytest.mark.parametrize("name", [name for name in CALLS if name.startswith(("snapshots_", "ranking_"))])
+    def test_fallback_queries_use_indexes(self, plan_session, name):
+        """测试批次索引表未覆盖时的回退查询 - 按左闭右开时间范围命中索引"""
+        db, ranking_id = plan_session
+        db.query(RankingBatchIndex).delete()
+        db.commit()
+
+        with capture_selects(db) as statements:
+            CALLS[name](db, ranking_id)
+
+        assert plan_problems(db, statements) == []
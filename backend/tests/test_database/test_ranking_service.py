@@ -4,11 +4,15 @@ RankingService集成测试
 """
 
 from datetime import date, datetime, timedelta
+from unittest.mock import patch
 
 import pytest
 
+from app.config import get_settings
+from app.database.service.ranking_delta import apply_payload, encode_delta, encode_keyframe
+from app.database.service import ranking_service as ranking_service_module
 from app.database.service.ranking_service import RankingService
-from app.database.db.ranking import Ranking, RankingSnapshot
+from app.database.db.ranking import Ranking, RankingBatchIndex, RankingBookPosition, RankingSnapshot, RankingSnapshotBatch
 
 
 class TestRankingServiceIntegration:
@@ -121,14 +125,13 @@ class TestRankingServiceIntegration:
         result = ranking_service.batch_create_ranking_snapshots(populated_db_session, sample_ranking_snapshots_data, batch_id)
 
         # 验证结果
-        assert len(result) == len(sample_ranking_snapshots_data)
-        
+        assert result == len(sample_ranking_snapshots_data)
+
         # 验证每个快照
-        for i, snapshot in enumerate(result):
-            assert snapshot.ranking_id == sample_ranking_snapshots_data[i]["ranking_id"]
-            assert snapshot.novel_id == sample_ranking_snapshots_data[i]["novel_id"]
-            assert snapshot.position == sample_ranking_snapshots_data[i]["position"]
-            assert snapshot.batch_id == batch_id
+        stored = populated_db_session.query(RankingSnapshot).filter_by(batch_id=batch_id).all()
+        assert sorted((s.ranking_id, s.novel_id, s.position) for s in stored) == sorted(
+            (data["ranking_id"], data["novel_id"], data["position"]) for data in sample_ranking_snapshots_data
+        )
 
         # 验证数据库中的记录数量
         total_snapshots = populated_db_session.query(RankingSnapshot).count()
@@ -349,8 +352,7 @@ class TestRankingServiceIntegration:
         result = ranking_service.batch_create_ranking_snapshots(test_db_session, [], batch_id)
 
         # 验证结果
-        assert isinstance(result, list)
-        assert len(result) == 0
+        assert result == 0
 
     def test_ranking_operations_with_minimal_data(self, ranking_service, test_db_session):
         """测试榜单操作 - 最小数据集"""
@@ -367,6 +369,186 @@ class TestRankingServiceIntegration:
         assert result.rank_id == "minimal_test"
         assert result.channel_name == "最小测试榜单"
 
+    def test_bulk_upsert_rankings_resolves_ids(self, ranking_service, test_db_session, sample_ranking_data):
+        """测试批量upsert榜单 - 一次查询解析所有榜单ID"""
+        existing = ranking_service.create_or_update_ranking(test_db_session, dict(sample_ranking_data))
+        new_ranking = {"rank_id": "bulk_new", "channel_name": "批量榜单", "page_id": "test_page"}
+        updated_ranking = {**sample_ranking_data, "rank_group_type": "已更新"}
+
+        # 执行测试 - 批量upsert
+        hash_ids = ranking_service.bulk_upsert_rankings(test_db_session, [updated_ranking, new_ranking])
+        test_db_session.commit()
+        test_db_session.expire_all()
+
+        # 验证结果
+        assert len(hash_ids) == 2
+        assert hash_ids[updated_ranking["hash_id"]] == existing.id
+        assert hash_ids[new_ranking["hash_id"]] != existing.id
+        assert ranking_service.get_ranking_by_id(test_db_session, existing.id).rank_group_type == "已更新"
+
+    def test_ranking_delta_codec_roundtrip(self):
+        """测试差量编码 - 关键帧加差量还原出完整排名"""
+        first = {101: 1, 102: 2, 103: 3}
+        second = {102: 1, 101: 2, 104: 3}
+
+        restored = apply_payload(apply_payload({}, encode_keyframe(first)), encode_delta(first, second))
+
+        assert restored == second
+
+    def test_delta_storage_rebuilds_snapshots(self, ranking_service, test_db_session, sample_ranking_data):
+        """测试差量存储格式 - 按批次写入关键帧和差量，查询时透明还原完整列表"""
+        ranking_record = ranking_service.create_or_update_ranking(test_db_session, dict(sample_ranking_data))
+        base_time = datetime.now().replace(minute=10, second=0, microsecond=0) - timedelta(hours=3)
+        orders = [[201, 202, 203], [202, 201, 203], [202, 201, 204]]
+
+        with patch.object(get_settings().database, "ranking_storage", "delta"), \
+                patch.object(get_settings().database, "ranking_keyframe_interval", 2):
+            for hours, order in enumerate(orders):
+                ranking_service.batch_create_ranking_snapshots(test_db_session, [
+                    {"ranking_id": ranking_record.id, "novel_id": novel_id, "position": position,
+                     "snapshot_time": base_time + timedelta(hours=hours)}
+                    for position, novel_id in enumerate(order, start=1)
+                ], batch_id=f"batch-{hours}")
+
+            target = base_time + timedelta(hours=1)
+            by_hour = ranking_service.get_snapshots_by_hour(
+                test_db_session, ranking_record.id, target.date(), target.hour
+            )
+            history = ranking_service.get_ranking_history_by_hour(
+                test_db_session, ranking_record.id, base_time, base_time + timedelta(hours=3)
+            )
+            book_history = ranking_service.get_book_ranking_history(test_db_session, 201, 1)
+
+        batches = test_db_session.query(RankingSnapshotBatch).order_by(RankingSnapshotBatch.snapshot_time).all()
+        assert test_db_session.query(RankingSnapshot).count() == 0
+        assert [b.is_keyframe for b in batches] == [True, False, True]
+        assert [(s.novel_id, s.position) for s in by_hour] == [(202, 1), (201, 2), (203, 3)]
+        assert [[b.novel_id for b in s.books] for s in history.snapshots] == orders
+        assert [info.position for info in book_history] == [2, 2, 1]
+
+    def test_delta_writes_reuse_previous_entries(self, ranking_service, test_db_session, sample_ranking_data):
+        """测试差量存储写入 - 上一批次由本进程写入时不从关键帧重新还原，也不写批次索引表"""
+        ranking_record = ranking_service.create_or_update_ranking(test_db_session, dict(sample_ranking_data))
+        base_time = datetime.now().replace(minute=10, second=0, microsecond=0) - timedelta(hours=4)
+        orders = [[211, 212, 213], [212, 211, 213], [213, 212], [211, 213, 214]]
+
+        def write(hours, order):
+            ranking_service.batch_create_ranking_snapshots(test_db_session, [
+                {"ranking_id": ranking_record.id, "novel_id": novel_id, "position": position,
+                 "snapshot_time": base_time + timedelta(hours=hours)}
+                for position, novel_id in enumerate(order, start=1)
+            ], batch_id=f"tail-{hours}")
+
+        with patch.object(get_settings().database, "ranking_storage", "delta"):
+            with patch.object(RankingService, "_decode_delta_batches", side_effect=AssertionError("不应还原批次")):
+                for hours, order in enumerate(orders[:3]):
+                    write(hours, order)
+            # 进程内没有上一批次的排名时从关键帧还原
+            ranking_service_module._delta_tails.clear()
+            write(3, orders[3])
+            history = ranking_service.get_ranking_history_by_hour(
+                test_db_session, ranking_record.id, base_time, base_time + timedelta(hours=4)
+            )
+
+        assert test_db_session.query(RankingBatchIndex).count() == 0
+        assert [[b.novel_id for b in s.books] for s in history.snapshots] == orders
+
+    def test_delta_history_merges_legacy_rows(self, ranking_service, test_db_session, sample_ranking_data):
+        """测试切换差量存储 - 同一范围内切换前的ranking_snapshots和切换后的差量批次按时间段合并"""
+        ranking_record = ranking_service.create_or_update_ranking(test_db_session, dict(sample_ranking_data))
+        base_time = datetime.now().replace(minute=10, second=0, microsecond=0) - timedelta(hours=3)
+        batches = [(0, "rows", [501, 502]), (1, "rows", [502, 501]), (1.5, "delta", [503, 501]), (2, "delta", [501, 503])]
+        for hours, storage, order in batches:
+            with patch.object(get_settings().database, "ranking_storage", storage):
+                ranking_service.batch_create_ranking_snapshots(test_db_session, [
+                    {"ranking_id": ranking_record.id, "novel_id": novel_id, "position": position,
+                     "snapshot_time": base_time + timedelta(hours=hours)}
+                    for position, novel_id in enumerate(order, start=1)
+                ], batch_id=f"switch-{hours}")
+
+        with patch.object(get_settings().database, "ranking_storage", "delta"):
+            history = ranking_service.get_ranking_history_by_hour(
+                test_db_session, ranking_record.id, base_time, base_time + timedelta(hours=3)
+            )
+
+        assert [[b.novel_id for b in s.books] for s in history.snapshots] == [[501, 502], [503, 501], [501, 503]]
+
+    def test_delta_book_history_uses_position_index(self, ranking_service, test_db_session, sample_ranking_data):
+        """测试差量存储的书籍排名历史 - 按书籍排名索引查询，不还原批次"""
+        ranking_record = ranking_service.create_or_update_ranking(test_db_session, dict(sample_ranking_data))
+        base_time = datetime.now().replace(microsecond=0) - timedelta(hours=3)
+        with patch.object(get_settings().database, "ranking_storage", "delta"):
+            for hours, order in enumerate([[601, 602], [602, 601], [603, 602]]):
+                ranking_service.batch_create_ranking_snapshots(test_db_session, [
+                    {"ranking_id": ranking_record.id, "novel_id": novel_id, "position": position,
+                     "snapshot_time": base_time + timedelta(hours=hours)}
+                    for position, novel_id in enumerate(order, start=1)
+                ], batch_id=f"position-{hours}")
+
+            with patch.object(RankingService, "_decode_delta_batches", side_effect=AssertionError("不应还原批次")):
+                book_history = ranking_service.get_book_ranking_history(test_db_session, 601, 1)
+
+        assert [info.position for info in book_history] == [2, 1]
+        assert test_db_session.query(RankingBookPosition).count() == 6
+
+        # 重建索引表后结果一致
+        assert ranking_service.rebuild_book_positions(test_db_session) == 3
+        assert test_db_session.query(RankingBookPosition).count() == 6
+
+    def test_batch_index_tracks_latest_batch(self, ranking_service, test_db_session, sample_ranking_data):
+        """测试批次索引表 - 写入时记录每小时、每天最后一个批次，历史和详情查询按索引取批次"""
+        ranking_record = ranking_service.create_or_update_ranking(test_db_session, dict(sample_ranking_data))
+        base_time = datetime.now().replace(minute=0, second=0, microsecond=0) - timedelta(hours=3)
+        for minutes, order in ((5, [301, 302]), (40, [302, 301]), (70, [303, 301])):
+            ranking_service.batch_create_ranking_snapshots(test_db_session, [
+                {"ranking_id": ranking_record.id, "novel_id": novel_id, "position": position,
+                 "snapshot_time": base_time + timedelta(minutes=minutes)}
+                for position, novel_id in enumerate(order, start=1)
+            ], batch_id=f"index-{minutes}")
+
+        hour_index = test_db_session.query(RankingBatchIndex).filter_by(interval="hour").order_by(
+            RankingBatchIndex.bucket).all()
+        history = ranking_service.get_ranking_history_by_hour(
+            test_db_session, ranking_record.id, base_time, base_time + timedelta(hours=2)
+        )
+        by_hour = ranking_service.get_snapshots_by_hour(
+            test_db_session, ranking_record.id, base_time.date(), base_time.hour
+        )
+
+        assert [row.batch_id for row in hour_index] == ["index-40", "index-70"]
+        assert [[b.novel_id for b in s.books] for s in history.snapshots] == [[302, 301], [303, 301]]
+        assert [s.novel_id for s in by_hour] == [302, 301]
+
+        # 重建索引表后结果一致
+        test_db_session.query(RankingBatchIndex).delete()
+        assert ranking_service.rebuild_batch_index(test_db_session) == 3
+        assert [row.batch_id for row in test_db_session.query(RankingBatchIndex).filter_by(
+            interval="hour").order_by(RankingBatchIndex.bucket)] == ["index-40", "index-70"]
+
+    def test_partial_batch_index_falls_back_to_aggregate(self, ranking_service, test_db_session, sample_ranking_data):
+        """测试批次索引表 - 只覆盖部分范围（升级前的数据未重建）时回退到聚合查询，不丢失较早的时间段"""
+        ranking_record = ranking_service.create_or_update_ranking(test_db_session, dict(sample_ranking_data))
+        base_time = datetime.now().replace(minute=0, second=0, microsecond=0) - timedelta(days=3)
+        for days, order in enumerate([[311, 312], [312, 311], [313, 311]]):
+            ranking_service.batch_create_ranking_snapshots(test_db_session, [
+                {"ranking_id": ranking_record.id, "novel_id": novel_id, "position": position,
+                 "snapshot_time": base_time + timedelta(days=days)}
+                for position, novel_id in enumerate(order, start=1)
+            ], batch_id=f"partial-{days}")
+        # 模拟升级前写入的第一天没有索引行
+        test_db_session.query(RankingBatchIndex).filter(RankingBatchIndex.batch_id == "partial-0").delete()
+
+        by_day = ranking_service.get_ranking_history_by_day(
+            test_db_session, ranking_record.id, base_time.date(), (base_time + timedelta(days=2)).date()
+        )
+        by_hour = ranking_service.get_ranking_history_by_hour(
+            test_db_session, ranking_record.id, base_time, base_time + timedelta(days=2)
+        )
+
+        expected = [[311, 312], [312, 311], [313, 311]]
+        assert [[b.novel_id for b in s.books] for s in by_day.snapshots] == expected
+        assert [[b.novel_id for b in s.books] for s in by_hour.snapshots] == expected
+
     def test_search_with_special_characters(self, ranking_service, populated_db_session):
         """测试搜索 - 特殊字符"""
         # 执行测试 - 搜索包含特殊字符的内容